@@ -2,9 +2,11 @@
 
 from __future__ import unicode_literals
 
+import datetime, hashlib
 from contextlib import contextmanager
 
 from django.db import models, transaction, connection
+from django.conf import settings
 from django.conf.urls import url
 from django.contrib import admin
 from django.contrib.admin import options
@@ -14,12 +16,16 @@ try:
     from django.contrib.contenttypes.fields import GenericRelation
 except ImportError:  # Django < 1.9  pragma: no cover
     from django.contrib.contenttypes.generic import GenericInlineModelAdmin, GenericRelation
+from django.core.cache import cache
+from django.core.paginator import Paginator, InvalidPage
 from django.core.urlresolvers import reverse
 from django.core.exceptions import PermissionDenied, ImproperlyConfigured
 from django.shortcuts import get_object_or_404, render
 from django.utils.text import capfirst
 from django.utils.translation import ugettext as _
-from django.utils.encoding import force_text
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.utils.encoding import force_text, force_bytes
 from django.utils.formats import localize
 
 from reversion.models import Version
@@ -57,6 +63,18 @@ class VersionAdmin(admin.ModelAdmin):
     # If True, then the default ordering of object_history and recover lists will be reversed.
     history_latest_first = False
 
+    # The number of versions shown on each page of the object history view.
+    history_per_page = 100
+
+    # The number of deleted versions shown on each page of the recover list view.
+    recover_list_per_page = 100
+
+    # The maximum number of deleted versions the recover list view finds for each search.
+    recover_list_max_results = 10000
+
+    # The number of seconds the deleted versions found by the recover list view are cached for.
+    recover_list_cache_timeout = 300
+
     # Revision helpers.
 
     @property
@@ -78,6 +96,66 @@ class VersionAdmin(admin.ModelAdmin):
             return queryset.order_by("-pk")
         return queryset.order_by("pk")
 
+    def _get_recover_list_generation_key(self):
+        """Returns the cache key of the generation of the cached recover list searches for this model."""
+        opts = self.model._meta
+        return "reversion.recoverlist.%s.%s.%s" % (self.revision_manager._manager_slug, opts.app_label, opts.model_name)
+
+    def _get_deleted_version_ids(self, date_from=None, date_to=None, query=""):
+        """
+        Returns a list of the primary keys of the deleted versions matching the given search, most recent first.
+
+        Finding deleted versions can be slow for large tables, so the results
+        are cached, and paging through them does not search again. At most
+        recover_list_max_results + 1 primary keys are returned.
+        """
+        generation_key = self._get_recover_list_generation_key()
+        generation = cache.get(generation_key, 0)
+        cache_key = "%s.%s" % (generation_key, hashlib.md5(force_bytes(repr((
+            generation,
+            self.recover_list_max_results,
+            date_from and date_from.isoformat(),
+            date_to and date_to.isoformat(),
+            query,
+        )))).hexdigest())
+        version_ids = cache.get(cache_key)
+        if version_ids is None:
+            deleted = self.revision_manager.get_deleted(self.model)
+            deleted = self.revision_manager._filter_by_date(deleted, date_from, date_to)
+            if query:
+                deleted = deleted.filter(object_repr__icontains=query)
+            version_ids = list(deleted.order_by("-pk").values_list("pk", flat=True)[:self.recover_list_max_results + 1])
+            cache.set(cache_key, version_ids, self.recover_list_cache_timeout)
+        return version_ids
+
+    def _get_date_param(self, request, name, end=False):
+        """
+        Returns the start of the day given in the named query parameter, or None.
+
+        If end is True, the end of the day is returned instead.
+        """
+        try:
+            date = parse_date(request.GET.get(name, "").strip())
+        except ValueError:
+            date = None
+        if date is None:
+            return None
+        date = datetime.datetime.combine(date, datetime.time.max if end else datetime.time.min)
+        if settings.USE_TZ:
+            date = timezone.make_aware(date, timezone.get_current_timezone())
+        return date
+
+    def _get_page_url(self, request, page_number):
+        """Returns the URL of the given page of the current view, keeping the other query parameters."""
+        params = request.GET.copy()
+        params["p"] = page_number
+        return "?%s" % params.urlencode()
+
+    def _clear_recover_list_cache(self):
+        """Discards the cached recover list searches for this model."""
+        generation_key = self._get_recover_list_generation_key()
+        cache.set(generation_key, cache.get(generation_key, 0) + 1, None)
+
     @contextmanager
     def _create_revision(self, request):
         with transaction.atomic(), self.revision_context_manager.create_revision():
@@ -215,7 +293,10 @@ class VersionAdmin(admin.ModelAdmin):
             "title": _("Recover %(name)s") % {"name": version.object_repr},
         }
         context.update(extra_context or {})
-        return self.revisionform_view(request, version, self.recover_form_template or self._get_template_list("recover_form.html"), context)
+        response = self.revisionform_view(request, version, self.recover_form_template or self._get_template_list("recover_form.html"), context)
+        if request.method == "POST" and response.status_code == 302:
+            self._clear_recover_list_cache()
+        return response
 
     def revision_view(self, request, object_id, version_id, extra_context=None):
         """Displays the contents of the given revision."""
@@ -243,7 +324,29 @@ class VersionAdmin(admin.ModelAdmin):
             raise PermissionDenied
         model = self.model
         opts = model._meta
-        deleted = self._order_version_queryset(self.revision_manager.get_deleted(self.model))
+        # Parse the search.
+        query = request.GET.get("q", "").strip()
+        date_from = self._get_date_param(request, "date_from")
+        date_to = self._get_date_param(request, "date_to", end=True)
+        # Find a page of deleted versions.
+        version_ids = self._get_deleted_version_ids(date_from, date_to, query)
+        has_more_results = len(version_ids) > self.recover_list_max_results
+        # Always show the most recently deleted objects, whatever the display order.
+        version_ids = version_ids[:self.recover_list_max_results]
+        if not self.history_latest_first:
+            version_ids.reverse()
+        paginator = Paginator(version_ids, self.recover_list_per_page)
+        try:
+            page = paginator.page(request.GET.get("p", 1))
+        except InvalidPage:
+            page = paginator.page(1)
+        versions_by_id = Version.objects.select_related("revision").defer("serialized_data").in_bulk(page.object_list)
+        deleted = [
+            versions_by_id[version_id]
+            for version_id
+            in page.object_list
+            if version_id in versions_by_id
+        ]
         # Get the site context.
         try:
             each_context = self.admin_site.each_context(request)
@@ -257,6 +360,15 @@ class VersionAdmin(admin.ModelAdmin):
             module_name = capfirst(opts.verbose_name),
             title = _("Recover deleted %(name)s") % {"name": force_text(opts.verbose_name_plural)},
             deleted = deleted,
+            page = page,
+            paginator = paginator,
+            has_more_results = has_more_results,
+            max_results = self.recover_list_max_results,
+            search_query = query,
+            search_date_from = request.GET.get("date_from", ""),
+            search_date_to = request.GET.get("date_to", ""),
+            previous_page_url = self._get_page_url(request, page.previous_page_number()) if page.has_previous() else None,
+            next_page_url = self._get_page_url(request, page.next_page_number()) if page.has_next() else None,
         )
         context.update(extra_context or {})
         return render(request, self.recover_list_template or self._get_template_list("recover_list.html"), context)
@@ -268,18 +380,38 @@ class VersionAdmin(admin.ModelAdmin):
             raise PermissionDenied
         object_id = unquote(object_id) # Underscores in primary key get quoted to "_5F"
         opts = self.model._meta
+        versions = self._order_version_queryset(self.revision_manager.get_for_object_reference(
+            self.model,
+            object_id,
+        ).select_related("revision__user").defer("serialized_data"))
+        # Paginate on the version primary key, so later pages are as fast as the first.
+        try:
+            after = int(request.GET.get("after", ""))
+        except ValueError:
+            after = None
+        if after is not None:
+            if self.history_latest_first:
+                versions = versions.filter(pk__lt=after)
+            else:
+                versions = versions.filter(pk__gt=after)
+        versions = list(versions[:self.history_per_page + 1])
+        has_next = len(versions) > self.history_per_page
+        versions = versions[:self.history_per_page]
+        # All versions share the history URL of the object, so it is only reversed once.
+        history_url = reverse("%s:%s_%s_history" % (self.admin_site.name, opts.app_label, opts.model_name), args=(quote(object_id),))
         action_list = [
             {
                 "revision": version.revision,
-                "url": reverse("%s:%s_%s_revision" % (self.admin_site.name, opts.app_label, opts.model_name), args=(quote(version.object_id), version.id)),
+                "url": "%s%s/" % (history_url, version.id),
             }
             for version
-            in self._order_version_queryset(self.revision_manager.get_for_object_reference(
-                self.model,
-                object_id,
-            ).select_related("revision__user"))
+            in versions
         ]
         # Compile the context.
-        context = {"action_list": action_list}
+        context = {
+            "action_list": action_list,
+            "history_first_url": history_url if after is not None else None,
+            "history_next_url": "%s?after=%s" % (history_url, versions[-1].id) if has_next else None,
+        }
         context.update(extra_context or {})
         return super(VersionAdmin, self).history_view(request, object_id, context)
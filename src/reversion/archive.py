@@ -0,0 +1,337 @@
+"""
+Archives of old revisions, kept in compressed files outside the database.
+
+An archive is a directory of append-only files, one per month, named after
+the month the revisions in it were created, for example
+revisions-2016-01.jsonl.gz. Each line of a file is a JSON object describing a
+revision, its meta objects, and all of its versions, with the full serialized
+data of each version. Revisions are written in blocks, each a separate gzip
+member, so the files can be read with standard tools such as zcat.
+
+An index of the archived versions, by content type and object id, is kept in
+a SQLite database in the same directory, so the versions of an object can be
+read without scanning the archive.
+"""
+
+from __future__ import unicode_literals
+
+import datetime, json, os, sqlite3, zlib
+
+from django.core import serializers
+from django.utils.dateparse import parse_datetime
+from django.utils.encoding import force_text, force_bytes, python_2_unicode_compatible
+
+from reversion.serialization import deserialize, is_fast_format
+
+
+INDEX_FILENAME = "index.sqlite3"
+
+# Window bits for a zlib stream with a gzip header and trailer.
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+def get_archive_filename(date):
+    """Returns the name of the archive file for revisions created in the month of the given date."""
+    return "revisions-%04d-%02d.jsonl.gz" % (date.year, date.month)
+
+
+def get_content_type_label(content_type):
+    """Returns a label identifying the given content type, that does not depend on its primary key."""
+    return "%s.%s" % (content_type.app_label, content_type.model)
+
+
+def get_revision_data(revision):
+    """Returns a JSON-serializable dict describing the given revision and its versions."""
+    return get_revisions_data([revision], revision._state.db)[0]
+
+
+def get_revisions_data(revisions, db=None):
+    """
+    Returns a list of JSON-serializable dicts describing the given revisions and their versions.
+
+    The delta chains of all the versions are resolved together, so prefetch
+    the versions of the revisions, with their content types and shared data.
+    The revision meta objects are serialized with them, with one query per
+    meta model.
+    """
+    from reversion.models import _load_serialized_data
+    _load_serialized_data([
+        version
+        for revision
+        in revisions
+        for version
+        in revision.version_set.all()
+    ], db)
+    revision_meta = _get_revision_meta(revisions, db)
+    return [_get_revision_data(revision, revision_meta.get(revision.pk, [])) for revision in revisions]
+
+
+def _get_revision_meta_fields():
+    """Returns the fields of the models that store meta data about revisions, added with add_meta()."""
+    from reversion.models import Revision, Version
+    return [
+        related_object.field
+        for related_object
+        in Revision._meta.get_fields()
+        if related_object.auto_created
+        and not related_object.concrete
+        and (related_object.one_to_many or related_object.one_to_one)
+        and related_object.related_model is not Version
+    ]
+
+
+def _get_revision_meta(revisions, db=None):
+    """Returns a dict mapping the primary keys of the given revisions to their serialized meta objects."""
+    revision_meta = {}
+    revision_ids = [revision.pk for revision in revisions]
+    for field in _get_revision_meta_fields():
+        meta_objects = field.model._default_manager.using(db).filter(**{
+            "%s__in" % field.name: revision_ids,
+        }).order_by("pk")
+        for meta_object in meta_objects:
+            revision_meta.setdefault(getattr(meta_object, field.attname), []).append(meta_object)
+    return dict(
+        (revision_id, json.loads(serializers.serialize("json", meta_objects)))
+        for revision_id, meta_objects
+        in revision_meta.items()
+    )
+
+
+def _get_revision_data(revision, meta=()):
+    """Returns a JSON-serializable dict describing the given revision and its versions, which must already be loaded."""
+    return {
+        "id": revision.pk,
+        "manager_slug": revision.manager_slug,
+        "date_created": revision.date_created.isoformat(),
+        "user_id": revision.user_id,
+        "comment": revision.comment,
+        "meta": list(meta),
+        "versions": [
+            {
+                "id": version.pk,
+                "content_type": get_content_type_label(version.content_type),
+                "object_id": version.object_id,
+                "format": version.format,
+                "serialized_data": version.get_serialized_data(),
+                "object_repr": version.object_repr,
+            }
+            for version
+            in revision.version_set.all()
+        ],
+    }
+
+
+def _connect_index(path):
+    """Opens the index of the archive at the given path, creating it if required."""
+    index = sqlite3.connect(os.path.join(path, INDEX_FILENAME))
+    index.execute(
+        "CREATE TABLE IF NOT EXISTS archived_revision ("
+            "revision_id INTEGER PRIMARY KEY, "
+            "date_created TEXT NOT NULL, "
+            "filename TEXT NOT NULL, "
+            "block_offset INTEGER NOT NULL, "
+            "block_length INTEGER NOT NULL, "
+            "line INTEGER NOT NULL"
+        ")"
+    )
+    index.execute(
+        "CREATE TABLE IF NOT EXISTS archived_version ("
+            "version_id INTEGER PRIMARY KEY, "
+            "revision_id INTEGER NOT NULL, "
+            "content_type TEXT NOT NULL, "
+            "object_id TEXT NOT NULL"
+        ")"
+    )
+    index.execute(
+        "CREATE INDEX IF NOT EXISTS archived_version_object "
+        "ON archived_version (content_type, object_id, revision_id)"
+    )
+    return index
+
+
+class ArchiveWriter(object):
+
+    """
+    Appends revisions to an archive.
+
+    Revisions are buffered until flush() is called, which writes a block to
+    each archive file, and then records the block in the index.
+    """
+
+    def __init__(self, path):
+        """Opens the archive at the given path, creating the directory if required."""
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        self.path = path
+        self._index = _connect_index(path)
+        self._buffers = {}
+
+    def write(self, revision_data):
+        """Buffers the given revision data, as returned by get_revision_data()."""
+        date_created = revision_data["date_created"]
+        filename = get_archive_filename(datetime.date(int(date_created[:4]), int(date_created[5:7]), 1))
+        self._buffers.setdefault(filename, []).append(revision_data)
+
+    def flush(self):
+        """Writes the buffered revisions to the archive, and waits until they are on disk."""
+        for filename, revisions in sorted(self._buffers.items()):
+            lines = [json.dumps(revision_data, sort_keys=True) for revision_data in revisions]
+            compressor = zlib.compressobj(9, zlib.DEFLATED, GZIP_WBITS)
+            block = compressor.compress(force_bytes("".join(line + "\n" for line in lines))) + compressor.flush()
+            with open(os.path.join(self.path, filename), "ab") as handle:
+                handle.seek(0, os.SEEK_END)
+                block_offset = handle.tell()
+                handle.write(block)
+                handle.flush()
+                os.fsync(handle.fileno())
+            # Only index the revisions once they are safely on disk.
+            with self._index:
+                for line, revision_data in enumerate(revisions):
+                    self._index.execute(
+                        "INSERT OR REPLACE INTO archived_revision VALUES (?, ?, ?, ?, ?, ?)",
+                        (revision_data["id"], revision_data["date_created"], filename, block_offset, len(block), line),
+                    )
+                    self._index.executemany(
+                        "INSERT OR REPLACE INTO archived_version VALUES (?, ?, ?, ?)",
+                        [
+                            (version_data["id"], revision_data["id"], version_data["content_type"], version_data["object_id"])
+                            for version_data
+                            in revision_data["versions"]
+                        ],
+                    )
+        self._buffers = {}
+
+    def close(self):
+        """Flushes any buffered revisions, and closes the archive."""
+        self.flush()
+        self._index.close()
+
+
+@python_2_unicode_compatible
+class ArchivedVersion(object):
+
+    """A version read from an archive, with the same data access methods as a Version."""
+
+    def __init__(self, revision_data, version_data):
+        """Initializes the archived version."""
+        self.revision_data = revision_data
+        self.pk = self.id = version_data["id"]
+        self.revision_id = revision_data["id"]
+        self.date_created = parse_datetime(revision_data["date_created"])
+        self.comment = revision_data["comment"]
+        self.user_id = revision_data["user_id"]
+        self.content_type = version_data["content_type"]
+        self.object_id = version_data["object_id"]
+        self.format = version_data["format"]
+        self.serialized_data = version_data["serialized_data"]
+        self.object_repr = version_data["object_repr"]
+
+    def get_serialized_data(self):
+        """Returns the serialized form of this version."""
+        return self.serialized_data
+
+    @property
+    def object_version(self):
+        """The stored version of the model."""
+        if is_fast_format(self.format):
+            return deserialize(self.serialized_data)
+        data = force_text(self.serialized_data.encode("utf8"))
+        return list(serializers.deserialize(self.format, data, ignorenonexistent=True))[0]
+
+    @property
+    def field_dict(self):
+        """
+        A dictionary mapping field names to field values in this version
+        of the model.
+
+        This method will follow parent links to other versions in the same
+        archived revision, if present.
+        """
+        object_version = self.object_version
+        obj = object_version.object
+        result = {}
+        for field in obj._meta.fields:
+            result[field.name] = field.value_from_object(obj)
+        result.update(object_version.m2m_data)
+        # Add parent data.
+        for parent_class, field in obj._meta.concrete_model._meta.parents.items():
+            if obj._meta.proxy and parent_class == obj._meta.concrete_model:
+                continue
+            content_type = "%s.%s" % (parent_class._meta.app_label, parent_class._meta.model_name)
+            if field:
+                parent_id = force_text(getattr(obj, field.attname))
+            else:
+                parent_id = force_text(obj.pk)
+            for version_data in self.revision_data["versions"]:
+                if version_data["content_type"] == content_type and version_data["object_id"] == parent_id:
+                    result.update(ArchivedVersion(self.revision_data, version_data).field_dict)
+        return result
+
+    def __str__(self):
+        """Returns a string representation."""
+        return self.object_repr
+
+
+class Archive(object):
+
+    """Reads revisions and versions from an archive, using its index."""
+
+    def __init__(self, path):
+        """Opens the archive at the given path."""
+        self.path = path
+        self._index = _connect_index(path)
+        self._blocks = {}
+
+    def _read_block(self, filename, block_offset, block_length):
+        """Returns the lines of the given block of an archive file."""
+        key = (filename, block_offset)
+        if key not in self._blocks:
+            with open(os.path.join(self.path, filename), "rb") as handle:
+                handle.seek(block_offset)
+                block = zlib.decompress(handle.read(block_length), GZIP_WBITS)
+            # Only the most recently read block is kept.
+            self._blocks = {key: force_text(block).splitlines()}
+        return self._blocks[key]
+
+    def get_revision(self, revision_id):
+        """Returns the data of the given archived revision, as returned by get_revision_data(), or None."""
+        row = self._index.execute(
+            "SELECT filename, block_offset, block_length, line FROM archived_revision WHERE revision_id = ?",
+            (revision_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        filename, block_offset, block_length, line = row
+        return json.loads(self._read_block(filename, block_offset, block_length)[line])
+
+    def get_for_object_reference(self, model, object_id):
+        """
+        Returns a list of the archived versions of the given object reference.
+
+        The results are returned with the most recent versions first.
+        """
+        content_type = "%s.%s" % (model._meta.app_label, model._meta.model_name)
+        rows = self._index.execute(
+            "SELECT version_id, revision_id FROM archived_version "
+            "WHERE content_type = ? AND object_id = ? ORDER BY revision_id DESC",
+            (content_type, force_text(object_id)),
+        ).fetchall()
+        versions = []
+        for version_id, revision_id in rows:
+            revision_data = self.get_revision(revision_id)
+            for version_data in revision_data["versions"]:
+                if version_data["id"] == version_id:
+                    versions.append(ArchivedVersion(revision_data, version_data))
+        return versions
+
+    def get_for_object(self, obj):
+        """
+        Returns a list of the archived versions of the given object.
+
+        The results are returned with the most recent versions first.
+        """
+        return self.get_for_object_reference(obj.__class__, obj.pk)
+
+    def close(self):
+        """Closes the archive."""
+        self._index.close()
@@ -0,0 +1,63 @@
+"""Compression codecs for serialized version data."""
+
+from __future__ import unicode_literals
+
+import base64, zlib
+
+from django.utils.encoding import force_bytes, force_text
+
+from reversion.errors import RegistrationError
+
+
+_codecs = {}
+
+
+def register_codec(name, compress_func, decompress_func):
+    """
+    Registers a compression codec with the given name.
+
+    The compress and decompress functions should both accept and return bytes.
+    """
+    _codecs[name] = (compress_func, decompress_func)
+
+
+def get_codec(name):
+    """Returns the (compress, decompress) function pair registered with the given name."""
+    try:
+        return _codecs[name]
+    except KeyError:
+        raise RegistrationError("No compression codec has been registered with the name {name!r}".format(
+            name = name,
+        ))
+
+
+def compress(compression, serialized_data):
+    """
+    Compresses the serialized data with the named codec.
+
+    The compressed data is base64-encoded, so that it can be stored in a text column.
+    """
+    if not compression:
+        return serialized_data
+    compress_func, _ = get_codec(compression)
+    return force_text(base64.b64encode(compress_func(force_bytes(serialized_data))))
+
+
+def decompress(compression, data):
+    """Reverses compress()."""
+    if not compression:
+        return data
+    _, decompress_func = get_codec(compression)
+    return force_text(decompress_func(base64.b64decode(force_bytes(data))))
+
+
+# Codecs from the standard library.
+
+register_codec("zlib", zlib.compress, zlib.decompress)
+
+try:
+    import lzma
+except ImportError:  # Python 2 pragma: no cover
+    pass
+else:
+    register_codec("lzma", lzma.compress, lzma.decompress)
@@ -0,0 +1,53 @@
+"""Field-level delta encoding for serialized version data."""
+
+from __future__ import unicode_literals
+
+import json
+from collections import OrderedDict
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from reversion.serialization import dump_object, load_object
+
+
+def make_delta(base_data, serialized_data):
+    """
+    Returns a delta that turns base_data into serialized_data.
+
+    Both arguments must be single objects serialized with the json format. If
+    the data cannot be reproduced exactly from a delta, None is returned, and
+    the data should be stored in full.
+    """
+    try:
+        base_obj = load_object(base_data)
+        obj = load_object(serialized_data)
+        base_fields = base_obj["fields"]
+        fields = obj["fields"]
+    except (ValueError, TypeError, KeyError):
+        return None
+    # The delta keeps the key order of the object, which differs between Django versions.
+    delta = OrderedDict(obj)
+    delta["fields"] = OrderedDict(
+        (name, value)
+        for name, value
+        in fields.items()
+        if name not in base_fields or base_fields[name] != value
+    )
+    delta["removed"] = [name for name in base_fields if name not in fields]
+    delta_data = json.dumps(delta, cls=DjangoJSONEncoder)
+    # Field order or formatting changes can't be expressed as a delta.
+    if apply_delta(base_data, delta_data) != serialized_data:
+        return None
+    return delta_data
+
+
+def apply_delta(base_data, delta_data):
+    """Reverses make_delta(), returning the full serialized data."""
+    obj = load_object(base_data)
+    delta = json.loads(delta_data, object_pairs_hook=OrderedDict)
+    fields = obj["fields"]
+    for name in delta.pop("removed"):
+        del fields[name]
+    fields.update(delta["fields"])
+    delta["fields"] = fields
+    return dump_object(delta)
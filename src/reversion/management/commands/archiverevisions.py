@@ -0,0 +1,111 @@
+from __future__ import unicode_literals
+
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from django.utils import timezone
+from django.utils.six.moves import input
+
+from reversion.archive import ArchiveWriter, get_revisions_data
+from reversion.management.commands.deleterevisions import delete_revisions_in_batches
+from reversion.models import Revision
+
+
+class Command(BaseCommand):
+    help = """Moves revisions older than a given date or number of days to an archive, and deletes them from the database.
+
+The archive is a directory of compressed JSON lines files, one per month, with an index of the archived versions.
+Use reversion.archive.Archive to read the versions of an object from the archive.
+
+Examples:
+
+        archiverevisions --directory=/var/archive/reversion --days=365
+
+    That will archive and delete every revision created more than 365 days ago.
+"""
+
+    def add_arguments(self, parser):
+        parser.add_argument("--directory",
+            help="The directory containing the archive. It is created if required.")
+        parser.add_argument("-t", "--date",
+            help="Archive only revisions older than the specify date. The date should be a valid date given in the ISO format (YYYY-MM-DD)")
+        parser.add_argument("-d", "--days",
+            default=0,
+            type=int,
+            help="Archive only revisions older than the specify number of days.")
+        parser.add_argument("-m", "--manager",
+            help="Archive revisions only from specified manager. Defaults from all managers.")
+        parser.add_argument("--batch-size",
+            default=500,
+            type=int,
+            help="The number of revisions to archive and delete at a time. Defaults to 500.")
+        parser.add_argument("-c", "--no-confirmation",
+            action="store_false",
+            dest="confirmation",
+            default=True,
+            help="Disable the confirmation before archiving revisions")
+        parser.add_argument("--database",
+            help='Nominates a database to archive revisions from.')
+
+    def handle(self, **options):
+        directory = options["directory"]
+        days = options["days"]
+        manager = options.get("manager")
+        batch_size = options["batch_size"]
+        database = options.get("database")
+        verbosity = int(options.get("verbosity", 1))
+        # Validate the arguments.
+        if not directory:
+            raise CommandError("You must give the directory of the archive with --directory.")
+        if options["date"]:
+            if days:
+                raise CommandError("You cannot use --date and --days at the same time. They are exclusive.")
+            try:
+                date = datetime.datetime.strptime(options["date"], "%Y-%m-%d")
+            except ValueError:
+                raise CommandError("The date you give (%s) is not a valid date. The date should be in the ISO format (YYYY-MM-DD)." % options["date"])
+            if timezone.is_naive(date) and timezone.is_aware(timezone.now()):
+                date = timezone.make_aware(date, timezone.get_current_timezone())
+        elif days:
+            date = timezone.now() - datetime.timedelta(days)
+        else:
+            raise CommandError("You must give the age of the revisions to archive with --date or --days.")
+        # Build the query.
+        revision_query = Revision.objects.using(database).filter(date_created__lt=date).order_by("pk")
+        if manager:
+            revision_query = revision_query.filter(manager_slug=manager)
+        # Ask confirmation.
+        if options["confirmation"]:
+            choice = input("Are you sure you want to archive and delete %s revision(s) older than %s? [y|N] " % (revision_query.count(), date.isoformat()))
+            if choice.lower() != "y":
+                print("Aborting revision archiving.")
+                return
+        # Archive the revisions, a batch at a time, only deleting them once they are in the archive.
+        writer = ArchiveWriter(directory)
+        revision_count = 0
+        version_count = 0
+        last_pk = None
+        try:
+            while True:
+                batch = revision_query if last_pk is None else revision_query.filter(pk__gt=last_pk)
+                revisions = list(batch.prefetch_related("version_set", "version_set__content_type", "version_set__blob")[:batch_size])
+                if not revisions:
+                    break
+                last_pk = revisions[-1].pk
+                for revision_data in get_revisions_data(revisions, database):
+                    writer.write(revision_data)
+                writer.flush()
+                deleted_revision_count, deleted_version_count = delete_revisions_in_batches(
+                    Revision.objects.using(database).filter(pk__in=[revision.pk for revision in revisions]),
+                    batch_size,
+                    verbosity = 0,
+                )
+                revision_count += deleted_revision_count
+                version_count += deleted_version_count
+                if verbosity >= 2:
+                    print("Archived %s revision(s) and %s model version(s) so far." % (revision_count, version_count))
+        finally:
+            writer.close()
+        if verbosity >= 1:
+            print("Archived %s revision(s) and %s model version(s)." % (revision_count, version_count))
@@ -1,5 +1,7 @@
 from __future__ import unicode_literals
 
+import multiprocessing
+import time
 from collections import OrderedDict
 from importlib import import_module
 
@@ -9,16 +11,138 @@ from django.core.exceptions import ImproperlyConfigured
 from django.core.management.base import BaseCommand
 from django.core.management.base import CommandError
 from django.contrib.contenttypes.models import ContentType
-from django.db import reset_queries
+from django.db import connections, reset_queries, transaction
 from django.utils import translation
 from django.utils.encoding import force_text
 
 from reversion.revisions import default_revision_manager
-from reversion.models import Version, has_int_pk
+from reversion.models import Version, InitialRevisionCheckpoint, get_object_id_field_name, get_object_id_hash
 
 get_app = lambda app_label: apps.get_app_config(app_label).models_module
 
 
+def get_pk_ranges(queryset, count):
+    """
+    Splits the given queryset into count ranges of primary keys of roughly equal size.
+
+    Each range is a (lower, upper) tuple, covering primary keys greater than
+    lower and less than or equal to upper. None means unbounded.
+    """
+    boundaries = [None]
+    if count > 1:
+        total = queryset.count()
+        if total:
+            for i in range(1, count):
+                boundaries.append(queryset.order_by("pk").values_list("pk", flat=True)[total * i // count])
+    boundaries.append(None)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def get_checkpoints(model_class, database=None, workers=1, resume=False):
+    """
+    Returns the incomplete checkpoints to create initial revisions for the given model from.
+
+    If resume is True, the checkpoints of a previous run are reused.
+    Otherwise, new checkpoints are created, one per worker.
+    """
+    content_type = ContentType.objects.db_manager(database).get_for_model(model_class)
+    checkpoints = InitialRevisionCheckpoint.objects.using(database).filter(content_type=content_type)
+    if resume and checkpoints.exists():
+        return list(checkpoints.filter(is_complete=False).order_by("pk"))
+    checkpoints.delete()
+    pk_field = model_class._meta.pk
+    return [
+        InitialRevisionCheckpoint.objects.using(database).create(
+            content_type = content_type,
+            lower_pk = None if lower is None else pk_field.value_to_string(model_class(pk=lower)),
+            upper_pk = None if upper is None else pk_field.value_to_string(model_class(pk=upper)),
+            last_pk = None if lower is None else pk_field.value_to_string(model_class(pk=lower)),
+        )
+        for lower, upper
+        in get_pk_ranges(model_class._default_manager.using(database), workers)
+    ]
+
+
+def create_initial_revisions(model_class, comment, batch_size, database=None, checkpoint=None, verbosity=1):
+    """
+    Creates initial revisions for the objects of the given model without versions.
+
+    The objects are streamed in batches of batch_size, ordered by primary key.
+    If a checkpoint is given, only the objects in its range after its last
+    processed object are included, and progress is recorded in the checkpoint
+    after each batch. Returns the number of revisions created.
+    """
+    content_type = ContentType.objects.db_manager(database).get_for_model(model_class)
+    object_id_field_name = get_object_id_field_name(model_class)
+    pk_field = model_class._meta.pk
+    versions = Version.objects.using(database).filter(content_type=content_type)
+    live_objs = model_class._default_manager.using(database).order_by("pk")
+    last_pk = None
+    if checkpoint is not None:
+        if checkpoint.last_pk is not None:
+            last_pk = pk_field.to_python(checkpoint.last_pk)
+        if checkpoint.upper_pk is not None:
+            live_objs = live_objs.filter(pk__lte=pk_field.to_python(checkpoint.upper_pk))
+    processed_count = 0
+    created_count = 0
+    start_time = time.time()
+    while True:
+        batch = live_objs if last_pk is None else live_objs.filter(pk__gt=last_pk)
+        objs = list(batch[:batch_size])
+        if not objs:
+            break
+        last_pk = objs[-1].pk
+        batch_processed_count = len(objs)
+        # Skip objects that already have versions.
+        if object_id_field_name == "object_id_hash":
+            object_ids = [get_object_id_hash(obj.pk) for obj in objs]
+        else:
+            object_ids = [obj.pk for obj in objs]
+        versioned_ids = set(versions.filter(**{
+            object_id_field_name + "__in": object_ids,
+        }).values_list("object_id", flat=True).iterator())
+        objs = [obj for obj in objs if force_text(obj.pk) not in versioned_ids]
+        # Save the versions and the progress made together, so an interrupted run can be resumed.
+        with transaction.atomic(using=database):
+            if objs:
+                try:
+                    default_revision_manager.save_revisions(objs, comment=comment, db=database)
+                except:
+                    print("ERROR: Could not save initial versions for %s %s to %s." % (model_class.__name__, objs[0].pk, objs[-1].pk))
+                    raise
+            if checkpoint is not None:
+                checkpoint.last_pk = pk_field.value_to_string(model_class(pk=last_pk))
+                checkpoint.processed_count += batch_processed_count
+                checkpoint.created_count += len(objs)
+                checkpoint.save(using=database)
+        processed_count += batch_processed_count
+        created_count += len(objs)
+        reset_queries()
+        if verbosity >= 2:
+            elapsed = max(time.time() - start_time, 0.001)
+            print("Processed %s object(s), created %s revision(s) (%.1f objects per second)." % (processed_count, created_count, processed_count / elapsed))
+    if checkpoint is not None:
+        checkpoint.is_complete = True
+        checkpoint.save(using=database)
+    return created_count
+
+
+def _create_initial_revisions_worker(args):
+    """Creates initial revisions from a checkpoint in a worker process."""
+    app_label, model_name, comment, batch_size, database, checkpoint_pk, verbosity = args
+    try:
+        return create_initial_revisions(
+            apps.get_model(app_label, model_name),
+            comment,
+            batch_size,
+            database,
+            InitialRevisionCheckpoint.objects.using(database).get(pk=checkpoint_pk),
+            verbosity,
+        )
+    finally:
+        connections.close_all()
+
+
 class Command(BaseCommand):
     help = "Creates initial revisions for a given app [and model]."
 
@@ -36,6 +160,15 @@ class Command(BaseCommand):
             help="For large sets of data, revisions will be populated in batches. Defaults to 500.")
         parser.add_argument("--database",
             help='Nominates a database to create revisions in.')
+        parser.add_argument("--workers",
+            action="store",
+            type=int,
+            default=1,
+            help="Split the objects of each model into ranges of primary keys, processed by this many worker processes. Defaults to 1.")
+        parser.add_argument("--resume",
+            action="store_true",
+            default=False,
+            help="Resume from the checkpoints recorded by a previous, interrupted run, instead of starting again.")
 
     def handle(self, *app_labels, **options):
 
@@ -45,6 +178,8 @@ class Command(BaseCommand):
         comment = options["comment"]
         batch_size = options["batch_size"]
         database = options.get('database')
+        workers = options.get("workers") or 1
+        resume = options.get("resume", False)
 
         verbosity = int(options.get("verbosity", 1))
         app_list = OrderedDict()
@@ -90,12 +225,12 @@ class Command(BaseCommand):
         # Create revisions.
         for app, model_classes in app_list.items():
             for model_class in model_classes:
-                self.create_initial_revisions(app, model_class, comment, batch_size, verbosity, database=database)
+                self.create_initial_revisions(app, model_class, comment, batch_size, verbosity, database=database, workers=workers, resume=resume)
 
         # Go back to default language
         translation.deactivate()
 
-    def create_initial_revisions(self, app, model_class, comment, batch_size, verbosity=2, database=None, **kwargs):
+    def create_initial_revisions(self, app, model_class, comment, batch_size, verbosity=2, database=None, workers=1, resume=False, **kwargs):
         """Creates the set of initial revisions for the given model."""
         # Import the relevant admin module.
         try:
@@ -106,37 +241,26 @@ class Command(BaseCommand):
         if default_revision_manager.is_registered(model_class):
             if verbosity >= 2:
                 print("Creating initial revision(s) for model %s ..."  % (force_text(model_class._meta.verbose_name)))
-            created_count = 0
-            content_type = ContentType.objects.db_manager(database).get_for_model(model_class)
-            versioned_pk_queryset = Version.objects.using(database).filter(content_type=content_type).all()
-            live_objs = model_class._default_manager.using(database).all()
-            if has_int_pk(model_class):
-                # We can do this as a fast database join!
-                live_objs = live_objs.exclude(
-                    pk__in = versioned_pk_queryset.values_list("object_id_int", flat=True)
-                )
+            checkpoints = get_checkpoints(model_class, database, workers, resume)
+            if workers > 1 and len(checkpoints) > 1:
+                # The worker processes must not share the database connections of this process.
+                connections.close_all()
+                pool = multiprocessing.Pool(min(workers, len(checkpoints)))
+                try:
+                    created_count = sum(pool.map(_create_initial_revisions_worker, [
+                        (model_class._meta.app_label, model_class._meta.model_name, comment, batch_size, database, checkpoint.pk, verbosity)
+                        for checkpoint
+                        in checkpoints
+                    ]))
+                finally:
+                    pool.close()
+                    pool.join()
             else:
-                # This join has to be done as two separate queries.
-                live_objs = live_objs.exclude(
-                    pk__in = list(versioned_pk_queryset.values_list("object_id", flat=True).iterator())
+                created_count = sum(
+                    create_initial_revisions(model_class, comment, batch_size, database, checkpoint, verbosity)
+                    for checkpoint
+                    in checkpoints
                 )
-            # Save all the versions.
-            ids = list(live_objs.values_list(model_class._meta.pk.name, flat=True))
-            total = len(ids)
-            for i in range(0, total, batch_size):
-                chunked_ids = ids[i:i+batch_size]
-                objects = live_objs.in_bulk(chunked_ids)
-                for id, obj in objects.items():
-                    try:
-                        default_revision_manager.save_revision((obj,), comment=comment, db=database)
-                    except:
-                        print("ERROR: Could not save initial version for %s %s." % (model_class.__name__, obj.pk))
-                        raise
-                    created_count += 1
-                reset_queries()
-                if verbosity >= 2:
-                    print("Created %s of %s." % (created_count, total))
-
             # Print out a message, if feeling verbose.
             if verbosity >= 2:
                 print("Created %s initial revision(s) for model %s." % (created_count, force_text(model_class._meta.verbose_name)))
@@ -1,18 +1,165 @@
 from __future__ import unicode_literals
 
-import datetime, operator
+import datetime, operator, re, sqlite3, time
 from functools import reduce
 
 from django.core.management.base import BaseCommand
 from django.core.management.base import CommandError
-from django.db.models import Q, Count
+from django.db import connections, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
 from django.contrib.contenttypes.models import ContentType
 from django.utils.six.moves import input
 
-from reversion.models import Revision, Version
+from reversion.models import Revision, Version, VersionBlob
 from django.db.utils import DatabaseError
 
 
+# The batch size used by --continuous if --batch-size is not given.
+CONTINUOUS_BATCH_SIZE = 1000
+
+
+class RawSubquery(RawSQL):
+
+    """A raw SQL subquery, usable as the value of an __in lookup."""
+
+    def as_sql(self, compiler, connection):
+        return self.sql, self.params
+
+
+def parse_mysql_server_info(server_info):
+    """
+    Returns a tuple of whether the given MySQL server version string is for
+    MariaDB, and its version number as a tuple of integers.
+    """
+    # Older MariaDB servers prefix their version with 5.5.5- for compatibility.
+    versions = re.findall(r"(\d+)\.(\d+)\.(\d+)", server_info)
+    is_mariadb = "mariadb" in server_info.lower()
+    version = versions[-1] if is_mariadb else versions[0]
+    return is_mariadb, tuple(int(part) for part in version)
+
+
+def supports_window_functions(connection):
+    """Checks whether the given database connection supports ROW_NUMBER() OVER (...)."""
+    if connection.vendor in ("postgresql", "oracle"):
+        return True
+    if connection.vendor == "sqlite":
+        return sqlite3.sqlite_version_info >= (3, 25, 0)
+    if connection.vendor == "mysql":
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT VERSION()")
+            is_mariadb, version = parse_mysql_server_info(cursor.fetchone()[0])
+        # MariaDB reports its own version numbers, and supports window functions from 10.2.
+        if is_mariadb:
+            return version >= (10, 2)
+        return version >= (8, 0, 2)
+    return False
+
+
+def get_pruned_revision_ids(versions, keep):
+    """
+    Returns a subquery selecting the ids of revisions with a version that is
+    not among the keep most recent versions of its object.
+
+    Only the given versions are candidates for pruning. The subquery uses a
+    window function where the database supports it, and a correlated count of
+    newer versions otherwise, so no ids are loaded into memory. The count
+    matches versions on the indexed object id columns.
+    """
+    connection = connections[versions.db]
+    qn = connection.ops.quote_name
+    candidates_sql, params = versions.values_list(
+        "revision_id",
+        "content_type_id",
+        "object_id",
+        "object_id_int",
+        "object_id_uuid",
+        "object_id_hash",
+        "revision__date_created",
+    ).order_by().query.sql_with_params()
+    if supports_window_functions(connection):
+        sql = (
+            "SELECT ranked.revision_id FROM ("
+                "SELECT candidate.revision_id, ROW_NUMBER() OVER ("
+                    "PARTITION BY candidate.content_type_id, candidate.object_id "
+                    "ORDER BY candidate.date_created DESC, candidate.revision_id DESC"
+                ") AS version_rank FROM (%s) candidate"
+            ") ranked WHERE ranked.version_rank > %%s"
+        ) % candidates_sql
+    else:
+        sql = (
+            "SELECT candidate.revision_id FROM (%s) candidate WHERE ("
+                "SELECT COUNT(*) FROM {version} newer "
+                "INNER JOIN {revision} newer_revision ON newer.revision_id = newer_revision.id "
+                "WHERE newer.content_type_id = candidate.content_type_id "
+                "AND ("
+                    "newer.object_id_int = candidate.object_id_int "
+                    "OR newer.object_id_uuid = candidate.object_id_uuid "
+                    "OR ("
+                        "candidate.object_id_int IS NULL AND candidate.object_id_uuid IS NULL "
+                        "AND newer.object_id_hash = candidate.object_id_hash "
+                        "AND newer.object_id = candidate.object_id"
+                    ")"
+                ") "
+                "AND (newer_revision.date_created > candidate.date_created OR ("
+                    "newer_revision.date_created = candidate.date_created "
+                    "AND newer.revision_id > candidate.revision_id"
+                "))"
+            ") >= %%s"
+        ).format(
+            version = qn(Version._meta.db_table),
+            revision = qn(Revision._meta.db_table),
+        ) % candidates_sql
+    return RawSubquery(sql, tuple(params) + (keep,))
+
+
+def delete_revisions_in_batches(revision_query, batch_size, sleep=0, verbosity=1, materialize=False):
+    """
+    Deletes the revisions in the given queryset, and their versions, in batches.
+
+    Each batch of at most batch_size revisions is deleted in its own
+    transaction, in primary key order, sleeping for the given number of
+    seconds between batches. Returns the number of revisions and versions deleted.
+
+    If materialize is True, the primary keys of all the revisions are read
+    once, before any are deleted, rather than querying for each batch. Use
+    this for expensive queries, or queries whose results change as revisions
+    are deleted, such as those pruning all but the most recent versions.
+    """
+    database = revision_query.db
+    revision_query = revision_query.order_by("pk").distinct()
+    if materialize:
+        all_revision_ids = list(revision_query.values_list("pk", flat=True))
+    last_pk = None
+    revision_count = 0
+    version_count = 0
+    while True:
+        if materialize:
+            revision_ids = all_revision_ids[revision_count:revision_count + batch_size]
+        else:
+            batch = revision_query if last_pk is None else revision_query.filter(pk__gt=last_pk)
+            revision_ids = list(batch.values_list("pk", flat=True)[:batch_size])
+        if not revision_ids:
+            break
+        last_pk = revision_ids[-1]
+        with transaction.atomic(using=database):
+            versions = Version.objects.using(database).filter(revision_id__in=revision_ids)
+            # Keep the delta chains of the remaining versions intact.
+            versions.detach_delta_chains()
+            blob_ids = set(versions.exclude(blob=None).values_list("blob_id", flat=True))
+            version_count += versions.count()
+            Revision.objects.using(database).filter(pk__in=revision_ids).delete()
+            # Delete shared version data that is no longer used by any version.
+            if blob_ids:
+                VersionBlob.objects.using(database).filter(pk__in=blob_ids, version__isnull=True).delete()
+        revision_count += len(revision_ids)
+        if verbosity >= 2:
+            print("Deleted %s revision(s) and %s model version(s) so far." % (revision_count, version_count))
+        if sleep:
+            time.sleep(sleep)
+    return revision_count, version_count
+
+
 class Command(BaseCommand):
     help = """Deletes revisions for a given app [and model] and/or before a specified delay or date.
     
@@ -37,6 +184,10 @@ Examples:
         deleterevisions myapp.mymodel --keep=10
         
     That will delete only revisions of myapp.model if there's more than 10 revisions for an object, keeping the 10 most recent revisons.
+
+        deleterevisions --days=365 --batch-size=1000 --sleep=0.5 --continuous --no-confirmation
+
+    That will delete revisions older than 365 days, 1000 at a time, pausing between batches, and check again for old revisions every hour.
 """
 
     def add_arguments(self, parser):
@@ -66,6 +217,22 @@ Examples:
             help="Delete revisions only from specified manager. Defaults from all managers.")
         parser.add_argument("--database",
             help='Nominates a database to delete revisions from.')
+        parser.add_argument("--batch-size",
+            default=0,
+            type=int,
+            help="Delete revisions in batches of this size, each in its own transaction. Defaults to deleting all revisions at once.")
+        parser.add_argument("--sleep",
+            default=0,
+            type=float,
+            help="The number of seconds to wait between batches.")
+        parser.add_argument("--continuous",
+            action="store_true",
+            default=False,
+            help="Keep running, deleting revisions again every --interval seconds. Requires --no-confirmation. Deletes revisions in batches of %s unless --batch-size is given." % CONTINUOUS_BATCH_SIZE)
+        parser.add_argument("--interval",
+            default=3600,
+            type=float,
+            help="The number of seconds to wait between runs in continuous mode. Defaults to 3600.")
 
     def handle(self, *app_labels, **options):
         days = options["days"]
@@ -74,6 +241,10 @@ Examples:
         confirmation = options["confirmation"]
         manager = options.get('manager')
         database = options.get('database')
+        batch_size = options.get("batch_size") or 0
+        sleep = options.get("sleep") or 0
+        continuous = options.get("continuous", False)
+        interval = options.get("interval", 3600)
         # I don't know why verbosity is not already an int in Django?
         try:
             verbosity = int(options["verbosity"])
@@ -92,8 +263,22 @@ Examples:
             except ValueError:
                 raise CommandError("The date you give (%s) is not a valid date. The date should be in the ISO format (YYYY-MM-DD)." % options["date"])
 
-        # Find the date from the days arguments.        
-        elif days:
+        if continuous and confirmation:
+            raise CommandError("You cannot use --continuous without --no-confirmation.")
+
+        if continuous:
+            # Never hold up other queries with a single huge delete on every run.
+            batch_size = batch_size or CONTINUOUS_BATCH_SIZE
+            while True:
+                self.delete_revisions(app_labels, date, days, keep, force, confirmation, manager, database, verbosity, batch_size, sleep)
+                time.sleep(interval)
+
+        return self.delete_revisions(app_labels, date, days, keep, force, confirmation, manager, database, verbosity, batch_size, sleep)
+
+    def delete_revisions(self, app_labels, date, days, keep, force, confirmation, manager, database, verbosity, batch_size=0, sleep=0):
+        """Deletes the revisions matching the given options."""
+        # Find the date from the days arguments.
+        if days:
             date = datetime.datetime.now() - datetime.timedelta(days)
 
         # Build the queries
@@ -139,26 +324,16 @@ Examples:
         if keep:
             objs = Version.objects.using(database).all()
 
-            # If app is specified, to speed up the loop on theses objects,
-            # get only the specified subset.
+            # If app is specified, only consider the versions of the specified subset.
             if app_labels:
                 if force:
                     objs = objs.filter(content_type__in=models)
                 else:
                     objs = objs.exclude(content_type__in=models)
 
-            # Get all the objects that have more than the maximum revisions
-            objs = objs.values("object_id", "content_type_id").annotate(total_ver=Count("object_id")).filter(total_ver__gt=keep)
-
-            revisions_not_keeped = set()
-
-            # Get all ids of the oldest revisions minus the max allowed
-            # revisions for all objects.
-            # Was not able to avoid this loop...
-            for obj in objs:
-                revisions_not_keeped.update(list(Version.objects.using(database).filter(content_type__id=obj["content_type_id"], object_id=obj["object_id"]).order_by("-revision__date_created").values_list("revision_id", flat=True)[keep:]))
-
-            revision_query = revision_query.filter(pk__in=revisions_not_keeped)
+            # Find the revisions of the oldest versions beyond the maximum
+            # allowed for each object, without a query per object.
+            revision_query = revision_query.filter(pk__in=get_pruned_revision_ids(objs, keep))
 
 
         # Prepare message if verbose
@@ -203,7 +378,17 @@ Examples:
         # Delete versions and revisions
         if verbosity > 0:
             print("Deleting revisions...")
-        
+
+        if batch_size:
+            revision_count, version_count = delete_revisions_in_batches(revision_query, batch_size, sleep, verbosity, materialize=bool(keep))
+            if verbosity > 0:
+                print("Deleted %s revision(s) and %s model version(s)." % (revision_count, version_count))
+                return "Done"
+            return
+
+        # Keep the delta chains of the remaining versions intact.
+        Version.objects.using(database).filter(revision__in=revision_query).detach_delta_chains()
+
         try:
             revision_query.delete()
         except DatabaseError:
@@ -211,6 +396,9 @@ Examples:
             print("Delete failed. Trying again with slower method.")
             for item in revision_query:
                 item.delete()
+
+        # Delete shared version data that is no longer used by any version.
+        VersionBlob.objects.using(database).filter(version__isnull=True).delete()
                 
         if verbosity > 0:
             return "Done"
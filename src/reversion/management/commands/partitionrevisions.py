@@ -0,0 +1,104 @@
+from __future__ import unicode_literals
+
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from django.db import connections, router
+from django.utils import timezone
+from django.utils.six.moves import input
+
+from reversion.models import Revision
+from reversion.partitions import (
+    supports_partitioning,
+    setup_partitioning,
+    create_partitions,
+    drop_partitions,
+    get_month_start,
+    add_months,
+)
+
+
+class Command(BaseCommand):
+    help = """Maintains the monthly partitions of the revision and version tables, on PostgreSQL 11 or later.
+
+On other databases, this command does nothing.
+
+Examples:
+
+        partitionrevisions --setup
+
+    That will convert the revision and version tables to partitioned tables, and create partitions for the next 3 months.
+
+        partitionrevisions --months-ahead=6
+
+    That will create any missing partitions for the next 6 months. Run this regularly, for example once a day.
+
+        partitionrevisions --keep-months=12
+
+    That will drop the partitions holding only revisions more than 12 months old.
+"""
+
+    def add_arguments(self, parser):
+        parser.add_argument("--setup",
+            action="store_true",
+            default=False,
+            help="Convert the revision and version tables to partitioned tables. The existing rows are kept in a single partition.")
+        parser.add_argument("--months-ahead",
+            default=3,
+            type=int,
+            help="Create partitions for this month and this number of months ahead. Defaults to 3.")
+        parser.add_argument("--drop-before",
+            help="Drop the partitions holding only revisions older than the given date. The date should be given in the ISO format (YYYY-MM-DD).")
+        parser.add_argument("--keep-months",
+            default=0,
+            type=int,
+            help="Drop the partitions holding only revisions older than the given number of whole months.")
+        parser.add_argument("-c", "--no-confirmation",
+            action="store_false",
+            dest="confirmation",
+            default=True,
+            help="Disable the confirmation before dropping partitions")
+        parser.add_argument("--database",
+            help='Nominates a database containing the revisions.')
+
+    def handle(self, **options):
+        database = options.get("database") or router.db_for_write(Revision)
+        months_ahead = options["months_ahead"]
+        keep_months = options["keep_months"]
+        confirmation = options["confirmation"]
+        verbosity = int(options.get("verbosity", 1))
+        # Validate the arguments.
+        before = None
+        if options["drop_before"]:
+            if keep_months:
+                raise CommandError("You cannot use --drop-before and --keep-months at the same time. They are exclusive.")
+            try:
+                before = get_month_start(datetime.datetime.strptime(options["drop_before"], "%Y-%m-%d"))
+            except ValueError:
+                raise CommandError("The date you give (%s) is not a valid date. The date should be in the ISO format (YYYY-MM-DD)." % options["drop_before"])
+        elif keep_months:
+            before = add_months(timezone.now(), -keep_months)
+        # Partitioning is a no-op on other databases.
+        if not supports_partitioning(connections[database]):
+            if verbosity >= 1:
+                print("Partitioning is only supported on PostgreSQL 11 or later. Nothing to do.")
+            return
+        # Create the partitions.
+        if options["setup"]:
+            partitions = setup_partitioning(database, months_ahead=months_ahead)
+        else:
+            partitions = create_partitions(database, months=months_ahead + 1)
+        if verbosity >= 1:
+            for partition in partitions:
+                print("Created partition %s." % partition)
+        # Drop the expired partitions.
+        if before is not None:
+            if confirmation:
+                choice = input("Are you sure you want to drop the partitions of revisions before %s? [y|N] " % before.date().isoformat())
+                if choice.lower() != "y":
+                    print("Aborting partition drop.")
+                    return
+            for partition in drop_partitions(before, database):
+                if verbosity >= 1:
+                    print("Dropped partition %s." % partition)
@@ -0,0 +1,49 @@
+from __future__ import unicode_literals
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from django.utils.encoding import force_text
+
+from reversion.revisions import RevisionManager
+
+
+class Command(BaseCommand):
+    help = """Rebuilds the latest version pointers for models registered with track_latest_version=True.
+
+Run this after enabling track_latest_version for a model that already has versions.
+"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('args', metavar='app_label', nargs='*',
+            help="Optional apps or app.Model list.")
+        parser.add_argument("--database",
+            help='Nominates a database containing the revisions.')
+        parser.add_argument("--model-db",
+            help='Nominates a database containing the models. Defaults to the --database option.')
+
+    def handle(self, *app_labels, **options):
+        database = options.get("database")
+        model_db = options.get("model_db")
+        verbosity = int(options.get("verbosity", 1))
+        # Resolve the requested models.
+        models = set()
+        app_configs = set()
+        for label in app_labels:
+            try:
+                if "." in label:
+                    models.add(apps.get_model(label))
+                else:
+                    app_configs.add(apps.get_app_config(label))
+            except (LookupError, ValueError):
+                raise CommandError("Unknown app or model: %s" % label)
+        # Rebuild the pointers.
+        for _, manager in RevisionManager.get_created_managers():
+            for model_class in manager.get_registered_models():
+                if not manager.get_adapter(model_class).track_latest_version:
+                    continue
+                if app_labels and model_class not in models and apps.get_app_config(model_class._meta.app_label) not in app_configs:
+                    continue
+                count = manager.update_latest_versions(model_class, db=database, model_db=model_db)
+                if verbosity >= 2:
+                    print("Updated %s latest version(s) for model %s." % (count, force_text(model_class._meta.verbose_name)))
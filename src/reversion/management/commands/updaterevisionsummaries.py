@@ -0,0 +1,78 @@
+from __future__ import unicode_literals
+
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import models, transaction
+from django.db.models import Case, When, Value
+
+from reversion.models import Revision, Version, get_revision_summary, REVISION_SUMMARY_LENGTH
+
+
+def update_revision_summaries(revision_query, batch_size, verbosity=1):
+    """
+    Stores the summaries of the revisions in the given queryset that have none.
+
+    Each batch of at most batch_size revisions is updated with a single
+    query, in its own transaction, in primary key order. Returns the number
+    of revisions updated.
+    """
+    database = revision_query.db
+    revision_query = revision_query.filter(summary__isnull=True).order_by("pk")
+    last_pk = None
+    revision_count = 0
+    while True:
+        batch = revision_query if last_pk is None else revision_query.filter(pk__gt=last_pk)
+        revision_ids = list(batch.values_list("pk", flat=True)[:batch_size])
+        if not revision_ids:
+            break
+        last_pk = revision_ids[-1]
+        # Only keep as many string representations as the summary can hold.
+        object_reprs = defaultdict(list)
+        summary_lengths = defaultdict(int)
+        versions = Version.objects.using(database).filter(
+            revision_id__in = revision_ids,
+        ).order_by("revision_id", "pk").values_list("revision_id", "object_repr")
+        for revision_id, object_repr in versions.iterator():
+            if summary_lengths[revision_id] <= REVISION_SUMMARY_LENGTH:
+                if object_reprs[revision_id]:
+                    summary_lengths[revision_id] += len(", ")
+                object_reprs[revision_id].append(object_repr)
+                summary_lengths[revision_id] += len(object_repr)
+        with transaction.atomic(using=database):
+            Revision.objects.using(database).filter(pk__in=revision_ids, summary__isnull=True).update(summary=Case(
+                *[
+                    When(pk=revision_id, then=Value(get_revision_summary(object_reprs[revision_id])))
+                    for revision_id
+                    in revision_ids
+                ],
+                output_field = models.TextField()
+            ))
+        revision_count += len(revision_ids)
+        if verbosity >= 2:
+            print("Updated the summaries of %s revision(s) so far." % revision_count)
+    return revision_count
+
+
+class Command(BaseCommand):
+    help = """Stores the summaries of revisions saved before summaries were stored.
+
+Revisions without a summary build their string representation from their versions, with a query per revision.
+Run this once after upgrading. It can be interrupted, and carries on from where it stopped when run again.
+"""
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database",
+            help='Nominates a database containing the revisions.')
+        parser.add_argument("--batch-size",
+            default=250,
+            type=int,
+            help="The number of revisions to update at a time. Defaults to 250.")
+
+    def handle(self, *args, **options):
+        database = options.get("database")
+        batch_size = options.get("batch_size") or 250
+        verbosity = int(options.get("verbosity", 1))
+        revision_count = update_revision_summaries(Revision.objects.using(database), batch_size, verbosity)
+        if verbosity >= 1:
+            print("Updated the summaries of %s revision(s)." % revision_count)
@@ -14,12 +14,17 @@ class RevisionMiddleware(object):  # pragma: no cover
 
     """Wraps the entire request in a revision."""
 
+    # Whether to save revisions after the request's transaction commits, using the revision writer.
+    deferred = False
+
     def process_request(self, request):
         """Starts a new revision."""
         if request.META.get(REVISION_MIDDLEWARE_FLAG, False):
             raise ImproperlyConfigured("RevisionMiddleware can only be included in MIDDLEWARE_CLASSES once.")
         request.META[REVISION_MIDDLEWARE_FLAG] = True
         revision_context_manager.start()
+        if self.deferred:
+            revision_context_manager.set_deferred(True)
 
     def _close_revision(self, request):
         """Closes the revision."""
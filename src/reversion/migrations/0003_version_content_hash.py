@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0001_initial'),
+        ('reversion', '0002_auto_20141216_1509'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='version',
+            name='content_hash',
+            field=models.CharField(help_text='A hash of the serialized data, used to detect duplicate versions.', max_length=40, blank=True),
+        ),
+        migrations.AlterIndexTogether(
+            name='version',
+            index_together=set([('content_type', 'object_id_int')]),
+        ),
+    ]
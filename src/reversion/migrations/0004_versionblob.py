@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reversion', '0003_version_content_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersionBlob',
+            fields=[
+                ('content_hash', models.CharField(help_text='A hash of the serialized data.', max_length=40, serialize=False, primary_key=True)),
+                ('serialized_data', models.TextField(help_text='The serialized form of the model.')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='version',
+            name='blob',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, blank=True, to='reversion.VersionBlob', help_text='The shared serialized data of this version, used instead of serialized_data if set.', null=True),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reversion', '0004_versionblob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='version',
+            name='compression',
+            field=models.CharField(help_text='The compression codec used for the serialized data, if any.', max_length=32, blank=True),
+        ),
+        migrations.AddField(
+            model_name='versionblob',
+            name='compression',
+            field=models.CharField(help_text='The compression codec used for the serialized data, if any.', max_length=32, blank=True),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reversion', '0005_compression'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='version',
+            name='delta_base',
+            field=models.ForeignKey(related_name='+', on_delete=django.db.models.deletion.DO_NOTHING, db_constraint=False, blank=True, to='reversion.Version', help_text='The version that serialized_data is a delta against, or null if serialized_data is stored in full.', null=True),
+        ),
+        migrations.AddField(
+            model_name='version',
+            name='delta_depth',
+            field=models.PositiveIntegerField(default=0, help_text='The number of deltas between this version and the nearest full version.'),
+        ),
+    ]
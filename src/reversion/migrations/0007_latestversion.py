@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0001_initial'),
+        ('reversion', '0006_version_delta'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LatestVersion',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('manager_slug', models.CharField(default='default', help_text='The revision manager that saved the version.', max_length=191)),
+                ('object_id', models.TextField(help_text='Primary key of the model under version control.')),
+                ('object_id_int', models.IntegerField(blank=True, help_text="An integer version of the stored model's primary key, used for faster lookups.", null=True)),
+                ('is_deleted', models.BooleanField(default=False, help_text='Whether the object has been deleted since the latest version was saved.')),
+                ('content_type', models.ForeignKey(help_text='Content type of the model under version control.', on_delete=django.db.models.deletion.CASCADE, related_name='+', to='contenttypes.ContentType')),
+                ('revision', models.ForeignKey(help_text='The revision that contains the latest version of the object.', on_delete=django.db.models.deletion.CASCADE, related_name='+', to='reversion.Revision')),
+                ('version', models.OneToOneField(help_text='The latest version of the object.', on_delete=django.db.models.deletion.CASCADE, related_name='+', to='reversion.Version')),
+            ],
+        ),
+        migrations.AlterIndexTogether(
+            name='latestversion',
+            index_together=set([('content_type', 'is_deleted'), ('content_type', 'object_id_int')]),
+        ),
+    ]
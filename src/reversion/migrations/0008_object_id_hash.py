@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import hashlib
+
+from django.db import models, migrations
+from django.db.models import Case, When, Value
+from django.utils.encoding import force_bytes
+
+
+# The number of versions hashed in each statement, on databases that cannot hash them in SQL.
+BATCH_SIZE = 300
+
+
+def populate_object_id_hash(apps, schema_editor):
+    # Versions of models with an integer primary key are looked up by object_id_int, so only hash the rest.
+    connection = schema_editor.connection
+    db = connection.alias
+    qn = schema_editor.quote_name
+    for model_name in ("Version", "LatestVersion"):
+        model = apps.get_model("reversion", model_name)
+        if connection.vendor == "mysql":
+            # MySQL can hash the primary keys itself, in a single statement.
+            schema_editor.execute(
+                "UPDATE {table} SET {object_id_hash} = SHA1({object_id}) WHERE {object_id_int} IS NULL AND {object_id_hash} = ''".format(
+                    table = qn(model._meta.db_table),
+                    object_id_hash = qn("object_id_hash"),
+                    object_id = qn("object_id"),
+                    object_id_int = qn("object_id_int"),
+                )
+            )
+            continue
+        # Otherwise, hash the primary keys in batches, with one statement per batch.
+        unhashed = model.objects.using(db).filter(
+            object_id_int__isnull = True,
+            object_id_hash = "",
+        ).order_by("pk")
+        last_pk = None
+        while True:
+            batch = unhashed if last_pk is None else unhashed.filter(pk__gt=last_pk)
+            rows = list(batch.values_list("pk", "object_id")[:BATCH_SIZE])
+            if not rows:
+                break
+            last_pk = rows[-1][0]
+            model.objects.using(db).filter(pk__in=[pk for pk, _ in rows]).update(object_id_hash=Case(
+                *[
+                    When(pk=pk, then=Value(hashlib.sha1(force_bytes(object_id)).hexdigest()))
+                    for pk, object_id
+                    in rows
+                ],
+                output_field = models.CharField(max_length=40)
+            ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reversion', '0007_latestversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='latestversion',
+            name='object_id_hash',
+            field=models.CharField(blank=True, help_text="A hash of the stored model's primary key, used for faster lookups.", max_length=40),
+        ),
+        migrations.AddField(
+            model_name='version',
+            name='object_id_hash',
+            field=models.CharField(blank=True, help_text="A hash of the stored model's primary key, used for faster lookups.", max_length=40),
+        ),
+        migrations.RunPython(populate_object_id_hash, migrations.RunPython.noop),
+        migrations.AlterIndexTogether(
+            name='latestversion',
+            index_together=set([('content_type', 'is_deleted'), ('content_type', 'object_id_hash'), ('content_type', 'object_id_int')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='version',
+            index_together=set([('content_type', 'object_id_int', 'id'), ('content_type', 'object_id_hash', 'id')]),
+        ),
+    ]
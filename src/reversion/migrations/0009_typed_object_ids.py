@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.apps import apps as global_apps
+from django.db import models, migrations
+
+
+def get_object_id_field_name(model):
+    """Returns the name of the typed object id field for the model, or None if its primary key type was already stored."""
+    pk = model._meta.pk
+    while isinstance(pk, models.ForeignKey):
+        pk = pk.rel.to._meta.pk
+    if isinstance(pk, models.BigIntegerField):
+        return "object_id_int"
+    if isinstance(pk, models.UUIDField):
+        return "object_id_uuid"
+    return None
+
+
+def get_object_id_conversion(connection, object_id_field_name, object_id):
+    """Returns SQL converting the given text column to the type of the given typed object id field."""
+    if object_id_field_name == "object_id_int":
+        return "CAST({object_id} AS {type})".format(
+            object_id = object_id,
+            type = "SIGNED" if connection.vendor == "mysql" else connection.data_types["BigIntegerField"],
+        )
+    # UUIDs are stored natively on PostgreSQL, and as 32 hex digits elsewhere.
+    if connection.vendor == "postgresql":
+        return "CAST({object_id} AS uuid)".format(object_id=object_id)
+    return "LOWER(REPLACE({object_id}, '-', ''))".format(object_id=object_id)
+
+
+def populate_typed_object_ids(apps, schema_editor):
+    # Big integer primary keys used to be stored as text only, and UUIDs have not been stored in a typed field before.
+    # Each content type is converted in a single statement.
+    connection = schema_editor.connection
+    db = connection.alias
+    qn = schema_editor.quote_name
+    ContentType = apps.get_model("contenttypes", "ContentType")
+    for model_name in ("Version", "LatestVersion"):
+        model = apps.get_model("reversion", model_name)
+        untyped = model.objects.using(db).filter(object_id_int__isnull=True)
+        for content_type in ContentType.objects.using(db).filter(pk__in=untyped.values("content_type_id")):
+            try:
+                versioned_model = apps.get_model(content_type.app_label, content_type.model)
+            except LookupError:
+                # Apps that reversion does not depend on are missing from the migration state.
+                try:
+                    versioned_model = global_apps.get_model(content_type.app_label, content_type.model)
+                except LookupError:
+                    continue
+            object_id_field_name = get_object_id_field_name(versioned_model)
+            if object_id_field_name is None:
+                continue
+            schema_editor.execute(
+                "UPDATE {table} SET {object_id_typed} = {conversion} WHERE {content_type_id} = %s AND {object_id_int} IS NULL".format(
+                    table = qn(model._meta.db_table),
+                    object_id_typed = qn(object_id_field_name),
+                    conversion = get_object_id_conversion(connection, object_id_field_name, qn("object_id")),
+                    content_type_id = qn("content_type_id"),
+                    object_id_int = qn("object_id_int"),
+                ),
+                [content_type.pk],
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0001_initial'),
+        ('reversion', '0008_object_id_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='latestversion',
+            name='object_id_uuid',
+            field=models.UUIDField(blank=True, help_text="A UUID version of the stored model's primary key, used for faster lookups.", null=True),
+        ),
+        migrations.AddField(
+            model_name='version',
+            name='object_id_uuid',
+            field=models.UUIDField(blank=True, help_text="An indexed, UUID version of the stored model's primary key, used for faster lookups.", null=True),
+        ),
+        migrations.AlterField(
+            model_name='latestversion',
+            name='object_id_int',
+            field=models.BigIntegerField(blank=True, help_text="An integer version of the stored model's primary key, used for faster lookups.", null=True),
+        ),
+        migrations.AlterField(
+            model_name='version',
+            name='object_id_int',
+            field=models.BigIntegerField(blank=True, db_index=True, help_text="An indexed, integer version of the stored model's primary key, used for faster lookups.", null=True),
+        ),
+        migrations.RunPython(populate_typed_object_ids, migrations.RunPython.noop),
+        migrations.AlterIndexTogether(
+            name='latestversion',
+            index_together=set([('content_type', 'is_deleted'), ('content_type', 'object_id_int'), ('content_type', 'object_id_uuid'), ('content_type', 'object_id_hash')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='version',
+            index_together=set([('content_type', 'object_id_int', 'id'), ('content_type', 'object_id_hash', 'id'), ('content_type', 'object_id_uuid', 'id')]),
+        ),
+    ]
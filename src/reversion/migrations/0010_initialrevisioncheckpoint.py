@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0001_initial'),
+        ('reversion', '0009_typed_object_ids'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InitialRevisionCheckpoint',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('lower_pk', models.TextField(blank=True, help_text='The range of objects starts after this primary key, or at the first object if null.', null=True)),
+                ('upper_pk', models.TextField(blank=True, help_text='The range of objects ends at this primary key, or at the last object if null.', null=True)),
+                ('last_pk', models.TextField(blank=True, help_text='The primary key of the last object processed, or null if none have been processed.', null=True)),
+                ('processed_count', models.PositiveIntegerField(default=0, help_text='The number of objects processed.')),
+                ('created_count', models.PositiveIntegerField(default=0, help_text='The number of initial revisions created.')),
+                ('is_complete', models.BooleanField(default=False, help_text='Whether all the objects in the range have been processed.')),
+                ('date_updated', models.DateTimeField(auto_now=True, help_text='The date and time the progress was last recorded.')),
+                ('content_type', models.ForeignKey(help_text='Content type of the model having initial revisions created.', on_delete=django.db.models.deletion.CASCADE, related_name='+', to='contenttypes.ContentType')),
+            ],
+        ),
+    ]
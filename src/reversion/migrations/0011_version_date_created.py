@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+from django.db.models import Max, Min
+
+
+# The range of version primary keys updated in each statement.
+BATCH_SIZE = 10000
+
+
+def populate_version_date_created(apps, schema_editor):
+    # Copy the date of each version's revision, one range of primary keys at a time, to keep each statement short.
+    Revision = apps.get_model("reversion", "Revision")
+    Version = apps.get_model("reversion", "Version")
+    qn = schema_editor.quote_name
+    pk_range = Version.objects.using(schema_editor.connection.alias).aggregate(Min("pk"), Max("pk"))
+    if pk_range["pk__min"] is None:
+        return
+    for lower in range(pk_range["pk__min"], pk_range["pk__max"] + 1, BATCH_SIZE):
+        schema_editor.execute(
+            "UPDATE {version} SET {date_created} = (SELECT {revision}.{date_created} FROM {revision} WHERE {revision}.{id} = {version}.{revision_id}) WHERE {date_created} IS NULL AND {id} >= %s AND {id} < %s".format(
+                version = qn(Version._meta.db_table),
+                revision = qn(Revision._meta.db_table),
+                date_created = qn("date_created"),
+                id = qn("id"),
+                revision_id = qn("revision_id"),
+            ),
+            [lower, lower + BATCH_SIZE],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0001_initial'),
+        ('reversion', '0010_initialrevisioncheckpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='version',
+            name='date_created',
+            field=models.DateTimeField(blank=True, db_index=True, help_text='The date and time the revision was created, copied so versions can be filtered and partitioned by date.', null=True),
+        ),
+        migrations.RunPython(populate_version_date_created, migrations.RunPython.noop),
+    ]
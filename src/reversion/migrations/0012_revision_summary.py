@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+def populate_revision_summary(apps, schema_editor):
+    # Count the versions and record the content types of each revision in two statements.
+    # The summaries of existing revisions are left null, and built from their versions when needed.
+    Revision = apps.get_model("reversion", "Revision")
+    Version = apps.get_model("reversion", "Version")
+    qn = schema_editor.quote_name
+    schema_editor.execute(
+        "UPDATE {revision} SET {version_count} = (SELECT COUNT(*) FROM {version} WHERE {version}.{revision_id} = {revision}.{id})".format(
+            revision = qn(Revision._meta.db_table),
+            version = qn(Version._meta.db_table),
+            version_count = qn("version_count"),
+            id = qn("id"),
+            revision_id = qn("revision_id"),
+        )
+    )
+    schema_editor.execute(
+        "INSERT INTO {through} ({revision_id}, {contenttype_id}) SELECT DISTINCT {revision_id}, {content_type_id} FROM {version}".format(
+            through = qn(Revision.content_types.through._meta.db_table),
+            version = qn(Version._meta.db_table),
+            revision_id = qn("revision_id"),
+            contenttype_id = qn("contenttype_id"),
+            content_type_id = qn("content_type_id"),
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0001_initial'),
+        ('reversion', '0011_version_date_created'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='revision',
+            name='content_types',
+            field=models.ManyToManyField(blank=True, help_text='The content types of the versions in this revision.', related_name='_revision_content_types_+', to='contenttypes.ContentType'),
+        ),
+        migrations.AddField(
+            model_name='revision',
+            name='summary',
+            field=models.TextField(blank=True, help_text='The string representations of the versions in this revision, truncated. Null for revisions saved before summaries were stored.', null=True),
+        ),
+        migrations.AddField(
+            model_name='revision',
+            name='version_count',
+            field=models.PositiveIntegerField(default=0, help_text='The number of versions in this revision.'),
+        ),
+        migrations.RunPython(populate_revision_summary, migrations.RunPython.noop),
+    ]
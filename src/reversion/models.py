@@ -2,6 +2,8 @@
 
 from __future__ import unicode_literals
 
+import hashlib
+
 from django.contrib.contenttypes.models import ContentType
 try:
     from django.contrib.contenttypes.fields import GenericForeignKey
@@ -11,10 +13,15 @@ from django.conf import settings
 from django.core import serializers
 from django.core.exceptions import ObjectDoesNotExist
 from django.db import models, IntegrityError, transaction
+from django.db.models import Case, When, Value
+from django.utils.text import Truncator
 from django.utils.translation import ugettext_lazy as _
-from django.utils.encoding import force_text, python_2_unicode_compatible
+from django.utils.encoding import force_text, force_bytes, python_2_unicode_compatible
 
+from reversion.compression import compress, decompress
+from reversion.deltas import apply_delta
 from reversion.errors import RevertError
+from reversion.serialization import deserialize, is_fast_format
 
 
 def safe_revert(versions):
@@ -39,6 +46,12 @@ def safe_revert(versions):
 
 UserModel = getattr(settings, 'AUTH_USER_MODEL', 'auth.User')
 
+# The maximum length of the summary stored with each revision.
+REVISION_SUMMARY_LENGTH = 255
+
+# The number of dependent versions stored in full at a time when detaching delta chains.
+DETACH_BATCH_SIZE = 100
+
 
 @python_2_unicode_compatible
 class Revision(models.Model):
@@ -67,6 +80,24 @@ class Revision(models.Model):
                                verbose_name=_("comment"),
                                help_text="A text comment on this revision.")
 
+    version_count = models.PositiveIntegerField(
+        default = 0,
+        help_text = "The number of versions in this revision.",
+    )
+
+    summary = models.TextField(
+        blank = True,
+        null = True,
+        help_text = "The string representations of the versions in this revision, truncated. Null for revisions saved before summaries were stored.",
+    )
+
+    content_types = models.ManyToManyField(
+        ContentType,
+        blank = True,
+        related_name = "+",
+        help_text = "The content types of the versions in this revision.",
+    )
+
     def revert(self, delete=False):
         """Reverts all objects in this revision."""
         version_set = self.version_set.all()
@@ -93,7 +124,9 @@ class Revision(models.Model):
 
     def __str__(self):
         """Returns a unicode representation."""
-        return ", ".join(force_text(version) for version in self.version_set.all())
+        if self.summary is None:
+            return ", ".join(force_text(version) for version in self.version_set.all())
+        return self.summary
 
     #Meta
     class Meta:
@@ -104,13 +137,170 @@ def has_int_pk(model):
     """Tests whether the given model has an integer primary key."""
     pk = model._meta.pk
     return (
-        (
-            isinstance(pk, (models.IntegerField, models.AutoField)) and
-            not isinstance(pk, models.BigIntegerField)
-        ) or (
-            isinstance(pk, models.ForeignKey) and has_int_pk(pk.rel.to)
+        isinstance(pk, (models.IntegerField, models.AutoField)) or
+        (isinstance(pk, models.ForeignKey) and has_int_pk(pk.rel.to))
+    )
+
+
+def has_uuid_pk(model):
+    """Tests whether the given model has a UUID primary key."""
+    pk = model._meta.pk
+    return (
+        isinstance(pk, models.UUIDField) or
+        (isinstance(pk, models.ForeignKey) and has_uuid_pk(pk.rel.to))
+    )
+
+
+def get_object_id_field_name(model):
+    """Returns the name of the indexed version field that stores the primary key of the given model."""
+    if has_int_pk(model):
+        return "object_id_int"
+    if has_uuid_pk(model):
+        return "object_id_uuid"
+    return "object_id_hash"
+
+
+def get_object_id_lookup(model, object_id):
+    """Returns keyword arguments that filter versions down to those of the given object reference."""
+    object_id_field_name = get_object_id_field_name(model)
+    if object_id_field_name == "object_id_int":
+        return {"object_id_int": int(object_id)}
+    if object_id_field_name == "object_id_uuid":
+        return {"object_id_uuid": model._meta.pk.to_python(object_id)}
+    # The hash is indexed, and the object_id check guards against collisions.
+    object_id = force_text(object_id)
+    return {"object_id_hash": get_object_id_hash(object_id), "object_id": object_id}
+
+
+def get_revision_summary(object_reprs, summary=""):
+    """
+    Returns the summary of a revision containing versions with the given string representations.
+
+    If summary is given, the representations are appended to it. The
+    summary is truncated to REVISION_SUMMARY_LENGTH characters.
+    """
+    object_reprs = [force_text(object_repr) for object_repr in object_reprs]
+    if summary:
+        object_reprs.insert(0, summary)
+    return Truncator(", ".join(object_reprs)).chars(REVISION_SUMMARY_LENGTH)
+
+
+def get_content_hash(serialized_data):
+    """Returns a hash of the given serialized data, used to detect unchanged versions."""
+    return hashlib.sha1(force_bytes(serialized_data)).hexdigest()
+
+
+def get_object_id_hash(object_id):
+    """Returns a hash of the given primary key, used to look up versions of models without an integer primary key."""
+    return hashlib.sha1(force_bytes(force_text(object_id))).hexdigest()
+
+
+class VersionBlob(models.Model):
+
+    """Serialized model data shared between all versions with identical content."""
+
+    content_hash = models.CharField(
+        max_length = 40,
+        primary_key = True,
+        help_text = "A hash of the serialized data.",
+    )
+
+    serialized_data = models.TextField(help_text="The serialized form of the model.")
+
+    compression = models.CharField(
+        max_length = 32,
+        blank = True,
+        help_text = "The compression codec used for the serialized data, if any.",
+    )
+
+    #Meta
+    class Meta:
+        app_label = 'reversion'
+
+
+def _load_field_dicts(versions, db=None):
+    """
+    Caches the field dicts of the given versions, loading the versions of
+    their parents in one query for each level of inheritance.
+
+    The serialized data of the versions at each level is loaded together, so
+    delta chains are not resolved one version at a time.
+    """
+    versions = [version for version in versions if not hasattr(version, "_field_dict_cache")]
+    _load_serialized_data(versions, db)
+    object_versions = [version.object_version for version in versions]
+    parent_keys = set(
+        key
+        for version, object_version
+        in zip(versions, object_versions)
+        for key
+        in version._get_parent_keys(object_version.object)
+    )
+    parent_versions = {}
+    if parent_keys:
+        candidate_versions = Version.objects.using(db).filter(
+            revision_id__in = set(revision_id for revision_id, _, _ in parent_keys),
+            content_type_id__in = set(content_type_id for _, content_type_id, _ in parent_keys),
+            object_id__in = set(object_id for _, _, object_id in parent_keys),
+        ).select_related("blob")
+        for version in candidate_versions:
+            key = (version.revision_id, version.content_type_id, version.object_id)
+            if key in parent_keys:
+                parent_versions[key] = version
+        _load_field_dicts(parent_versions.values(), db)
+    for version, object_version in zip(versions, object_versions):
+        version._set_field_dict(object_version, parent_versions)
+
+
+def _load_serialized_data(versions, db=None):
+    """
+    Caches the serialized data of the given versions.
+
+    The delta chains of the whole list are resolved together, with one query
+    for each step back along the longest chain, rather than one query per
+    version. Versions in the list are reused as each other's delta bases, and
+    shared data is loaded in one query.
+    """
+    versions_by_pk = dict((version.pk, version) for version in versions)
+    # Load the missing delta bases, one step back along the chains at a time.
+    pending_versions = [version for version in versions if not hasattr(version, "_serialized_data_cache")]
+    while True:
+        base_pks = set(
+            version.delta_base_id
+            for version
+            in pending_versions
+            if version.delta_base_id is not None and version.delta_base_id not in versions_by_pk
         )
+        if not base_pks:
+            break
+        pending_versions = list(Version.objects.using(db).filter(pk__in=base_pks))
+        versions_by_pk.update((version.pk, version) for version in pending_versions)
+    # Load the shared data not already loaded with the versions.
+    blob_cache_name = Version._meta.get_field("blob").get_cache_name()
+    blob_ids = set(
+        version.blob_id
+        for version
+        in versions_by_pk.values()
+        if version.blob_id is not None and not hasattr(version, "_serialized_data_cache") and not hasattr(version, blob_cache_name)
     )
+    if blob_ids:
+        blobs = VersionBlob.objects.using(db).in_bulk(list(blob_ids))
+        for version in versions_by_pk.values():
+            if version.blob_id in blobs:
+                setattr(version, blob_cache_name, blobs[version.blob_id])
+    # Replay the deltas, oldest first, so each base is known before the versions that need it.
+    for pk in sorted(versions_by_pk):
+        version = versions_by_pk[pk]
+        if hasattr(version, "_serialized_data_cache"):
+            continue
+        base = versions_by_pk.get(version.delta_base_id)
+        if base is None:
+            version.get_serialized_data()
+        else:
+            setattr(version, "_serialized_data_cache", apply_delta(
+                base.get_serialized_data(),
+                decompress(version.compression, version.serialized_data),
+            ))
 
 
 class VersionQuerySet(models.QuerySet):
@@ -119,11 +309,63 @@ class VersionQuerySet(models.QuerySet):
         """
         Returns a generator of unique version data.
         """
-        last_serialized_data = None
+        last_content_hash = None
         for version in self.iterator():
-            if last_serialized_data != version.serialized_data:
+            content_hash = version.content_hash or get_content_hash(version.serialized_data)
+            if last_content_hash != content_hash:
                 yield version
-            last_serialized_data = version.serialized_data
+            last_content_hash = content_hash
+
+    def load_field_dicts(self):
+        """
+        Returns a list of the versions in this queryset, with their field_dict loaded.
+
+        The parent versions of models using multi-table inheritance are
+        loaded in one query for the whole list, rather than one query per
+        version.
+        """
+        versions = list(self.select_related("blob"))
+        _load_field_dicts(versions, self.db)
+        return versions
+
+    def detach_delta_chains(self):
+        """
+        Stores any versions that are deltas against the versions in this queryset in full.
+
+        Call this before deleting the versions in this queryset, so that the
+        remaining versions can still be read.
+        """
+        dependent_versions = Version.objects.using(self.db).filter(
+            delta_base__in = self.values("pk"),
+        ).exclude(
+            pk__in = self.values("pk"),
+        ).order_by("pk")
+        detached_count = 0
+        last_pk = None
+        while True:
+            batch = dependent_versions if last_pk is None else dependent_versions.filter(pk__gt=last_pk)
+            versions = list(batch[:DETACH_BATCH_SIZE])
+            if not versions:
+                break
+            last_pk = versions[-1].pk
+            # Load the data of the batch before changing anything, then store it in a single update.
+            _load_serialized_data(versions, self.db)
+            Version.objects.using(self.db).filter(
+                pk__in = [version.pk for version in versions],
+            ).update(
+                serialized_data = Case(
+                    *[
+                        When(pk=version.pk, then=Value(compress(version.compression, version.get_serialized_data())))
+                        for version
+                        in versions
+                    ],
+                    output_field = models.TextField()
+                ),
+                delta_base = None,
+                delta_depth = 0,
+            )
+            detached_count += len(versions)
+        return detached_count
 
 
 @python_2_unicode_compatible
@@ -136,15 +378,34 @@ class Version(models.Model):
     revision = models.ForeignKey(Revision,
                                  help_text="The revision that contains this version.")
 
+    date_created = models.DateTimeField(
+        blank = True,
+        null = True,
+        db_index = True,
+        help_text = "The date and time the revision was created, copied so versions can be filtered and partitioned by date.",
+    )
+
     object_id = models.TextField(help_text="Primary key of the model under version control.")
 
-    object_id_int = models.IntegerField(
+    object_id_int = models.BigIntegerField(
         blank = True,
         null = True,
         db_index = True,
         help_text = "An indexed, integer version of the stored model's primary key, used for faster lookups.",
     )
 
+    object_id_uuid = models.UUIDField(
+        blank = True,
+        null = True,
+        help_text = "An indexed, UUID version of the stored model's primary key, used for faster lookups.",
+    )
+
+    object_id_hash = models.CharField(
+        max_length = 40,
+        blank = True,
+        help_text = "A hash of the stored model's primary key, used for faster lookups.",
+    )
+
     content_type = models.ForeignKey(ContentType,
                                      help_text="Content type of the model under version control.")
 
@@ -156,48 +417,159 @@ class Version(models.Model):
 
     serialized_data = models.TextField(help_text="The serialized form of this version of the model.")
 
+    compression = models.CharField(
+        max_length = 32,
+        blank = True,
+        help_text = "The compression codec used for the serialized data, if any.",
+    )
+
+    blob = models.ForeignKey(
+        VersionBlob,
+        blank = True,
+        null = True,
+        on_delete = models.PROTECT,
+        help_text = "The shared serialized data of this version, used instead of serialized_data if set.",
+    )
+
     object_repr = models.TextField(help_text="A string representation of the object.")
 
+    content_hash = models.CharField(
+        max_length = 40,
+        blank = True,
+        help_text = "A hash of the serialized data, used to detect duplicate versions.",
+    )
+
+    # Deleting a version does not cascade to its deltas, use VersionQuerySet.detach_delta_chains() first.
+    delta_base = models.ForeignKey(
+        "self",
+        blank = True,
+        null = True,
+        db_constraint = False,
+        on_delete = models.DO_NOTHING,
+        related_name = "+",
+        help_text = "The version that serialized_data is a delta against, or null if serialized_data is stored in full.",
+    )
+
+    delta_depth = models.PositiveIntegerField(
+        default = 0,
+        help_text = "The number of deltas between this version and the nearest full version.",
+    )
+
+    def _get_delta_chain_candidates(self):
+        """Returns a dict of the previous versions of this object that may be part of its delta chain."""
+        versions = Version.objects.using(self._state.db).filter(
+            content_type_id = self.content_type_id,
+            pk__lt = self.pk,
+        )
+        if self.object_id_int is not None:
+            versions = versions.filter(object_id_int=self.object_id_int)
+        elif self.object_id_uuid is not None:
+            versions = versions.filter(object_id_uuid=self.object_id_uuid)
+        else:
+            versions = versions.filter(object_id_hash=get_object_id_hash(self.object_id), object_id=self.object_id)
+        return dict(
+            (version.pk, version)
+            for version
+            in versions.order_by("-pk")[:self.delta_depth]
+        )
+
+    def get_serialized_data(self):
+        """
+        Returns the serialized form of this version.
+
+        The data is loaded from shared storage, decompressed and rebuilt from
+        its delta chain as required.
+        """
+        if not hasattr(self, "_serialized_data_cache"):
+            if self.delta_base_id is None:
+                if self.blob_id is None:
+                    serialized_data = decompress(self.compression, self.serialized_data)
+                else:
+                    serialized_data = decompress(self.blob.compression, self.blob.serialized_data)
+            else:
+                # Walk back to the nearest version with known data, loading the chain in one query.
+                chain = []
+                candidates = self._get_delta_chain_candidates()
+                version = self
+                while version.delta_base_id is not None and not hasattr(version, "_serialized_data_cache"):
+                    chain.append(version)
+                    base = candidates.get(version.delta_base_id)
+                    if base is None:  # pragma: no cover
+                        base = Version.objects.using(self._state.db).get(pk=version.delta_base_id)
+                    version = base
+                serialized_data = version.get_serialized_data()
+                # Replay the deltas.
+                for version in reversed(chain):
+                    serialized_data = apply_delta(serialized_data, decompress(version.compression, version.serialized_data))
+                    if version is not self:
+                        setattr(version, "_serialized_data_cache", serialized_data)
+            setattr(self, "_serialized_data_cache", serialized_data)
+        return getattr(self, "_serialized_data_cache")
+
     @property
     def object_version(self):
         """The stored version of the model."""
-        data = self.serialized_data
+        data = self.get_serialized_data()
+        if is_fast_format(self.format):
+            return deserialize(data)
         data = force_text(data.encode("utf8"))
         return list(serializers.deserialize(self.format, data, ignorenonexistent=True))[0]
 
+    def _get_parent_keys(self, obj):
+        """
+        Returns a list of (revision id, content type id, object id) keys
+        identifying the versions of the parents of the given version of the
+        model in this revision.
+        """
+        keys = []
+        for parent_class, field in obj._meta.concrete_model._meta.parents.items():
+            if obj._meta.proxy and parent_class == obj._meta.concrete_model:
+                continue
+            content_type = ContentType.objects.db_manager(self._state.db).get_for_model(parent_class)
+            if field:
+                parent_id = force_text(getattr(obj, field.attname))
+            else:
+                parent_id = force_text(obj.pk)
+            keys.append((self.revision_id, content_type.pk, parent_id))
+        return keys
+
+    def _set_field_dict(self, object_version, parent_versions):
+        """Caches the field dict of this version, given its object version and a dict of parent versions by key."""
+        obj = object_version.object
+        result = {}
+        for field in obj._meta.fields:
+            result[field.name] = field.value_from_object(obj)
+        result.update(object_version.m2m_data)
+        # Add parent data.
+        for key in self._get_parent_keys(obj):
+            parent_version = parent_versions.get(key)
+            if parent_version is not None:
+                result.update(parent_version.field_dict)
+        setattr(self, "_field_dict_cache", result)
+
     @property
     def field_dict(self):
         """
         A dictionary mapping field names to field values in this version
         of the model.
 
-        This method will follow parent links, if present.
+        This method will follow parent links, if present. To load the field
+        dicts of many versions at once, use VersionQuerySet.load_field_dicts().
         """
         if not hasattr(self, "_field_dict_cache"):
             object_version = self.object_version
-            obj = object_version.object
-            result = {}
-            for field in obj._meta.fields:
-                result[field.name] = field.value_from_object(obj)
-            result.update(object_version.m2m_data)
-            # Add parent data.
-            for parent_class, field in obj._meta.concrete_model._meta.parents.items():
-                if obj._meta.proxy and parent_class == obj._meta.concrete_model:
-                    continue
-                content_type = ContentType.objects.get_for_model(parent_class)
-                if field:
-                    parent_id = force_text(getattr(obj, field.attname))
-                else:
-                    parent_id = obj.pk
+            parent_versions = {}
+            for key in self._get_parent_keys(object_version.object):
+                revision_id, content_type_id, object_id = key
                 try:
-                    parent_version = Version.objects.get(revision__id=self.revision_id,
-                                                         content_type=content_type,
-                                                         object_id=parent_id)
+                    parent_versions[key] = Version.objects.using(self._state.db).get(
+                        revision_id = revision_id,
+                        content_type_id = content_type_id,
+                        object_id = object_id,
+                    )
                 except Version.DoesNotExist:  # pragma: no cover
                     pass
-                else:
-                    result.update(parent_version.field_dict)
-            setattr(self, "_field_dict_cache", result)
+            self._set_field_dict(object_version, parent_versions)
         return getattr(self, "_field_dict_cache")
 
     def revert(self):
@@ -211,3 +583,129 @@ class Version(models.Model):
     #Meta
     class Meta:
         app_label = 'reversion'
+        index_together = (
+            ("content_type", "object_id_int", "id"),
+            ("content_type", "object_id_uuid", "id"),
+            ("content_type", "object_id_hash", "id"),
+        )
+
+
+class LatestVersion(models.Model):
+
+    """
+    A pointer to the latest version of an object.
+
+    Only maintained for models registered with track_latest_version=True.
+    """
+
+    manager_slug = models.CharField(
+        max_length = 191,
+        default = "default",
+        help_text = "The revision manager that saved the version.",
+    )
+
+    content_type = models.ForeignKey(
+        ContentType,
+        related_name = "+",
+        help_text = "Content type of the model under version control.",
+    )
+
+    object_id = models.TextField(help_text="Primary key of the model under version control.")
+
+    object_id_int = models.BigIntegerField(
+        blank = True,
+        null = True,
+        help_text = "An integer version of the stored model's primary key, used for faster lookups.",
+    )
+
+    object_id_uuid = models.UUIDField(
+        blank = True,
+        null = True,
+        help_text = "A UUID version of the stored model's primary key, used for faster lookups.",
+    )
+
+    object_id_hash = models.CharField(
+        max_length = 40,
+        blank = True,
+        help_text = "A hash of the stored model's primary key, used for faster lookups.",
+    )
+
+    version = models.OneToOneField(
+        Version,
+        related_name = "+",
+        help_text = "The latest version of the object.",
+    )
+
+    revision = models.ForeignKey(
+        Revision,
+        related_name = "+",
+        help_text = "The revision that contains the latest version of the object.",
+    )
+
+    is_deleted = models.BooleanField(
+        default = False,
+        help_text = "Whether the object has been deleted since the latest version was saved.",
+    )
+
+    #Meta
+    class Meta:
+        app_label = 'reversion'
+        index_together = (
+            ("content_type", "object_id_int"),
+            ("content_type", "object_id_uuid"),
+            ("content_type", "object_id_hash"),
+            ("content_type", "is_deleted"),
+        )
+
+
+class InitialRevisionCheckpoint(models.Model):
+
+    """The progress of the createinitialrevisions management command through a range of objects."""
+
+    content_type = models.ForeignKey(
+        ContentType,
+        related_name = "+",
+        help_text = "Content type of the model having initial revisions created.",
+    )
+
+    lower_pk = models.TextField(
+        blank = True,
+        null = True,
+        help_text = "The range of objects starts after this primary key, or at the first object if null.",
+    )
+
+    upper_pk = models.TextField(
+        blank = True,
+        null = True,
+        help_text = "The range of objects ends at this primary key, or at the last object if null.",
+    )
+
+    last_pk = models.TextField(
+        blank = True,
+        null = True,
+        help_text = "The primary key of the last object processed, or null if none have been processed.",
+    )
+
+    processed_count = models.PositiveIntegerField(
+        default = 0,
+        help_text = "The number of objects processed.",
+    )
+
+    created_count = models.PositiveIntegerField(
+        default = 0,
+        help_text = "The number of initial revisions created.",
+    )
+
+    is_complete = models.BooleanField(
+        default = False,
+        help_text = "Whether all the objects in the range have been processed.",
+    )
+
+    date_updated = models.DateTimeField(
+        auto_now = True,
+        help_text = "The date and time the progress was last recorded.",
+    )
+
+    #Meta
+    class Meta:
+        app_label = 'reversion'
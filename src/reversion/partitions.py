@@ -0,0 +1,326 @@
+"""
+Time-based partitioning of the revision and version tables.
+
+On PostgreSQL 11 or later, the revision and version tables can be range
+partitioned by month on date_created, so that old history can be removed by
+dropping whole partitions, rather than deleting rows. Queries that filter on
+date_created, such as RevisionManager.get_for_date(), only scan the
+partitions they need.
+
+Partitions are named after their table and the month they hold, for example
+reversion_version_2016_01. The rows that existed when partitioning was set up
+are kept in a single partition named after the month partitioning began, for
+example reversion_version_before_2016_01, and rows outside all other
+partitions are kept in a default partition.
+
+On other databases, partitioning is not supported, and these functions do nothing.
+"""
+
+from __future__ import unicode_literals
+
+import datetime, hashlib, re
+
+from django.conf import settings
+from django.db import connections, models, router, transaction
+from django.utils import timezone
+
+
+def supports_partitioning(connection):
+    """Checks whether the given database connection supports partitioning the revision and version tables."""
+    return connection.vendor == "postgresql" and connection.pg_version >= 110000
+
+
+def get_partitioned_models():
+    """Returns the partitioned models, with models referenced by foreign keys first."""
+    from reversion.models import Revision, Version
+    return (Revision, Version)
+
+
+def get_month_start(date):
+    """Returns the start of the month containing the given date, in UTC if time zone support is enabled."""
+    month_start = datetime.datetime(date.year, date.month, 1)
+    if settings.USE_TZ:
+        month_start = timezone.make_aware(month_start, timezone.utc)
+    return month_start
+
+
+def add_months(date, months):
+    """Returns the start of the month the given number of months after the month containing the given date."""
+    month = date.year * 12 + date.month - 1 + months
+    return get_month_start(datetime.date(month // 12, month % 12 + 1, 1))
+
+
+def get_month_ranges(start, months):
+    """Returns a list of (lower, upper) bounds for the given number of months, from the month containing start."""
+    return [
+        (add_months(start, i), add_months(start, i + 1))
+        for i in range(months)
+    ]
+
+
+def get_partition_name(table, month_start):
+    """Returns the name of the partition of the given table holding the month starting at month_start."""
+    return "%s_%04d_%02d" % (table, month_start.year, month_start.month)
+
+
+def get_legacy_partition_name(table, month_start):
+    """Returns the name of the partition of the given table holding all rows before month_start."""
+    return "%s_before_%04d_%02d" % (table, month_start.year, month_start.month)
+
+
+def get_default_partition_name(table):
+    """Returns the name of the partition of the given table holding rows outside all other partitions."""
+    return "%s_default" % table
+
+
+def is_partitioned(connection, table):
+    """Checks whether the given table is partitioned."""
+    if not supports_partitioning(connection):
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)",
+            [connection.ops.quote_name(table)],
+        )
+        return cursor.fetchone() is not None
+
+
+def get_partitions(connection, table):
+    """
+    Returns a list of (name, upper) tuples for the month partitions of the given table.
+
+    upper is the start of the month after the last month the partition holds.
+    The default partition is not included.
+    """
+    if not is_partitioned(connection, table):
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname FROM pg_inherits "
+            "INNER JOIN pg_class child ON pg_inherits.inhrelid = child.oid "
+            "WHERE pg_inherits.inhparent = to_regclass(%s) ORDER BY child.relname",
+            [connection.ops.quote_name(table)],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    partitions = []
+    pattern = re.compile(r"^%s_(before_)?(\d{4})_(\d{2})$" % re.escape(table))
+    for name in names:
+        match = pattern.match(name)
+        if match is None:
+            continue
+        month_start = get_month_start(datetime.date(int(match.group(2)), int(match.group(3)), 1))
+        partitions.append((name, month_start if match.group(1) else add_months(month_start, 1)))
+    return partitions
+
+
+def _get_index_name(table, definition):
+    """Returns a name for an index on a partitioned table, unique for its definition."""
+    return "%s_%s" % (table[:50], hashlib.md5(definition.encode("utf-8")).hexdigest()[:8])
+
+
+def setup_partitioning(using=None, start=None, months_ahead=3):
+    """
+    Converts the revision and version tables to tables partitioned by month on date_created.
+
+    The existing rows become a single partition holding everything before the
+    month containing start, which defaults to now. Partitions are then created
+    for that month and the given number of months after it.
+
+    As PostgreSQL cannot enforce foreign keys to partitioned tables, the
+    foreign keys referencing the revision and version tables are dropped.
+    Django still deletes related objects when a revision or version is
+    deleted. The foreign keys from the existing rows are kept on their
+    partition only.
+
+    Returns a list of the names of the partitions created, or an empty list
+    if partitioning is not supported or already set up.
+    """
+    using = using or router.db_for_write(get_partitioned_models()[0])
+    connection = connections[using]
+    if not supports_partitioning(connection):
+        return []
+    qn = connection.ops.quote_name
+    start = get_month_start(start or timezone.now())
+    created_partitions = []
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        for model in get_partitioned_models():
+            table = model._meta.db_table
+            if is_partitioned(connection, table):
+                continue
+            legacy_table = get_legacy_partition_name(table, start)
+            # Drop the foreign keys referencing the table.
+            cursor.execute(
+                "SELECT conrelid::regclass::text, conname FROM pg_constraint "
+                "WHERE contype = 'f' AND confrelid = to_regclass(%s)",
+                [qn(table)],
+            )
+            for referencing_table, constraint in cursor.fetchall():
+                cursor.execute("ALTER TABLE %s DROP CONSTRAINT %s" % (referencing_table, qn(constraint)))
+            # Keep the existing rows as a partition. Its primary key must include the partition key.
+            cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [qn(table)])
+            sequence = cursor.fetchone()[0]
+            cursor.execute(
+                "SELECT conname FROM pg_constraint WHERE contype = 'p' AND conrelid = to_regclass(%s)",
+                [qn(table)],
+            )
+            primary_key = cursor.fetchone()[0]
+            cursor.execute(
+                "SELECT pg_get_indexdef(indexrelid) FROM pg_index "
+                "WHERE indrelid = to_regclass(%s) AND NOT indisprimary AND NOT indisunique",
+                [qn(table)],
+            )
+            index_definitions = [row[0].split(" USING ", 1)[1] for row in cursor.fetchall()]
+            cursor.execute("ALTER TABLE %s RENAME TO %s" % (qn(table), qn(legacy_table)))
+            cursor.execute("ALTER TABLE %s DROP CONSTRAINT %s" % (qn(legacy_table), qn(primary_key)))
+            cursor.execute("ALTER TABLE %s ALTER COLUMN date_created SET NOT NULL" % qn(legacy_table))
+            cursor.execute("ALTER TABLE %s ADD PRIMARY KEY (id, date_created)" % qn(legacy_table))
+            # Create the partitioned table in its place.
+            cursor.execute(
+                "CREATE TABLE %s (LIKE %s INCLUDING DEFAULTS INCLUDING CONSTRAINTS) PARTITION BY RANGE (date_created)" % (
+                    qn(table),
+                    qn(legacy_table),
+                )
+            )
+            cursor.execute("ALTER TABLE %s ADD PRIMARY KEY (id, date_created)" % qn(table))
+            if sequence:
+                cursor.execute("ALTER SEQUENCE %s OWNED BY %s.id" % (sequence, qn(table)))
+            cursor.execute(
+                "ALTER TABLE %s ATTACH PARTITION %s FOR VALUES FROM (MINVALUE) TO (%%s)" % (qn(table), qn(legacy_table)),
+                [start],
+            )
+            # Matching indexes on the existing partition are attached, rather than built again.
+            for definition in index_definitions:
+                cursor.execute("CREATE INDEX %s ON %s USING %s" % (
+                    qn(_get_index_name(table, definition)),
+                    qn(table),
+                    definition,
+                ))
+            cursor.execute("CREATE TABLE %s PARTITION OF %s DEFAULT" % (
+                qn(get_default_partition_name(table)),
+                qn(table),
+            ))
+            created_partitions.append(legacy_table)
+    created_partitions.extend(create_partitions(using, start, months_ahead + 1))
+    return created_partitions
+
+
+def create_partitions(using=None, start=None, months=3):
+    """
+    Creates any missing partitions for the given number of months, from the
+    month containing start, which defaults to now.
+
+    Rows already in the default partition for a new partition's month are
+    moved to it. The default partition is detached while they are moved,
+    which locks the table, so create partitions before they are needed.
+
+    Returns a list of the names of the partitions created.
+    """
+    using = using or router.db_for_write(get_partitioned_models()[0])
+    connection = connections[using]
+    qn = connection.ops.quote_name
+    created_partitions = []
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        for model in get_partitioned_models():
+            table = model._meta.db_table
+            if not is_partitioned(connection, table):
+                continue
+            existing_partitions = set(name for name, _ in get_partitions(connection, table))
+            for lower, upper in get_month_ranges(start or timezone.now(), months):
+                partition = get_partition_name(table, lower)
+                if partition in existing_partitions:
+                    continue
+                default_partition = get_default_partition_name(table)
+                cursor.execute("SELECT to_regclass(%s) IS NOT NULL", [qn(default_partition)])
+                if cursor.fetchone()[0]:
+                    cursor.execute(
+                        "SELECT 1 FROM %s WHERE date_created >= %%s AND date_created < %%s LIMIT 1" % qn(default_partition),
+                        [lower, upper],
+                    )
+                    has_default_rows = cursor.fetchone() is not None
+                else:
+                    has_default_rows = False
+                # A partition cannot be created while the default partition holds rows in its range, so move them.
+                if has_default_rows:
+                    cursor.execute("ALTER TABLE %s DETACH PARTITION %s" % (qn(table), qn(default_partition)))
+                cursor.execute(
+                    "CREATE TABLE %s PARTITION OF %s FOR VALUES FROM (%%s) TO (%%s)" % (qn(partition), qn(table)),
+                    [lower, upper],
+                )
+                if has_default_rows:
+                    cursor.execute(
+                        "INSERT INTO %s SELECT * FROM %s WHERE date_created >= %%s AND date_created < %%s" % (
+                            qn(partition),
+                            qn(default_partition),
+                        ),
+                        [lower, upper],
+                    )
+                    cursor.execute(
+                        "DELETE FROM %s WHERE date_created >= %%s AND date_created < %%s" % qn(default_partition),
+                        [lower, upper],
+                    )
+                    cursor.execute("ALTER TABLE %s ATTACH PARTITION %s DEFAULT" % (qn(table), qn(default_partition)))
+                created_partitions.append(partition)
+    return created_partitions
+
+
+def _delete_referencing_objects(model, upper, using):
+    """
+    Deletes the objects referencing the rows of the given partitioned model
+    created before upper, or clears their references, following the
+    on_delete behaviour of each foreign key.
+
+    This does what Django would do if the rows were deleted one by one, as
+    the foreign keys are no longer enforced once the tables are partitioned.
+    """
+    for related in model._meta.get_fields(include_hidden=True):
+        if not related.auto_created or related.concrete or not (related.one_to_many or related.one_to_one):
+            continue
+        if related.related_model in get_partitioned_models():
+            continue
+        field = related.field
+        if field.rel.on_delete is models.DO_NOTHING:
+            continue
+        referencing_objects = related.related_model._base_manager.using(using).filter(**{
+            "%s__date_created__lt" % field.name: upper,
+        })
+        if field.rel.on_delete is models.SET_NULL:
+            referencing_objects.update(**{field.name: None})
+        else:
+            referencing_objects.delete()
+
+
+def drop_partitions(before, using=None):
+    """
+    Drops the partitions only holding rows created before the given date.
+
+    The delta chains of the remaining versions are detached, and the objects
+    referencing the dropped revisions and versions, such as latest version
+    pointers, revision content types and revision meta data, are deleted,
+    first. Returns a list of the names of the partitions dropped.
+    """
+    from reversion.models import Version, VersionBlob
+    using = using or router.db_for_write(Version)
+    connection = connections[using]
+    qn = connection.ops.quote_name
+    dropped_partitions = []
+    with transaction.atomic(using=using):
+        # Find the partitions to drop, versions first, as they refer to revisions.
+        partitions = []
+        for model in reversed(get_partitioned_models()):
+            for partition, upper in get_partitions(connection, model._meta.db_table):
+                if upper <= before:
+                    partitions.append((model, partition, upper))
+        if not partitions:
+            return dropped_partitions
+        upper = max(upper for _, _, upper in partitions)
+        dropped_versions = Version.objects.using(using).filter(date_created__lt=upper)
+        dropped_versions.detach_delta_chains()
+        for model in reversed(get_partitioned_models()):
+            _delete_referencing_objects(model, upper, using)
+        with connection.cursor() as cursor:
+            for model, partition, _ in partitions:
+                cursor.execute("DROP TABLE %s" % qn(partition))
+                dropped_partitions.append(partition)
+        # Delete shared version data that is no longer used by any version.
+        VersionBlob.objects.using(using).filter(version__isnull=True).delete()
+    return dropped_partitions
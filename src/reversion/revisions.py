@@ -2,28 +2,105 @@
 
 from __future__ import unicode_literals
 
-import operator, warnings
+import logging, operator, warnings
 from functools import wraps, reduce, partial
 from threading import local
 from weakref import WeakValueDictionary
 import copy
-from collections import defaultdict
+from collections import defaultdict, namedtuple, OrderedDict
 
 from django.apps import apps
 from django.contrib.contenttypes.models import ContentType
 from django.core import serializers
 from django.core.exceptions import ObjectDoesNotExist
 from django.core.signals import request_finished
-from django.db import models, connection, transaction
+from django.db import models, connection, connections, router, transaction, IntegrityError
 from django.db.models import Q, Max
 from django.db.models.query import QuerySet
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete, post_migrate
 from django.utils.encoding import force_text
 
+logger = logging.getLogger(__name__)
+
+
+try:
+    from django.db.models import prefetch_related_objects
+    from django.db.models.query import get_prefetcher
+except ImportError:  # Django < 1.10 pragma: no cover
+    from django.db.models.query import prefetch_related_objects as _prefetch_related_objects
+    from django.db.models.query import get_prefetcher as _get_prefetcher
+
+    def prefetch_related_objects(model_instances, *related_lookups):
+        _prefetch_related_objects(model_instances, related_lookups)
+
+    def get_prefetcher(instance, through_attr, to_attr):
+        return _get_prefetcher(instance, through_attr)
+
+from reversion.compression import compress, decompress
+from reversion.deltas import make_delta
+from reversion.serialization import JSONSerializer, is_fast_format
+from reversion.writers import DeferredRevision, get_writer
 from reversion.signals import pre_revision_commit, post_revision_commit
 from reversion.errors import RevisionManagementError, RegistrationError
 
 
+def _copy_prefetched_objects_cache(obj):
+    """Returns a copy of the prefetched relations of the given model instance, or None."""
+    prefetched_cache = obj.__dict__.get("_prefetched_objects_cache")
+    if prefetched_cache is not None:
+        prefetched_cache = prefetched_cache.copy()
+    return prefetched_cache
+
+
+def _restore_prefetched_objects_cache(obj, prefetched_cache):
+    """Puts back the prefetched relations of a model instance copied by _copy_prefetched_objects_cache."""
+    if prefetched_cache is None:
+        obj.__dict__.pop("_prefetched_objects_cache", None)
+    else:
+        obj._prefetched_objects_cache = prefetched_cache
+
+
+def _iter_queryset_chunks(queryset, chunk_size):
+    """Yields lists of the objects in the given queryset, ordered by primary key, at most chunk_size at a time."""
+    queryset = queryset.order_by("pk")
+    last_pk = None
+    while True:
+        chunk = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        objs = list(chunk[:chunk_size])
+        if not objs:
+            break
+        last_pk = objs[-1].pk
+        yield objs
+
+
+# The number of objects to read at a time when versioning a queryset.
+QUERYSET_CHUNK_SIZE = 500
+
+# The maximum number of blobs to look up in a single query.
+BLOB_LOOKUP_BATCH_SIZE = 500
+
+# The maximum number of latest version pointers to create in a single query.
+LATEST_VERSION_BATCH_SIZE = 500
+
+
+# A field included in the serialized data of a registered model.
+#
+# name is the name used in the fields list passed to the serializer, relation is one
+# of None, "foreign_key", "one_to_one" or "many_to_many", and field is the model field.
+FieldInfo = namedtuple("FieldInfo", ("name", "attname", "relation", "field"))
+
+
+def _get_relation_kind(field):
+    """Returns the kind of relation stored by the given field, or None."""
+    if not field.rel:
+        return None
+    if field.many_to_many:
+        return "many_to_many"
+    if field.one_to_one:
+        return "one_to_one"
+    return "foreign_key"
+
+
 class VersionAdapter(object):
 
     """Adapter class for serializing a registered model."""
@@ -40,33 +117,104 @@ class VersionAdapter(object):
     # The serialization format to use.
     format = "json"
 
+    # Whether to store serialized data once in a shared table, instead of copying it into every version.
+    shared_storage = False
+
+    # The compression codec to use for the serialized data, or None to store it uncompressed.
+    compression = None
+
+    # Store versions as a delta against the previous version of the object, with a full
+    # version every keyframe_interval versions. None stores every version in full.
+    keyframe_interval = None
+
+    # Whether to maintain a pointer to the latest version of each object, for faster lookups.
+    track_latest_version = False
+
     def __init__(self, model):
         """Initializes the version adapter."""
         self.model = model
+        self.clear_cache()
+
+    def clear_cache(self):
+        """Clears the field information computed for the model."""
+        self._field_info = None
+        self._json_serializer = None
+        self._content_types = {}
+        self._object_id_field_name = None
+
+    def get_field_info(self):
+        """
+        Returns a tuple of FieldInfo for the fields to serialize in the version data.
+
+        The fields are resolved on first use, as registration can happen before
+        all related models are loaded, and cached until clear_cache() is called.
+        """
+        if self._field_info is None:
+            opts = self.model._meta.concrete_model._meta
+            fields = self.fields or (field.name for field in opts.local_fields + opts.local_many_to_many)
+            fields = (opts.get_field(field) for field in fields if not field in self.exclude)
+            self._field_info = tuple(
+                FieldInfo(
+                    name = field.name if field.rel else field.attname,
+                    attname = field.attname,
+                    relation = _get_relation_kind(field),
+                    field = field,
+                )
+                for field
+                in fields
+            )
+        return self._field_info
+
+    def get_local_field_info(self):
+        """Returns a tuple of FieldInfo for the fields to serialize that are stored on the model's table."""
+        return tuple(field_info for field_info in self.get_field_info() if field_info.relation != "many_to_many")
+
+    def get_many_to_many_field_info(self):
+        """Returns a tuple of FieldInfo for the many-to-many fields to serialize."""
+        return tuple(field_info for field_info in self.get_field_info() if field_info.relation == "many_to_many")
 
     def get_fields_to_serialize(self):
         """Returns an iterable of field names to serialize in the version data."""
-        opts = self.model._meta.concrete_model._meta
-        fields = self.fields or (field.name for field in opts.local_fields + opts.local_many_to_many)
-        fields = (opts.get_field(field) for field in fields if not field in self.exclude)
-        for field in fields:
-            if field.rel:
-                yield field.name
-            else:
-                yield field.attname
+        return [field_info.name for field_info in self.get_field_info()]
 
-    def get_followed_relations(self, obj):
-        """Returns an iterable of related models that should be included in the revision data."""
+    def prefetch_followed_relations(self, objs):
+        """
+        Loads the followed relations of the given objects in bulk.
+
+        Foreign key caches are cleared first, so the related models are always
+        fresh from the database. Relationships that do not support prefetching
+        are left to be loaded by get_followed_relations.
+        """
         for relationship in self.follow:
             # Clear foreign key cache.
             try:
-                related_field = obj._meta.get_field(relationship)
+                related_field = self.model._meta.get_field(relationship)
             except models.FieldDoesNotExist:
                 pass
             else:
                 if isinstance(related_field, models.ForeignKey):
-                    if hasattr(obj, related_field.get_cache_name()):
-                        delattr(obj, related_field.get_cache_name())
+                    for obj in objs:
+                        if hasattr(obj, related_field.get_cache_name()):
+                            delattr(obj, related_field.get_cache_name())
+            # Load the referenced obj(s) for all objects at once.
+            if objs and self._supports_prefetching(objs[0], relationship):
+                prefetch_related_objects(objs, relationship)
+
+    def _supports_prefetching(self, obj, relationship):
+        """Returns whether the given followed relationship of the given object can be prefetched."""
+        try:
+            prefetcher = get_prefetcher(obj, relationship, relationship)[0]
+        except ObjectDoesNotExist:  # pragma: no cover
+            return False
+        return prefetcher is not None
+
+    def get_followed_relations(self, obj):
+        """
+        Returns an iterable of related models that should be included in the revision data.
+
+        Call prefetch_followed_relations first to avoid a query per object.
+        """
+        for relationship in self.follow:
             # Get the referenced obj(s).
             try:
                 related = getattr(obj, relationship)
@@ -87,29 +235,62 @@ class VersionAdapter(object):
         """Returns the serialization format to use."""
         return self.format
 
+    def get_compression(self):
+        """Returns the compression codec to use, or None."""
+        return self.compression
+
     def get_serialized_data(self, obj):
         """Returns a string of serialized data for the given obj."""
+        if is_fast_format(self.get_serialization_format()):
+            if self._json_serializer is None:
+                self._json_serializer = JSONSerializer(self.model, self.get_fields_to_serialize())
+            return self._json_serializer.serialize(obj)
         return serializers.serialize(
             self.get_serialization_format(),
             (obj,),
-            fields = list(self.get_fields_to_serialize()),
+            fields = self.get_fields_to_serialize(),
         )
 
+    def get_content_type(self, db=None):
+        """Returns the content type of the model in the given database, cached per database alias."""
+        if db not in self._content_types:
+            self._content_types[db] = ContentType.objects.db_manager(db).get_for_model(self.model)
+        return self._content_types[db]
+
+    def get_object_id_field_name(self):
+        """Returns the name of the indexed version field that stores the primary key of the model."""
+        if self._object_id_field_name is None:
+            from reversion.models import get_object_id_field_name
+            self._object_id_field_name = get_object_id_field_name(self.model)
+        return self._object_id_field_name
+
+    def has_int_pk(self):
+        """Returns whether the model has an integer primary key, which is stored in object_id_int."""
+        return self.get_object_id_field_name() == "object_id_int"
+
     def get_version_data(self, obj, db=None):
         """Creates the version data to be saved to the version model."""
-        from reversion.models import has_int_pk
+        from reversion.models import get_content_hash, get_object_id_hash
         object_id = force_text(obj.pk)
-        content_type = ContentType.objects.db_manager(db).get_for_model(obj)
-        if has_int_pk(obj.__class__):
-            object_id_int = int(obj.pk)
-        else:
-            object_id_int = None
+        content_type = self.get_content_type(db)
+        object_id_field_name = self.get_object_id_field_name()
+        object_id_int = int(obj.pk) if object_id_field_name == "object_id_int" else None
+        object_id_uuid = self.model._meta.pk.to_python(obj.pk) if object_id_field_name == "object_id_uuid" else None
+        object_id_hash = get_object_id_hash(object_id) if object_id_field_name == "object_id_hash" else ""
+        serialized_data = self.get_serialized_data(obj)
+        content_hash = get_content_hash(serialized_data)
+        compression = self.get_compression() or ""
         return {
             "object_id": object_id,
             "object_id_int": object_id_int,
+            "object_id_uuid": object_id_uuid,
+            "object_id_hash": object_id_hash,
             "content_type": content_type,
             "format": self.get_serialization_format(),
-            "serialized_data": self.get_serialized_data(obj),
+            "serialized_data": compress(compression, serialized_data),
+            "compression": compression,
+            "content_hash": content_hash,
+            "blob_id": content_hash if self.shared_storage else None,
             "object_repr": force_text(obj),
         }
 
@@ -149,6 +330,12 @@ class RevisionContextManager(local):
         self._comment = ""
         self._stack = []
         self._db = None
+        self._deferred = False
+        self._flush_objects = None
+        self._flush_bytes = None
+        self._pending_bytes = 0
+        self._partial_revisions = {}
+        self._saved_objects = defaultdict(set)
 
     def is_active(self):
         """Returns whether there is an active revision for this thread."""
@@ -183,27 +370,120 @@ class RevisionContextManager(local):
         stack_frame = self._stack.pop()
         if self._stack:
             self._current_frame.join(stack_frame)
+            self._flush_if_required()
         else:
             try:
-                if not stack_frame.is_invalid:
+                if stack_frame.is_invalid:
+                    self._delete_partial_revisions()
+                else:
                     # Save the revision data.
-                    for manager, manager_context in stack_frame.objects.items():
-                        manager.save_revision(
-                            dict(
-                                (obj, callable(data) and data() or data)
-                                for obj, data
-                                in manager_context.items()
-                                if obj.pk is not None
-                            ),
-                            user = self._user,
-                            comment = self._comment,
-                            meta = stack_frame.meta,
-                            ignore_duplicates = stack_frame.ignore_duplicates,
-                            db = self._db,
-                        )
+                    for manager in set(stack_frame.objects.keys()) | set(self._partial_revisions.keys()):
+                        objects = self._get_frame_objects(stack_frame, manager)
+                        if manager in self._partial_revisions:
+                            manager.save_revision_part(
+                                objects,
+                                revision = self._partial_revisions[manager],
+                                saved_objects = self._saved_objects[manager],
+                                meta = stack_frame.meta,
+                                db = self._db,
+                            )
+                        elif self._deferred:
+                            self._defer_revision(DeferredRevision(
+                                manager._manager_slug,
+                                manager._capture_objects(objects, self._db),
+                                user = self._user,
+                                comment = self._comment,
+                                meta = stack_frame.meta,
+                                ignore_duplicates = stack_frame.ignore_duplicates,
+                                db = self._db,
+                            ))
+                        else:
+                            manager.save_revision(
+                                objects,
+                                user = self._user,
+                                comment = self._comment,
+                                meta = stack_frame.meta,
+                                ignore_duplicates = stack_frame.ignore_duplicates,
+                                db = self._db,
+                            )
             finally:
                 self.clear()
 
+    def _delete_partial_revisions(self):
+        """
+        Removes the parts of an invalid revision already saved.
+
+        If the transaction the parts were saved in is going to be rolled back,
+        they are rolled back with it, and are left alone. The revision is usually
+        invalid because of an exception, so errors are logged, rather than raised
+        in its place.
+        """
+        from reversion.models import Version
+        for revision in self._partial_revisions.values():
+            if transaction.get_connection(revision._state.db).needs_rollback:
+                continue
+            try:
+                with transaction.atomic(using=revision._state.db):
+                    # Keep the delta chains of the remaining versions intact.
+                    Version.objects.using(revision._state.db).filter(revision=revision).detach_delta_chains()
+                    revision.delete()
+            except Exception:
+                logger.exception("Could not delete the saved parts of an invalid revision")
+
+    def _get_frame_objects(self, stack_frame, manager):
+        """Returns a dict of the saved objects in the given stack frame for the given manager, and their version data."""
+        return dict(
+            (obj, callable(data) and data() or data)
+            for obj, data
+            in stack_frame.objects.get(manager, {}).items()
+            if obj.pk is not None
+        )
+
+    def _flush_if_required(self):
+        """
+        Saves the objects added to the revision so far as part of the revision,
+        if the flush policy requires it.
+
+        Only the outermost revision block is flushed, as nested blocks can still
+        be invalidated. Deferred revisions are never flushed.
+        """
+        if len(self._stack) != 1 or self._deferred:
+            return
+        stack_frame = self._stack[0]
+        if stack_frame.is_invalid:
+            return
+        if not (
+            (self._flush_objects is not None and sum(len(objects) for objects in stack_frame.objects.values()) >= self._flush_objects) or
+            (self._flush_bytes is not None and self._pending_bytes >= self._flush_bytes)
+        ):
+            return
+        for manager in list(stack_frame.objects.keys()):
+            objects = self._get_frame_objects(stack_frame, manager)
+            if objects:
+                self._partial_revisions[manager] = manager.save_revision_part(
+                    objects,
+                    revision = self._partial_revisions.get(manager),
+                    saved_objects = self._saved_objects[manager],
+                    user = self._user,
+                    comment = self._comment,
+                    db = self._db,
+                )
+        stack_frame.objects.clear()
+        self._pending_bytes = 0
+
+    def _defer_revision(self, deferred_revision):
+        """
+        Hands the deferred revision to the revision writer once the current transaction commits.
+
+        On Django < 1.9, which does not support on_commit, the revision is not
+        deferred, but saved at once.
+        """
+        on_commit = getattr(transaction, "on_commit", None)
+        if on_commit is None:  # Django < 1.9 pragma: no cover
+            deferred_revision.save()
+        else:
+            on_commit(partial(get_writer().write, deferred_revision), using=deferred_revision.db)
+
     # Revision context properties that apply to the entire stack.
 
     def get_db(self):
@@ -214,6 +494,39 @@ class RevisionContextManager(local):
         """Sets the DB alias to use."""
         self._db = db
 
+    def set_deferred(self, deferred):
+        """
+        Sets whether to save the revision after the current transaction commits,
+        using the revision writer, rather than when the revision ends.
+        """
+        self._assert_active()
+        self._deferred = deferred
+
+    def is_deferred(self):
+        """Returns whether the revision will be saved after the current transaction commits."""
+        self._assert_active()
+        return self._deferred
+
+    def set_flush_policy(self, max_objects=None, max_bytes=None):
+        """
+        Sets how much revision data to hold in memory before saving it as part of the revision.
+
+        Once max_objects objects have been added to the revision, or
+        max_bytes of serialized data captured, the versions so far are
+        saved, and released from memory. If max_bytes is set, objects are
+        serialized as they are added, rather than when the revision ends.
+        The versions of all parts are saved to the same revision, and the
+        revision is deleted if the revision block fails.
+        """
+        self._assert_active()
+        self._flush_objects = max_objects
+        self._flush_bytes = max_bytes
+
+    def get_flush_policy(self):
+        """Returns a (max_objects, max_bytes) tuple of the current flush policy."""
+        self._assert_active()
+        return self._flush_objects, self._flush_bytes
+
     def set_user(self, user):
         """Sets the current user for the revision."""
         self._assert_active()
@@ -250,7 +563,13 @@ class RevisionContextManager(local):
 
     def add_to_context(self, manager, obj, version_data):
         """Adds an object to the current revision."""
+        if callable(version_data) and self._flush_bytes is not None and not self._deferred:
+            # Serialize the object now, so its size counts towards the flush policy.
+            version_data = version_data()
         self._current_frame.objects[manager][obj] = version_data
+        if not callable(version_data):
+            self._pending_bytes += len(version_data["serialized_data"])
+        self._flush_if_required()
 
     def add_meta(self, cls, **kwargs):
         """Adds a class of meta information to the current revision."""
@@ -404,6 +723,10 @@ class RevisionManager(object):
         all_signals = self._signals[model] + self._eager_signals[model]
         for signal in all_signals:
             signal.connect(self._signal_receiver, model)
+        # Keep the latest version pointers up to date.
+        if adapter_obj.track_latest_version:
+            post_save.connect(self._latest_version_post_save_receiver, model)
+            post_delete.connect(self._latest_version_post_delete_receiver, model)
         return model
 
     def get_adapter(self, model):
@@ -420,29 +743,84 @@ class RevisionManager(object):
             raise RegistrationError("{model} has not been registered with django-reversion".format(
                 model = model,
             ))
-        del self._registered_models[self._registration_key_for_model(model)]
+        adapter_obj = self._registered_models.pop(self._registration_key_for_model(model))
+        adapter_obj.clear_cache()
         all_signals = self._signals[model] + self._eager_signals[model]
         for signal in all_signals:
             signal.disconnect(self._signal_receiver, model)
+        if adapter_obj.track_latest_version:
+            post_save.disconnect(self._latest_version_post_save_receiver, model)
+            post_delete.disconnect(self._latest_version_post_delete_receiver, model)
         del self._signals[model]
         del self._eager_signals[model]
 
-    def _follow_relationships(self, objects):
-        """Follows all relationships in the given set of objects."""
+    def _follow_relationships(self, objects, graph=None):
+        """
+        Follows all relationships in the given set of objects.
+
+        The relationship graph is walked breadth-first, so that each level
+        is loaded with one query per model and relationship. If graph is
+        given, it is updated with the related objects of each followed object,
+        and the concrete objects of proxies are not excluded, as
+        _get_followed_objects() excludes them for each object.
+        """
         followed = set()
-        def _follow(obj, exclude_concrete):
-            # Check the pk first because objects without a pk are not hashable
-            if obj.pk is None or obj in followed or (obj.__class__, obj.pk) == exclude_concrete:
-                return
-            followed.add(obj)
-            adapter = self.get_adapter(obj.__class__)
-            for related in adapter.get_followed_relations(obj):
-                _follow(related, exclude_concrete)
+        pending = []
         for obj in objects:
             exclude_concrete = None
-            if obj._meta.proxy:
+            if obj._meta.proxy and graph is None:
                 exclude_concrete = (obj._meta.concrete_model, obj.pk)
-            _follow(obj, exclude_concrete)
+            pending.append((obj, exclude_concrete))
+        while pending:
+            # Group the unvisited objects by model.
+            level = defaultdict(list)
+            for obj, exclude_concrete in pending:
+                # Check the pk first because objects without a pk are not hashable
+                if obj.pk is None or obj in followed or (obj.__class__, obj.pk) == exclude_concrete:
+                    continue
+                followed.add(obj)
+                level[obj.__class__].append((obj, exclude_concrete))
+            # Load the next level of the graph.
+            pending = []
+            for model, model_objects in level.items():
+                adapter = self.get_adapter(model)
+                objs = [obj for obj, _ in model_objects]
+                # Don't leave our prefetched relations behind on the caller's objects.
+                prefetched_caches = [_copy_prefetched_objects_cache(obj) for obj in objs]
+                try:
+                    adapter.prefetch_followed_relations(objs)
+                    for obj, exclude_concrete in model_objects:
+                        related_objects = list(adapter.get_followed_relations(obj))
+                        if graph is not None:
+                            graph[obj] = related_objects
+                        pending.extend(
+                            (related, exclude_concrete)
+                            for related
+                            in related_objects
+                        )
+                finally:
+                    for obj, prefetched_cache in zip(objs, prefetched_caches):
+                        _restore_prefetched_objects_cache(obj, prefetched_cache)
+        return followed
+
+    def _get_followed_objects(self, obj, graph):
+        """
+        Returns the given object and all the objects its relationships lead
+        to, from a graph recorded by _follow_relationships().
+        """
+        exclude_concrete = None
+        if obj._meta.proxy:
+            exclude_concrete = (obj._meta.concrete_model, obj.pk)
+        followed = []
+        seen = set()
+        pending = [obj]
+        while pending:
+            obj = pending.pop()
+            if obj.pk is None or obj in seen or (obj.__class__, obj.pk) == exclude_concrete:
+                continue
+            seen.add(obj)
+            followed.append(obj)
+            pending.extend(reversed(graph.get(obj, ())))
         return followed
 
     def _get_versions(self, db=None):
@@ -452,39 +830,375 @@ class RevisionManager(object):
             revision__manager_slug = self._manager_slug,
         ).select_related("revision")
 
-    def save_revision(self, objects, ignore_duplicates=False, user=None, comment="", meta=(), db=None):
-        """Saves a new revision."""
-        from reversion.models import Revision, Version, has_int_pk
+    def _get_object_reference_filter(self, versions):
+        """Returns a Q object matching the object references of the given versions."""
+        from reversion.models import get_object_id_hash
+        # Group the object references by content type, to keep the query small.
+        object_ids = defaultdict(set)
+        object_ids_int = defaultdict(set)
+        object_ids_uuid = defaultdict(set)
+        for version in versions:
+            if version.object_id_int is not None:
+                object_ids_int[version.content_type_id].add(version.object_id_int)
+            elif version.object_id_uuid is not None:
+                object_ids_uuid[version.content_type_id].add(version.object_id_uuid)
+            else:
+                object_ids[version.content_type_id].add(version.object_id)
+        subqueries = [
+            Q(
+                content_type_id = content_type_id,
+                object_id_hash__in = [get_object_id_hash(object_id) for object_id in ids],
+                object_id__in = ids,
+            )
+            for content_type_id, ids
+            in object_ids.items()
+        ] + [
+            Q(content_type_id=content_type_id, object_id_int__in=ids)
+            for content_type_id, ids
+            in object_ids_int.items()
+        ] + [
+            Q(content_type_id=content_type_id, object_id_uuid__in=ids)
+            for content_type_id, ids
+            in object_ids_uuid.items()
+        ]
+        return reduce(operator.or_, subqueries)
+
+    def _get_object_versions(self, versions, db=None):
+        """Returns all saved versions of the objects referenced by the given versions."""
+        return self._get_versions(db).filter(self._get_object_reference_filter(versions))
+
+    def _get_latest_versions(self, db=None):
+        """Returns all latest version pointers that apply to this manager."""
+        from reversion.models import LatestVersion
+        return LatestVersion.objects.using(db).filter(
+            manager_slug = self._manager_slug,
+        )
+
+    def _get_latest_versions_for_object_reference(self, model, object_id, db=None):
+        """Returns the latest version pointers for the given object reference."""
+        from reversion.models import get_object_id_lookup
+        return self._get_latest_versions(db).filter(
+            content_type = self.get_adapter(model).get_content_type(db),
+            **get_object_id_lookup(model, object_id)
+        )
+
+    def _is_tracking_latest_version(self, model):
+        """Returns whether latest version pointers are maintained for the given model."""
+        return self.is_registered(model) and self.get_adapter(model).track_latest_version
+
+    def _save_latest_versions(self, objects, versions, db):
+        """Points the latest version pointers of the given objects at their new versions."""
+        from reversion.models import LatestVersion
+        # Only the last version of each object is the latest one.
+        tracked_versions = list(OrderedDict(
+            ((version.content_type_id, version.object_id), (obj, version))
+            for obj, version
+            in zip(objects, versions)
+            if self.get_adapter(obj.__class__).track_latest_version
+        ).values())
+        if not tracked_versions:
+            return
+        # Find out which objects have already been deleted, such as those saved by pre_delete signals.
+        object_pks = defaultdict(set)
+        for obj, _ in tracked_versions:
+            object_pks[(obj.__class__, obj._state.db)].add(obj.pk)
+        live_objects = set()
+        for (model, model_db), pks in object_pks.items():
+            live_objects.update(
+                (model, force_text(pk))
+                for pk
+                in model._default_manager.db_manager(model_db).filter(pk__in=pks).values_list("pk", flat=True).iterator()
+            )
+        # Replace the old pointers.
+        self._get_latest_versions(db).filter(
+            self._get_object_reference_filter(version for _, version in tracked_versions),
+        ).delete()
+        LatestVersion.objects.using(db).bulk_create([
+            LatestVersion(
+                manager_slug = self._manager_slug,
+                content_type_id = version.content_type_id,
+                object_id = version.object_id,
+                object_id_int = version.object_id_int,
+                object_id_uuid = version.object_id_uuid,
+                object_id_hash = version.object_id_hash,
+                version_id = version.pk,
+                revision_id = version.revision_id,
+                is_deleted = (obj.__class__, version.object_id) not in live_objects,
+            )
+            for obj, version
+            in tracked_versions
+        ], batch_size=LATEST_VERSION_BATCH_SIZE)
+
+    def update_latest_versions(self, model, db=None, model_db=None):
+        """
+        Rebuilds the latest version pointers of the given model from its saved versions.
+
+        Call this after registering a model that already has versions with
+        track_latest_version=True. The pointers are created in batches, and
+        only the objects of each batch are looked up in the model table.
+        Returns the number of pointers created.
+        """
+        model_db = model_db or db
+        adapter = self.get_adapter(model)
+        content_type = adapter.get_content_type(db)
+        object_id_field = adapter.get_object_id_field_name()
+        if object_id_field == "object_id_hash":
+            object_id_field = "object_id"
+        latest_version_pks = self._get_versions(db).filter(
+            content_type = content_type,
+        ).order_by().values_list(object_id_field).annotate(
+            latest_pk = Max("pk"),
+        ).values_list("latest_pk", flat=True)
+        pointer_count = 0
+        with transaction.atomic(using=db):
+            self._get_latest_versions(db).filter(content_type=content_type).delete()
+            batch = []
+            for pk in latest_version_pks.iterator():
+                batch.append(pk)
+                if len(batch) >= LATEST_VERSION_BATCH_SIZE:
+                    pointer_count += self._create_latest_versions(model, batch, db, model_db)
+                    batch = []
+            if batch:
+                pointer_count += self._create_latest_versions(model, batch, db, model_db)
+        return pointer_count
+
+    def _create_latest_versions(self, model, version_pks, db, model_db):
+        """Creates latest version pointers for the given saved versions of the given model, and returns how many."""
+        from reversion.models import Version, LatestVersion, get_object_id_hash
+        is_hashed = self.get_adapter(model).get_object_id_field_name() == "object_id_hash"
+        versions = list(Version.objects.using(db).filter(
+            pk__in = version_pks,
+        ).values_list("pk", "revision_id", "content_type_id", "object_id", "object_id_int", "object_id_uuid").iterator())
+        live_pks = set(
+            force_text(pk)
+            for pk
+            in model._default_manager.db_manager(model_db).filter(
+                pk__in = [object_id for _, _, _, object_id, _, _ in versions],
+            ).values_list("pk", flat=True).iterator()
+        )
+        LatestVersion.objects.using(db).bulk_create([
+            LatestVersion(
+                manager_slug = self._manager_slug,
+                content_type_id = content_type_id,
+                object_id = object_id,
+                object_id_int = object_id_int,
+                object_id_uuid = object_id_uuid,
+                object_id_hash = get_object_id_hash(object_id) if is_hashed else "",
+                version_id = pk,
+                revision_id = revision_id,
+                is_deleted = object_id not in live_pks,
+            )
+            for pk, revision_id, content_type_id, object_id, object_id_int, object_id_uuid
+            in versions
+        ])
+        return len(versions)
+
+    def _get_content_hashes(self, versions):
+        """Returns the content hashes of the given saved versions."""
+        from reversion.models import get_content_hash
+        content_hashes = []
+        legacy_version_pks = []
+        for pk, content_hash in versions.values_list("pk", "content_hash").iterator():
+            if content_hash:
+                content_hashes.append(content_hash)
+            else:
+                legacy_version_pks.append(pk)
+        # Versions saved before content hashes were introduced have to be hashed here.
+        if legacy_version_pks:
+            content_hashes.extend(
+                get_content_hash(serialized_data)
+                for serialized_data
+                in versions.filter(pk__in=legacy_version_pks).values_list("serialized_data", flat=True).iterator()
+            )
+        return content_hashes
+
+    def _save_deltas(self, objects, versions, db=None):
+        """Replaces the serialized data of the given versions with deltas, if their model uses delta encoding."""
+        from reversion.models import Version
+        delta_versions = []
+        for obj, version in zip(objects, versions):
+            adapter = self.get_adapter(obj.__class__)
+            if adapter.keyframe_interval and version.format == "json":
+                delta_versions.append((adapter, version))
+        if not delta_versions:
+            return
+        # Load the previous version of each object.
+        latest_version_pks = self._get_object_versions([version for _, version in delta_versions], db).values(
+            "content_type_id",
+            "object_id",
+        ).annotate(
+            latest_pk = Max("pk"),
+        ).values_list("latest_pk", flat=True)
+        previous_versions = dict(
+            ((version.content_type_id, version.object_id), version)
+            for version
+            in Version.objects.using(db).filter(pk__in=list(latest_version_pks))
+        )
+        # Encode the deltas.
+        for adapter, version in delta_versions:
+            previous_version = previous_versions.get((version.content_type_id, version.object_id))
+            if previous_version is None or previous_version.format != version.format:
+                continue
+            if previous_version.delta_depth + 1 >= adapter.keyframe_interval:
+                continue
+            serialized_data = decompress(version.compression, version.serialized_data)
+            delta_data = make_delta(previous_version.get_serialized_data(), serialized_data)
+            if delta_data is None:
+                continue
+            version.serialized_data = compress(version.compression, delta_data)
+            version.delta_base = previous_version
+            version.delta_depth = previous_version.delta_depth + 1
+            version.blob_id = None
+            version._serialized_data_cache = serialized_data
+
+    def _save_blobs(self, versions, db=None):
+        """Moves the serialized data of the given shared storage versions into blobs, creating any that are missing."""
+        from reversion.models import VersionBlob
+        shared_versions = [version for version in versions if version.blob_id is not None]
+        queryset = VersionBlob.objects.using(db)
+        blob_data = dict((version.blob_id, (version.serialized_data, version.compression)) for version in shared_versions)
+        content_hashes = list(blob_data.keys())
+        existing_content_hashes = set()
+        for i in range(0, len(content_hashes), BLOB_LOOKUP_BATCH_SIZE):
+            existing_content_hashes.update(queryset.filter(
+                pk__in = content_hashes[i:i+BLOB_LOOKUP_BATCH_SIZE],
+            ).values_list("pk", flat=True))
+        new_blobs = [
+            VersionBlob(content_hash=content_hash, serialized_data=serialized_data, compression=compression)
+            for content_hash, (serialized_data, compression)
+            in blob_data.items()
+            if content_hash not in existing_content_hashes
+        ]
+        if new_blobs:
+            try:
+                with transaction.atomic(using=db):
+                    queryset.bulk_create(new_blobs)
+            except IntegrityError:
+                # Another revision has created some of these blobs concurrently.
+                for blob in new_blobs:
+                    queryset.get_or_create(
+                        content_hash = blob.content_hash,
+                        defaults = {"serialized_data": blob.serialized_data, "compression": blob.compression},
+                    )
+        # The versions themselves no longer need a copy of the data.
+        for version in shared_versions:
+            version._serialized_data_cache = decompress(version.compression, version.serialized_data)
+            version.serialized_data = ""
+            version.compression = ""
+
+    def _save_versions(self, versions, db=None):
+        """Inserts the given unsaved versions in bulk, populating their primary keys."""
+        from reversion.models import Version
+        queryset = Version.objects.using(db)
+        # Only some backends return the primary keys of bulk inserted rows, so the rest are looked up.
+        # Only look among the rows inserted now, as a revision saved in parts already has versions.
+        if getattr(connections[queryset.db].features, "can_return_ids_from_bulk_insert", False):
+            last_pk = None
+        else:
+            last_pk = queryset.aggregate(last_pk=Max("pk"))["last_pk"]
+        queryset.bulk_create(versions)
+        # An object can only appear once in a revision, so the object reference identifies each version.
+        unsaved_versions = dict(
+            ((version.revision_id, version.content_type_id, version.object_id), version)
+            for version in versions
+            if version.pk is None
+        )
+        if unsaved_versions:
+            saved_pks = queryset.filter(
+                revision_id__in = set(revision_id for revision_id, _, _ in unsaved_versions.keys()),
+            )
+            if last_pk is not None:
+                saved_pks = saved_pks.filter(pk__gt=last_pk)
+            saved_pks = saved_pks.values_list("pk", "revision_id", "content_type_id", "object_id")
+            for pk, revision_id, content_type_id, object_id in saved_pks.iterator():
+                version = unsaved_versions.get((revision_id, content_type_id, object_id))
+                if version is not None:
+                    version.pk = pk
+        # Mark the versions as saved, as Version.save() would have done.
+        for version in versions:
+            version._state.adding = False
+            version._state.db = queryset.db
+
+    def _capture_objects(self, objects, db=None, follow=True, graph=None):
+        """
+        Returns a dict of version data for the given objects, and optionally
+        for all the objects their followed relationships lead to.
+
+        If graph is given, it is updated with the related objects of each
+        followed object.
+        """
         # Adapt the objects to a dict.
         if isinstance(objects, (list, tuple)):
             objects = dict(
                 (obj, self.get_adapter(obj.__class__).get_version_data(obj, db))
                 for obj in objects
             )
-        # Create the revision.
-        if objects:
-            # Follow relationships.
-            for obj in self._follow_relationships(objects.keys()):
+        # Follow relationships.
+        if objects and follow:
+            for obj in self._follow_relationships(objects.keys(), graph):
                 if obj not in objects:
                     adapter = self.get_adapter(obj.__class__)
                     objects[obj] = adapter.get_version_data(obj)
+        return objects
+
+    def _create_versions(self, objects, ordered_objects):
+        """Returns unsaved versions for the given objects, from their captured version data."""
+        from reversion.models import Version, get_content_hash, get_object_id_hash
+        new_versions = [Version(**objects[obj]) for obj in ordered_objects]
+        for version in new_versions:
+            if not version.content_hash:
+                version.content_hash = get_content_hash(version.serialized_data)
+            # Only versions of models without an integer or UUID primary key are looked up by hash.
+            if not version.object_id_hash and version.object_id_int is None and version.object_id_uuid is None:
+                version.object_id_hash = get_object_id_hash(version.object_id)
+        return new_versions
+
+    def _set_revision_summary(self, revision, versions):
+        """Stores a summary of the given versions on the given unsaved revision."""
+        from reversion.models import get_revision_summary
+        revision.version_count = len(versions)
+        revision.summary = get_revision_summary(version.object_repr for version in versions)
+
+    def _save_revision_content_types(self, revision_versions, db=None):
+        """Records the content types of the versions of each of the given (revision, versions) pairs."""
+        from reversion.models import Revision
+        through = Revision.content_types.through
+        through.objects.using(db).bulk_create([
+            through(revision_id=revision.pk, contenttype_id=content_type_id)
+            for revision, versions
+            in revision_versions
+            for content_type_id
+            in sorted(set(version.content_type_id for version in versions))
+        ])
+
+    def save_revision(self, objects, ignore_duplicates=False, user=None, comment="", meta=(), db=None, follow=True):
+        """
+        Saves a new revision.
+
+        If follow is False, the relationships of the objects are not followed,
+        as the objects already include them.
+        """
+        from reversion.models import Revision
+        objects = self._capture_objects(objects, db, follow)
+        # Create the revision.
+        if objects:
             # Create all the versions without saving them
             ordered_objects = list(objects.keys())
-            new_versions = [Version(**objects[obj]) for obj in ordered_objects]
+            new_versions = self._create_versions(objects, ordered_objects)
             # Check if there's some change in all the revision's objects.
             save_revision = True
             if ignore_duplicates:
                 # Find the latest revision amongst the latest previous version of each object.
-                subqueries = [Q(object_id=version.object_id, content_type=version.content_type) for version in new_versions]
-                subqueries = reduce(operator.or_, subqueries)
-                latest_revision = self._get_versions(db).filter(subqueries).aggregate(Max("revision"))["revision__max"]
+                if all(self._is_tracking_latest_version(obj.__class__) for obj in ordered_objects):
+                    latest_versions = self._get_latest_versions(db).filter(self._get_object_reference_filter(new_versions))
+                else:
+                    latest_versions = self._get_object_versions(new_versions, db)
+                latest_revision = latest_versions.aggregate(Max("revision"))["revision__max"]
                 # If we have a latest revision, compare it to the current revision.
                 if latest_revision is not None:
-                    previous_versions = self._get_versions(db).filter(revision=latest_revision).values_list("serialized_data", flat=True)
-                    if len(previous_versions) == len(new_versions):
-                        all_serialized_data = [version.serialized_data for version in new_versions]
-                        if sorted(previous_versions) == sorted(all_serialized_data):
-                            save_revision = False
+                    previous_hashes = self._get_content_hashes(self._get_versions(db).filter(revision=latest_revision))
+                    if sorted(previous_hashes) == sorted(version.content_hash for version in new_versions):
+                        save_revision = False
             # Only save if we're always saving, or have changes.
             if save_revision:
                 # Save a new revision.
@@ -493,6 +1207,7 @@ class RevisionManager(object):
                     user = user,
                     comment = comment,
                 )
+                self._set_revision_summary(revision, new_versions)
                 # Send the pre_revision_commit signal.
                 pre_revision_commit.send(self,
                     instances = ordered_objects,
@@ -505,7 +1220,12 @@ class RevisionManager(object):
                     # Save version models.
                     for version in new_versions:
                         version.revision = revision
-                        version.save()
+                        version.date_created = revision.date_created
+                    self._save_deltas(ordered_objects, new_versions, db)
+                    self._save_blobs(new_versions, db)
+                    self._save_versions(new_versions, db)
+                    self._save_revision_content_types([(revision, new_versions)], db)
+                    self._save_latest_versions(ordered_objects, new_versions, db)
                     # Save the meta information.
                     for cls, kwargs in meta:
                         cls._default_manager.db_manager(db).create(revision=revision, **kwargs)
@@ -518,37 +1238,266 @@ class RevisionManager(object):
                 # Return the revision.
                 return revision
 
+    def save_revisions(self, objects, user=None, comment="", db=None):
+        """
+        Saves a separate revision for each of the given objects, writing the
+        versions of all the revisions in bulk.
+
+        Relationships are followed for each object, as in save_revision().
+        The relationships of all the objects are followed together, and an
+        object related to several of them is saved in each of their revisions.
+        Returns a list of the new revisions.
+        """
+        from reversion.models import Revision
+        objects = list(objects)
+        graph = {}
+        captured_objects = self._capture_objects(objects, db, graph=graph)
+        revisions = []
+        revision_objects = []
+        revision_versions = []
+        for obj in objects:
+            ordered_objects = self._get_followed_objects(obj, graph)
+            new_versions = self._create_versions(captured_objects, ordered_objects)
+            revision = Revision(
+                manager_slug = self._manager_slug,
+                user = user,
+                comment = comment,
+            )
+            self._set_revision_summary(revision, new_versions)
+            pre_revision_commit.send(self,
+                instances = ordered_objects,
+                revision = revision,
+                versions = new_versions,
+            )
+            revisions.append(revision)
+            revision_objects.append(ordered_objects)
+            revision_versions.append(new_versions)
+        if not revisions:
+            return revisions
+        with transaction.atomic(using=db):
+            # Only some backends return the primary keys of bulk inserted rows.
+            if getattr(connections[db or router.db_for_write(Revision)].features, "can_return_ids_from_bulk_insert", False):
+                Revision.objects.using(db).bulk_create(revisions)
+            else:
+                for revision in revisions:
+                    revision.save(using=db)
+            all_objects = []
+            all_versions = []
+            for revision, ordered_objects, new_versions in zip(revisions, revision_objects, revision_versions):
+                for version in new_versions:
+                    version.revision = revision
+                    version.date_created = revision.date_created
+                all_objects.extend(ordered_objects)
+                all_versions.extend(new_versions)
+            self._save_deltas(all_objects, all_versions, db)
+            self._save_blobs(all_versions, db)
+            self._save_versions(all_versions, db)
+            self._save_revision_content_types(zip(revisions, revision_versions), db)
+            self._save_latest_versions(all_objects, all_versions, db)
+        for revision, ordered_objects, new_versions in zip(revisions, revision_objects, revision_versions):
+            post_revision_commit.send(self,
+                instances = ordered_objects,
+                revision = revision,
+                versions = new_versions,
+            )
+        return revisions
+
+    def save_revision_part(self, objects, revision=None, saved_objects=None, user=None, comment="", meta=(), db=None):
+        """
+        Saves part of a revision that is too large to hold in memory, returning the revision.
+
+        If revision is None, a new revision is created, otherwise the versions
+        are added to the given revision. saved_objects is a set of the
+        (content type id, object id) pairs already saved in the revision, and
+        is updated with the saved objects. An object saved again replaces its
+        earlier version in the revision. Duplicate revisions are not ignored.
+        """
+        from reversion.models import Revision, get_revision_summary
+        saved_objects = set() if saved_objects is None else saved_objects
+        objects = self._capture_objects(objects, db)
+        ordered_objects = list(objects.keys())
+        new_versions = self._create_versions(objects, ordered_objects)
+        if revision is None:
+            revision = Revision(
+                manager_slug = self._manager_slug,
+                user = user,
+                comment = comment,
+            )
+        # Add the objects not already in the revision to its summary.
+        saved_content_type_ids = set(content_type_id for content_type_id, _ in saved_objects)
+        added_object_reprs = OrderedDict(
+            ((version.content_type_id, version.object_id), version.object_repr)
+            for version
+            in new_versions
+            if (version.content_type_id, version.object_id) not in saved_objects
+        )
+        revision.version_count = len(saved_objects) + len(added_object_reprs)
+        revision.summary = get_revision_summary(added_object_reprs.values(), revision.summary)
+        pre_revision_commit.send(self,
+            instances = ordered_objects,
+            revision = revision,
+            versions = new_versions,
+        )
+        with transaction.atomic(using=db):
+            if revision.pk is None:
+                revision.save(using=db)
+            else:
+                revision.save(using=db, update_fields=("version_count", "summary"))
+            # Replace the earlier versions of objects saved again.
+            replaced_object_ids = defaultdict(list)
+            for version in new_versions:
+                if (version.content_type_id, version.object_id) in saved_objects:
+                    replaced_object_ids[version.content_type_id].append(version.object_id)
+            for content_type_id, object_ids in replaced_object_ids.items():
+                replaced_versions = self._get_versions(db).filter(
+                    revision = revision,
+                    content_type_id = content_type_id,
+                    object_id__in = object_ids,
+                )
+                replaced_versions.detach_delta_chains()
+                replaced_versions.delete()
+            for version in new_versions:
+                version.revision = revision
+                version.date_created = revision.date_created
+            self._save_deltas(ordered_objects, new_versions, db)
+            self._save_blobs(new_versions, db)
+            self._save_versions(new_versions, db)
+            self._save_revision_content_types([(revision, [
+                version
+                for version
+                in new_versions
+                if version.content_type_id not in saved_content_type_ids
+            ])], db)
+            self._save_latest_versions(ordered_objects, new_versions, db)
+            saved_objects.update((version.content_type_id, version.object_id) for version in new_versions)
+            # Save the meta information.
+            for cls, kwargs in meta:
+                cls._default_manager.db_manager(db).create(revision=revision, **kwargs)
+        post_revision_commit.send(self,
+            instances = ordered_objects,
+            revision = revision,
+            versions = new_versions,
+        )
+        return revision
+
+    def add_to_revision(self, objects, chunk_size=QUERYSET_CHUNK_SIZE):
+        """
+        Adds the given objects to the active revision, as if they had been saved.
+
+        Use this to version objects changed by bulk_create(), QuerySet.update()
+        or raw SQL, which do not send the signals that add objects to the
+        revision. objects can be a list of objects, or a queryset, which is
+        read in chunks of chunk_size, ordered by primary key. The objects are
+        held in memory until the revision ends, unless a flush policy is set.
+        """
+        context = self._revision_context_manager
+        context._assert_active()
+        if isinstance(objects, QuerySet):
+            chunks = _iter_queryset_chunks(objects, chunk_size)
+        else:
+            chunks = [objects]
+        for objs in chunks:
+            for obj in objs:
+                if obj.pk is not None:
+                    adapter = self.get_adapter(obj.__class__)
+                    context.add_to_context(self, obj, partial(adapter.get_version_data, obj, context.get_db()))
+
+    def save_revision_for_queryset(self, queryset, user=None, comment="", meta=(), db=None, chunk_size=QUERYSET_CHUNK_SIZE):
+        """
+        Saves a new revision containing all the objects in the given queryset, returning the revision.
+
+        The objects are read in chunks of chunk_size, ordered by primary key,
+        and the versions of each chunk are saved in bulk, so memory use does
+        not grow with the size of the queryset. Returns None if the queryset
+        is empty.
+        """
+        revision = None
+        saved_objects = set()
+        with transaction.atomic(using=db):
+            for objs in _iter_queryset_chunks(queryset, chunk_size):
+                revision = self.save_revision_part(
+                    objs,
+                    revision = revision,
+                    saved_objects = saved_objects,
+                    user = user,
+                    comment = comment,
+                    db = db,
+                )
+            # Save the meta information.
+            if revision is not None:
+                for cls, kwargs in meta:
+                    cls._default_manager.db_manager(db).create(revision=revision, **kwargs)
+        return revision
+
     # Revision management API.
 
-    def get_for_object_reference(self, model, object_id, db=None):
+    def _filter_by_date(self, versions, date_from=None, date_to=None):
+        """
+        Filters the given versions to those created between the given dates, inclusive.
+
+        The dates are compared with the version's own copy of its revision
+        date, so no join is needed, and date partitions can be skipped.
+        """
+        if date_from is not None:
+            versions = versions.filter(date_created__gte=date_from)
+        if date_to is not None:
+            versions = versions.filter(date_created__lte=date_to)
+        return versions
+
+    def get_for_object_reference(self, model, object_id, db=None, date_from=None, date_to=None):
         """
         Returns all versions for the given object reference.
 
+        If date_from or date_to are given, only versions created between them are returned.
         The results are returned with the most recent versions first.
         """
-        from reversion.models import has_int_pk
+        from reversion.models import get_object_id_lookup
         content_type = ContentType.objects.db_manager(db).get_for_model(model)
+        # We can do this as a fast, indexed lookup.
         versions = self._get_versions(db).filter(
             content_type = content_type,
+            **get_object_id_lookup(model, object_id)
         ).select_related("revision")
-        if has_int_pk(model):
-            # We can do this as a fast, indexed lookup.
-            object_id_int = int(object_id)
-            versions = versions.filter(object_id_int=object_id_int)
-        else:
-            # We can't do this using an index. Never mind.
-            object_id = force_text(object_id)
-            versions = versions.filter(object_id=object_id)
+        versions = self._filter_by_date(versions, date_from, date_to)
         versions = versions.order_by("-pk")
         return versions
 
-    def get_for_object(self, obj, db=None):
+    def get_for_object(self, obj, db=None, date_from=None, date_to=None):
         """
         Returns all the versions of the given object, ordered by date created.
 
+        If date_from or date_to are given, only versions created between them are returned.
         The results are returned with the most recent versions first.
         """
-        return self.get_for_object_reference(obj.__class__, obj.pk, db)
+        return self.get_for_object_reference(obj.__class__, obj.pk, db, date_from, date_to)
+
+    def get_latest_for_object_reference(self, model, object_id, db=None):
+        """
+        Returns the latest version of the given object reference.
+
+        Raises Version.DoesNotExist if the object has no versions.
+        """
+        from reversion.models import Version
+        if self._is_tracking_latest_version(model):
+            latest_versions = list(self._get_latest_versions_for_object_reference(model, object_id, db).select_related(
+                "version",
+                "version__revision",
+            ).order_by("-version_id")[:1])
+            if latest_versions:
+                return latest_versions[0].version
+        # Fall back to the full history, for untracked models or versions saved before tracking began.
+        versions = list(self.get_for_object_reference(model, object_id, db)[:1])
+        if versions:
+            return versions[0]
+        raise Version.DoesNotExist
+
+    def get_latest_for_object(self, obj, db=None):
+        """
+        Returns the latest version of the given object.
+
+        Raises Version.DoesNotExist if the object has no versions.
+        """
+        return self.get_latest_for_object_reference(obj.__class__, obj.pk, db)
 
     def get_unique_for_object(self, obj, db=None):
         """
@@ -564,8 +1513,12 @@ class RevisionManager(object):
     def get_for_date(self, object, date, db=None):
         """Returns the latest version of an object for the given date."""
         from reversion.models import Version
-        versions = self.get_for_object(object, db)
-        versions = versions.filter(revision__date_created__lte=date)
+        # The latest version is usually the one wanted, and can be found quickly.
+        if self._is_tracking_latest_version(object.__class__):
+            version = self.get_latest_for_object(object, db)
+            if version.revision.date_created <= date:
+                return version
+        versions = self.get_for_object(object, db, date_to=date)
         try:
             version = versions[0]
         except IndexError:
@@ -579,21 +1532,39 @@ class RevisionManager(object):
 
         The results are returned with the most recent versions first.
         """
-        from reversion.models import has_int_pk
+        from reversion.models import get_object_id_field_name
+        if self._is_tracking_latest_version(model_class):
+            # The latest version pointers record which objects have been deleted.
+            adapter = self.get_adapter(model_class)
+            object_id_field_name = adapter.get_object_id_field_name()
+            if object_id_field_name == "object_id_hash":
+                object_id_field_name = "object_id"
+            # Revisions of the same object saved concurrently can leave it with several pointers, so only use the latest.
+            deleted_version_pks = self._get_latest_versions(db).filter(
+                content_type = adapter.get_content_type(db),
+                is_deleted = True,
+            ).order_by().values_list(object_id_field_name).annotate(
+                latest_pk = Max("version_id"),
+            ).values_list("latest_pk", flat=True)
+            # HACK: MySQL deals extremely badly with grouped subqueries, as below.
+            if connection.vendor == "mysql":  # pragma: no cover
+                deleted_version_pks = list(deleted_version_pks)
+            return self._get_versions(db).filter(pk__in=deleted_version_pks).order_by("-pk")
         model_db = model_db or db
         content_type = ContentType.objects.db_manager(db).get_for_model(model_class)
         live_pk_queryset = model_class._default_manager.db_manager(model_db).all().values_list("pk", flat=True)
         versioned_objs = self._get_versions(db).filter(
             content_type = content_type,
         )
-        if has_int_pk(model_class):
+        object_id_field_name = get_object_id_field_name(model_class)
+        if object_id_field_name != "object_id_hash":
             # If the model and version data are in different databases, decouple the queries.
             if model_db != db:
                 live_pk_queryset = list(live_pk_queryset.iterator())
             # We can do this as a fast, in-database join.
-            deleted_version_pks = versioned_objs.exclude(
-                object_id_int__in = live_pk_queryset
-            ).values_list("object_id_int")
+            deleted_version_pks = versioned_objs.exclude(**{
+                object_id_field_name + "__in": live_pk_queryset,
+            }).values_list(object_id_field_name)
         else:
             # This join has to be done as two separate queries.
             deleted_version_pks = versioned_objs.exclude(
@@ -631,10 +1602,105 @@ class RevisionManager(object):
                 self._revision_context_manager.add_to_context(self, instance, version_data)
 
 
+    def _latest_version_post_save_receiver(self, instance, created, **kwargs):
+        """Marks the latest version of a recreated object as not deleted."""
+        if created:
+            self._get_latest_versions_for_object_reference(
+                instance.__class__,
+                instance.pk,
+                self._revision_context_manager.get_db(),
+            ).filter(is_deleted=True).update(is_deleted=False)
+
+    def _latest_version_post_delete_receiver(self, instance, **kwargs):
+        """Marks the latest version of a deleted object as deleted."""
+        self._get_latest_versions_for_object_reference(
+            instance.__class__,
+            instance.pk,
+            self._revision_context_manager.get_db(),
+        ).update(is_deleted=True)
+
+
 # A shared revision manager.
 default_revision_manager = RevisionManager("default")
 
 
+class VersionedQuerySet(QuerySet):
+
+    """
+    A queryset that adds the objects changed by bulk_create() and update() to the active revision.
+
+    Use VersionedQuerySet.as_manager() as a manager of a registered model.
+    bulk_create() raises RevisionManagementError for objects without primary
+    keys in an active revision, unless the database backend returns the
+    primary keys of bulk inserted rows. update() is run in
+    chunks of revision_chunk_size objects, ordered by primary key, so the
+    updated objects can be read back.
+    """
+
+    revision_chunk_size = QUERYSET_CHUNK_SIZE
+
+    def _get_active_revision_managers(self):
+        """Returns the revision managers with an active revision that the model of this queryset is registered with."""
+        return [
+            manager
+            for _, manager
+            in RevisionManager.get_created_managers()
+            if manager.is_registered(self.model)
+            and manager._revision_context_manager.is_active()
+            and not manager._revision_context_manager.is_managing_manually()
+        ]
+
+    def bulk_create(self, objs, *args, **kwargs):
+        """Creates the given objects in bulk, and adds them to the active revision."""
+        managers = self._get_active_revision_managers()
+        if not managers:
+            return super(VersionedQuerySet, self).bulk_create(objs, *args, **kwargs)
+        objs = list(objs)
+        # Objects without primary keys could not be versioned, so don't create them.
+        if not getattr(connections[self.db].features, "can_return_ids_from_bulk_insert", False) and any(obj.pk is None for obj in objs):
+            raise RevisionManagementError(
+                "bulk_create() can only version objects with primary keys on this database. "
+                "Set their primary keys, or save them one at a time."
+            )
+        objs = super(VersionedQuerySet, self).bulk_create(objs, *args, **kwargs)
+        for manager in managers:
+            manager.add_to_revision(objs)
+        return objs
+
+    def update(self, **kwargs):
+        """Updates the objects in this queryset, and adds them to the active revision."""
+        managers = self._get_active_revision_managers()
+        if not managers or not self.query.can_filter():
+            return super(VersionedQuerySet, self).update(**kwargs)
+        rows = 0
+        pks = self.order_by("pk").values_list("pk", flat=True)
+        last_pk = None
+        with transaction.atomic(using=self.db):
+            while True:
+                chunk = pks if last_pk is None else pks.filter(pk__gt=last_pk)
+                chunk_pks = list(chunk[:self.revision_chunk_size])
+                if not chunk_pks:
+                    break
+                last_pk = chunk_pks[-1]
+                updated = QuerySet(self.model, using=self.db).filter(pk__in=chunk_pks)
+                rows += updated.update(**kwargs)
+                objs = list(updated)
+                for manager in managers:
+                    manager.add_to_revision(objs)
+        return rows
+    update.alters_data = True
+
+
+def _clear_adapter_content_types(**kwargs):
+    """Clears the content types cached by all version adapters, as migrations can recreate them."""
+    for _, manager in RevisionManager.get_created_managers():
+        for adapter in manager._registered_models.values():
+            adapter._content_types = {}
+
+
+post_migrate.connect(_clear_adapter_content_types)
+
+
 # Easy registration methods.
 register = default_revision_manager.register
 is_registered = default_revision_manager.is_registered
@@ -656,12 +1722,20 @@ get_comment = revision_context_manager.get_comment
 set_comment = revision_context_manager.set_comment
 add_meta = revision_context_manager.add_meta
 get_ignore_duplicates = revision_context_manager.get_ignore_duplicates
+set_deferred = revision_context_manager.set_deferred
+is_deferred = revision_context_manager.is_deferred
 set_ignore_duplicates = revision_context_manager.set_ignore_duplicates
+set_flush_policy = revision_context_manager.set_flush_policy
+get_flush_policy = revision_context_manager.get_flush_policy
 
 
 # Low level API.
 get_for_object_reference = default_revision_manager.get_for_object_reference
 get_for_object = default_revision_manager.get_for_object
+get_latest_for_object_reference = default_revision_manager.get_latest_for_object_reference
+get_latest_for_object = default_revision_manager.get_latest_for_object
 get_unique_for_object = default_revision_manager.get_unique_for_object
 get_for_date = default_revision_manager.get_for_date
 get_deleted = default_revision_manager.get_deleted
+add_to_revision = default_revision_manager.add_to_revision
+save_revision_for_queryset = default_revision_manager.save_revision_for_queryset
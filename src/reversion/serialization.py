@@ -0,0 +1,163 @@
+"""
+Fast serialization of single model instances.
+
+The serializers in this module produce exactly the same data as the "json"
+format of django.core.serializers, but resolve the fields of a model once,
+rather than once per serialized object.
+"""
+
+from __future__ import absolute_import, unicode_literals
+
+import json
+from collections import OrderedDict
+
+import django
+from django.apps import apps
+from django.core import serializers
+from django.core.serializers.base import DeserializedObject, DeserializationError
+from django.core.serializers.json import DjangoJSONEncoder, Serializer as DjangoJSONSerializer
+from django.db import models
+from django.utils.encoding import force_text, is_protected_type
+
+
+# Django < 1.9 builds serialized objects as plain dicts, so their key order
+# depends on the order the keys were inserted in, which is replicated here.
+ORDERED_DUMP = django.VERSION >= (1, 9)
+
+
+def is_fast_format(format):
+    """Returns whether data in the given serialization format can use the fast serializers."""
+    # The json format can be replaced using the SERIALIZATION_MODULES setting.
+    return format == "json" and serializers.get_serializer(format) is DjangoJSONSerializer
+
+
+def dump_object(data):
+    """Serializes a single object to a string, exactly as the json format would."""
+    return "[" + json.dumps(data, cls=DjangoJSONEncoder) + "]"
+
+
+def load_object(serialized_data):
+    """Loads the single object serialized by dump_object(), preserving field order."""
+    objects = json.loads(serialized_data, object_pairs_hook=OrderedDict)
+    if not isinstance(objects, list) or len(objects) != 1:
+        raise ValueError("Expected a single serialized object.")
+    return objects[0]
+
+
+class JSONSerializer(object):
+
+    """Serializes instances of a model, using a field list resolved in advance."""
+
+    def __init__(self, model, fields):
+        """Resolves the fields of the model to serialize."""
+        opts = model._meta.concrete_model._meta
+        fields = set(fields)
+        self.model = model
+        self.model_label = force_text(model._meta)
+        # Local and foreign key fields are kept in model order, as the json format writes them.
+        self.local_fields = []
+        for field in opts.local_fields:
+            if field.serialize:
+                if field.rel is None:
+                    if field.attname in fields:
+                        self.local_fields.append((field, False))
+                elif field.attname[:-3] in fields:
+                    self.local_fields.append((field, True))
+        self.m2m_fields = [
+            field
+            for field
+            in opts.many_to_many
+            if field.serialize and field.attname in fields and field.rel.through._meta.auto_created
+        ]
+
+    def serialize(self, obj):
+        """Returns a string of serialized data for the given obj."""
+        if obj.__class__ is self.model:
+            model_label = self.model_label
+        elif getattr(obj, "_deferred", False):  # Django < 1.10 pragma: no cover
+            model_label = force_text(obj._meta.proxy_for_model._meta)
+        else:  # pragma: no cover
+            model_label = force_text(obj._meta)
+        data = OrderedDict() if ORDERED_DUMP else {}
+        for field, is_fk in self.local_fields:
+            if is_fk:
+                value = getattr(obj, field.attname)
+            else:
+                value = field.value_from_object(obj)
+            if is_protected_type(value):
+                data[field.name] = value
+            else:
+                data[field.name] = field.value_to_string(obj)
+        for field in self.m2m_fields:
+            data[field.name] = [
+                force_text(pk, strings_only=True)
+                for pk
+                in getattr(obj, field.name).values_list("pk", flat=True).iterator()
+            ]
+        if ORDERED_DUMP:
+            return dump_object(OrderedDict((
+                ("model", model_label),
+                ("pk", force_text(obj._get_pk_val(), strings_only=True)),
+                ("fields", data),
+            )))
+        obj_data = {  # Django < 1.9 pragma: no cover
+            "model": model_label,
+            "fields": data,
+        }
+        obj_data["pk"] = force_text(obj._get_pk_val(), strings_only=True)
+        return dump_object(obj_data)
+
+
+class JSONDeserializer(object):
+
+    """Deserializes instances of a model, using field conversions resolved in advance."""
+
+    def __init__(self, model):
+        """Resolves the conversion of each field of the model."""
+        opts = model._meta
+        self.model = model
+        self.pk_field = opts.pk
+        self.m2m_fields = {}
+        self.fk_fields = {}
+        self.local_fields = {}
+        for field in opts.get_fields():
+            if not field.concrete:
+                continue
+            if field.many_to_many:
+                self.m2m_fields[field.name] = field.rel.to._meta.pk
+            elif isinstance(field.rel, models.ManyToOneRel):
+                self.fk_fields[field.name] = (field.attname, field.rel.to._meta.get_field(field.rel.field_name))
+            else:
+                self.local_fields[field.name] = field
+
+    def deserialize(self, obj_data):
+        """Returns a DeserializedObject for the given loaded object data, ignoring unknown fields."""
+        data = {}
+        if "pk" in obj_data:
+            data[self.pk_field.attname] = self.pk_field.to_python(obj_data["pk"])
+        m2m_data = {}
+        for name, value in obj_data["fields"].items():
+            if name in self.local_fields:
+                data[name] = self.local_fields[name].to_python(value)
+            elif name in self.fk_fields:
+                attname, target_field = self.fk_fields[name]
+                data[attname] = None if value is None else target_field.to_python(value)
+            elif name in self.m2m_fields:
+                pk_field = self.m2m_fields[name]
+                m2m_data[name] = [force_text(pk_field.to_python(pk), strings_only=True) for pk in value]
+        return DeserializedObject(self.model(**data), m2m_data)
+
+
+_deserializers = {}
+
+
+def deserialize(serialized_data):
+    """Deserializes a single object in the json format, ignoring unknown fields."""
+    obj_data = load_object(serialized_data)
+    try:
+        model = apps.get_model(obj_data["model"])
+    except (LookupError, TypeError):
+        raise DeserializationError("Invalid model identifier: '%s'" % obj_data["model"])
+    if model not in _deserializers:
+        _deserializers[model] = JSONDeserializer(model)
+    return _deserializers[model].deserialize(obj_data)
@@ -0,0 +1,171 @@
+"""
+Writers that save deferred revisions.
+
+When a revision is deferred, its version data is captured at the end of the
+revision block, and the revision is handed to a writer once the current
+transaction commits. The writer then saves the revision, for example in a
+background thread, or by sending it to a task queue.
+"""
+
+from __future__ import unicode_literals
+
+import atexit
+import logging
+import sys
+import threading
+
+try:
+    from queue import Queue
+except ImportError:  # Python 2 pragma: no cover
+    from Queue import Queue
+
+from django.db import close_old_connections
+
+
+logger = logging.getLogger(__name__)
+
+
+class DeferredRevision(object):
+
+    """
+    A revision whose version data has been captured, but not yet saved.
+
+    Deferred revisions can be pickled, so they can be sent to a task queue.
+    """
+
+    def __init__(self, manager_slug, objects, user=None, comment="", meta=(), ignore_duplicates=False, db=None):
+        """Initializes the deferred revision."""
+        self.manager_slug = manager_slug
+        self.objects = objects
+        self.user = user
+        self.comment = comment
+        self.meta = list(meta)
+        self.ignore_duplicates = ignore_duplicates
+        self.db = db
+
+    def save(self):
+        """Saves the revision, returning the new revision, or None if no revision was saved."""
+        from reversion.revisions import RevisionManager
+        return RevisionManager.get_manager(self.manager_slug).save_revision(
+            self.objects,
+            user = self.user,
+            comment = self.comment,
+            meta = self.meta,
+            ignore_duplicates = self.ignore_duplicates,
+            db = self.db,
+            follow = False,
+        )
+
+
+class RevisionWriter(object):
+
+    """Base class for writers of deferred revisions."""
+
+    def write(self, deferred_revision):
+        """Arranges for the given deferred revision to be saved."""
+        raise NotImplementedError
+
+    def flush(self):
+        """Waits until all revisions written so far have been saved."""
+
+
+class ImmediateRevisionWriter(RevisionWriter):
+
+    """Saves deferred revisions as soon as they are written."""
+
+    def write(self, deferred_revision):
+        """Saves the given deferred revision."""
+        deferred_revision.save()
+
+
+class ThreadedRevisionWriter(RevisionWriter):
+
+    """
+    Saves deferred revisions in a pool of background threads.
+
+    Revisions are saved at most once. When the process exits normally, the
+    queued revisions are saved before it stops, but they are lost if the
+    process is killed. If a revision cannot be saved, handle_error() is called,
+    which logs the error by default.
+    """
+
+    def __init__(self, workers=1):
+        """Initializes the writer. The worker threads are started when the first revision is written."""
+        self.workers = workers
+        self._queue = Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+        self._registered = False
+
+    def _start(self):
+        """Starts the worker threads, if they are not already running."""
+        with self._lock:
+            if not self._registered:
+                # Save the queued revisions when the process exits.
+                atexit.register(self.close)
+                self._registered = True
+            self._threads = [thread for thread in self._threads if thread.is_alive()]
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._work, name="reversion-writer")
+                thread.daemon = True
+                thread.start()
+                self._threads.append(thread)
+
+    def _work(self):
+        """Saves deferred revisions from the queue, until told to stop."""
+        while True:
+            deferred_revision = self._queue.get()
+            try:
+                if deferred_revision is None:
+                    return
+                close_old_connections()
+                deferred_revision.save()
+            except Exception:
+                self.handle_error(deferred_revision, sys.exc_info())
+            finally:
+                close_old_connections()
+                self._queue.task_done()
+
+    def handle_error(self, deferred_revision, exc_info):
+        """
+        Called in the worker thread when the given deferred revision cannot be saved.
+
+        Override this to retry the revision, or to store it elsewhere.
+        """
+        logger.error("Could not save deferred revision", exc_info=exc_info)
+
+    def write(self, deferred_revision):
+        """Queues the given deferred revision to be saved by a worker thread."""
+        self._start()
+        self._queue.put(deferred_revision)
+
+    def flush(self):
+        """Waits until all revisions written so far have been saved."""
+        self._queue.join()
+
+    def close(self):
+        """Saves all revisions written so far, then stops the worker threads."""
+        with self._lock:
+            threads = self._threads
+            self._threads = []
+            for thread in threads:
+                self._queue.put(None)
+        for thread in threads:
+            thread.join()
+
+
+_writer = None
+
+
+def get_writer():
+    """Returns the writer used to save deferred revisions, a ThreadedRevisionWriter by default."""
+    global _writer
+    if _writer is None:
+        _writer = ThreadedRevisionWriter()
+    return _writer
+
+
+def set_writer(writer):
+    """Sets the writer used to save deferred revisions."""
+    global _writer
+    _writer = writer
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import uuid
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('test_reversion', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReversionTestModelBigInt',
+            fields=[
+                ('name', models.CharField(max_length=100)),
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='ReversionTestModelUUID',
+            fields=[
+                ('name', models.CharField(max_length=100)),
+                ('id', models.UUIDField(default=uuid.uuid4, primary_key=True, serialize=False)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
@@ -1,3 +1,5 @@
+import uuid
+
 from django.contrib.contenttypes.models import ContentType
 from django.db import models
 from django.utils.encoding import force_text, python_2_unicode_compatible
@@ -55,6 +57,21 @@ class ReversionTestModel3(ReversionTestModelBase):
     pass
 
 
+class ReversionTestModelUUID(ReversionTestModelBase):
+
+    id = models.UUIDField(
+        primary_key = True,
+        default = uuid.uuid4,
+    )
+
+
+class ReversionTestModelBigInt(ReversionTestModelBase):
+
+    id = models.BigIntegerField(
+        primary_key = True,
+    )
+
+
 
 class TestFollowModel(ReversionTestModelBase):
 
@@ -4,18 +4,25 @@ Tests for the django-reversion API.
 
 from __future__ import unicode_literals
 
-import datetime, os
-from unittest import skipUnless
+import datetime, gzip, os, pickle, shutil, tempfile, threading
+from unittest import skipIf, skipUnless
 
-from django.db import models
-from django.test import TestCase
+from django.db import models, connection, transaction, IntegrityError
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.core import serializers
 from django.core.management import call_command
+from django.core.cache import cache
+from django.core.management.base import CommandError
 from django.core.exceptions import ImproperlyConfigured
 from django.conf import settings
 from django.contrib import admin
+from django.contrib.admin import site as admin_site
 from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
 from django.db.models.signals import pre_delete
 from django.utils import timezone
+from django.utils.encoding import force_text
 from django.core.urlresolvers import reverse, resolve
 
 from reversion.revisions import (
@@ -29,6 +36,7 @@ from reversion.revisions import (
     create_revision,
     get_for_object_reference,
     get_for_object,
+    get_latest_for_object,
     get_unique_for_object,
     get_for_date,
     get_ignore_duplicates,
@@ -40,9 +48,22 @@ from reversion.revisions import (
     get_user,
     add_meta,
     RevisionManager,
+    _clear_adapter_content_types,
+    set_deferred,
+    is_deferred,
+    set_flush_policy,
+    get_flush_policy,
+    revision_context_manager,
+    add_to_revision,
+    save_revision_for_queryset,
+    VersionedQuerySet,
 )
-from reversion.models import Revision, Version
-from reversion.errors import RegistrationError
+from reversion import models as reversion_models, revisions as reversion_revisions
+from reversion.models import _load_serialized_data, Revision, Version, VersionBlob, LatestVersion, InitialRevisionCheckpoint, get_content_hash, get_object_id_hash, get_revision_summary, REVISION_SUMMARY_LENGTH
+from reversion.admin import VersionAdmin
+from reversion.partitions import supports_partitioning
+from reversion.errors import RegistrationError, RevisionManagementError
+from reversion.writers import RevisionWriter, ImmediateRevisionWriter, ThreadedRevisionWriter, set_writer
 from reversion.signals import pre_revision_commit, post_revision_commit
 
 from test_reversion.models import (
@@ -50,6 +71,8 @@ from test_reversion.models import (
     ReversionTestModel1Child,
     ReversionTestModel2,
     ReversionTestModel3,
+    ReversionTestModelUUID,
+    ReversionTestModelBigInt,
     TestFollowModel,
     ReversionTestModel1Proxy,
     RevisionMeta,
@@ -109,6 +132,29 @@ class RegistrationTest(TestCase):
             pass
         self.assertTrue(is_registered(DecoratorArgsModel))
 
+    def testFieldInfo(self):
+        register(TestFollowModel)
+        try:
+            adapter = get_adapter(TestFollowModel)
+            field_info = adapter.get_field_info()
+            self.assertTrue(adapter.get_field_info() is field_info)
+            self.assertEqual(
+                [(info.name, info.attname, info.relation) for info in field_info],
+                [
+                    ("id", "id", None),
+                    ("name", "name", None),
+                    ("test_model_1", "test_model_1_id", "foreign_key"),
+                    ("test_model_2s", "test_model_2s", "many_to_many"),
+                ],
+            )
+            self.assertEqual([info.name for info in adapter.get_many_to_many_field_info()], ["test_model_2s"])
+            self.assertEqual(len(adapter.get_local_field_info()), 3)
+            self.assertEqual(adapter.get_fields_to_serialize(), ["id", "name", "test_model_1", "test_model_2s"])
+        finally:
+            unregister(TestFollowModel)
+        # Unregistering clears the cached fields.
+        self.assertEqual(adapter._field_info, None)
+
     def testEagerRegistration(self):
         # Register the model and test.
         register(ReversionTestModel3, eager_signals=[pre_delete])
@@ -128,7 +174,7 @@ class RegistrationTest(TestCase):
         self.assertFalse(ReversionTestModel3 in default_revision_manager._eager_signals)
 
 
-class ReversionTestBase(TestCase):
+class ReversionTestMixin(object):
 
     def setUp(self):
         # Unregister all registered models.
@@ -177,6 +223,11 @@ class ReversionTestBase(TestCase):
         del self.initial_registered_models
 
 
+class ReversionTestBase(ReversionTestMixin, TestCase):
+
+    pass
+
+
 class RevisionTestBase(ReversionTestBase):
 
     @create_revision()
@@ -190,6 +241,35 @@ class InternalsTest(RevisionTestBase):
         self.assertEqual(Revision.objects.count(), 1)
         self.assertEqual(Version.objects.count(), 4)
 
+    def testRevisionSummary(self):
+        revision = Revision.objects.get()
+        self.assertEqual(revision.version_count, 4)
+        self.assertEqual(set(revision.summary.split(", ")), set(force_text(obj) for obj in (self.test11, self.test12, self.test21, self.test22)))
+        with self.assertNumQueries(0):
+            self.assertEqual(force_text(revision), revision.summary)
+        self.assertEqual(set(revision.content_types.all()), set(ContentType.objects.get_for_models(ReversionTestModel1, ReversionTestModel2).values()))
+        self.assertEqual(Revision.objects.filter(content_types=ContentType.objects.get_for_model(ReversionTestModel1)).get(), revision)
+        # Revisions saved before summaries were stored build them from their versions.
+        Revision.objects.update(summary=None)
+        self.assertEqual(force_text(Revision.objects.get()), ", ".join(force_text(version) for version in revision.version_set.all()))
+
+    def testUpdateRevisionSummaries(self):
+        with create_revision():
+            self.test11.save()
+        summaries = list(Revision.objects.order_by("pk").values_list("summary", flat=True))
+        Revision.objects.update(summary=None)
+        call_command("updaterevisionsummaries", batch_size=1, verbosity=0)
+        self.assertEqual(list(Revision.objects.order_by("pk").values_list("summary", flat=True)), summaries)
+        # Only the string representations that fit in the summary are needed.
+        Revision.objects.update(summary=None)
+        Version.objects.update(object_repr="a" * 100)
+        call_command("updaterevisionsummaries", verbosity=0)
+        self.assertEqual(Revision.objects.order_by("pk")[0].summary, get_revision_summary(["a" * 100] * 4))
+
+    def testRevisionSummaryTruncated(self):
+        self.assertEqual(get_revision_summary(["a", "b"], "c"), "c, a, b")
+        self.assertEqual(len(get_revision_summary(["a" * 1000])), REVISION_SUMMARY_LENGTH)
+
     def testContextManager(self):
         # New revision should be created.
         with create_revision():
@@ -295,6 +375,29 @@ class ApiTest(RevisionTestBase):
         self.assertTrue(pre_revision_receiver_called)
         self.assertTrue(post_revision_receiver_called)
 
+    def testRevisionSignalsReceiveSavedVersions(self):
+        saved_versions = []
+
+        def post_revision_receiver(**kwargs):
+            saved_versions.extend(kwargs["versions"])
+        post_revision_commit.connect(post_revision_receiver)
+        try:
+            default_revision_manager.save_revision([self.test11, self.test12, self.test21])
+        finally:
+            post_revision_commit.disconnect(post_revision_receiver)
+        self.assertEqual(len(saved_versions), 3)
+        for version in saved_versions:
+            self.assertEqual(Version.objects.get(pk=version.pk).object_id, version.object_id)
+            self.assertEqual(version.revision_id, saved_versions[0].revision_id)
+
+    def testSaveRevisionQueryCountIndependentOfObjectCount(self):
+        default_revision_manager.save_revision([self.test11])
+        with CaptureQueriesContext(connection) as single_object_queries:
+            default_revision_manager.save_revision([self.test11])
+        with CaptureQueriesContext(connection) as many_object_queries:
+            default_revision_manager.save_revision([self.test11, self.test12, self.test21, self.test22])
+        self.assertEqual(len(single_object_queries), len(many_object_queries))
+
     def testCanGetForObjectReference(self):
         # Test a model with an int pk.
         versions = get_for_object_reference(ReversionTestModel1, self.test11.pk)
@@ -352,6 +455,14 @@ class ApiTest(RevisionTestBase):
         self.assertEqual(version.field_dict["name"], "model2 instance1 version2")
         self.assertRaises(Version.DoesNotExist, lambda: get_for_date(self.test21, datetime.datetime(1970, 1, 1, tzinfo=timezone.utc)))
 
+    def testCanGetForObjectBetweenDates(self):
+        versions = list(get_for_object(self.test11))
+        for version in versions:
+            self.assertEqual(version.date_created, version.revision.date_created)
+        self.assertEqual(list(get_for_object(self.test11, date_from=versions[0].date_created)), versions[:1])
+        self.assertEqual(list(get_for_object(self.test11, date_to=versions[1].date_created)), versions[1:])
+        self.assertEqual(get_for_object(self.test11, date_to=datetime.datetime(1970, 1, 1, tzinfo=timezone.utc)).count(), 0)
+
     def testCanGetDeleted(self):
         with create_revision():
             self.test11.delete()
@@ -423,6 +534,53 @@ class ApiTest(RevisionTestBase):
             set_ignore_duplicates(True)
         self.assertEqual(get_for_object(self.test11).count(), 3)
 
+    def testCanSaveIgnoringDuplicatesOfVersionsWithoutContentHash(self):
+        Version.objects.update(content_hash="")
+        with create_revision():
+            self.test11.save()
+            self.test12.save()
+            self.test21.save()
+            self.test22.save()
+            set_ignore_duplicates(True)
+        self.assertEqual(get_for_object(self.test11).count(), 2)
+
+    def testVersionContentHash(self):
+        version = get_for_object(self.test11)[0]
+        self.assertEqual(version.content_hash, get_content_hash(version.serialized_data))
+        self.assertNotEqual(version.content_hash, get_for_object(self.test11)[1].content_hash)
+
+    def testVersionObjectIdHash(self):
+        version = get_for_object(self.test21)[0]
+        self.assertEqual(version.object_id_hash, get_object_id_hash(self.test21.pk))
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(get_for_object(self.test21).count(), 2)
+        self.assertTrue("object_id_hash" in queries[0]["sql"])
+
+    def testVersionObjectIdHashOnlyForTextPrimaryKeys(self):
+        self.assertEqual(get_for_object(self.test11)[0].object_id_hash, "")
+
+    def testSaveRevisions(self):
+        revisions = default_revision_manager.save_revisions([self.test11, self.test21], comment="Foo")
+        self.assertEqual(len(revisions), 2)
+        self.assertEqual([revision.comment for revision in revisions], ["Foo", "Foo"])
+        self.assertEqual(list(revisions[0].version_set.all()), [get_for_object(self.test11)[0]])
+        self.assertEqual(list(revisions[1].version_set.all()), [get_for_object(self.test21)[0]])
+
+    def testVersionDataCachesModelMetadata(self):
+        adapter = get_adapter(ReversionTestModel1)
+        adapter.get_version_data(self.test11)
+        ContentType.objects.clear_cache()
+        with self.assertNumQueries(0):
+            version_data = adapter.get_version_data(self.test12)
+        self.assertEqual(version_data["content_type"], ContentType.objects.get_for_model(ReversionTestModel1))
+        self.assertEqual(version_data["object_id_int"], self.test12.pk)
+        self.assertEqual(get_adapter(ReversionTestModel2).get_version_data(self.test21)["object_id_int"], None)
+        # Migrations clear the cached content types.
+        _clear_adapter_content_types()
+        ContentType.objects.clear_cache()
+        with self.assertNumQueries(1):
+            adapter.get_version_data(self.test12)
+
     def testCanAddMetaToRevision(self):
         # Create a revision with lots of meta data.
         with create_revision():
@@ -452,6 +610,40 @@ class MultiTableInheritanceApiTest(RevisionTestBase):
     def testCanRetreiveFullFieldDict(self):
         self.assertEqual(get_for_object(self.testchild1)[0].field_dict["name"], "modelchild1 instance1 version 1")
 
+    def testLoadFieldDicts(self):
+        with create_revision():
+            self.testchild1.name = "modelchild1 instance1 version 2"
+            self.testchild1.save()
+            ReversionTestModel1Child.objects.create(name="modelchild2 instance1 version 1")
+        child_versions = Version.objects.filter(content_type=ContentType.objects.get_for_model(ReversionTestModel1Child)).order_by("pk")
+        # One query for the versions, and one for all their parents.
+        with self.assertNumQueries(2):
+            versions = child_versions.load_field_dicts()
+            self.assertEqual([version.field_dict["name"] for version in versions], [
+                "modelchild1 instance1 version 1",
+                "modelchild1 instance1 version 2",
+                "modelchild2 instance1 version 1",
+            ])
+
+    def testLoadFieldDictsWithDeltas(self):
+        unregister(ReversionTestModel1)
+        unregister(ReversionTestModel1Child)
+        register(ReversionTestModel1, keyframe_interval=10)
+        register(ReversionTestModel1Child, follow=("reversiontestmodel1_ptr",), keyframe_interval=10)
+        for i in range(2, 5):
+            with create_revision():
+                self.testchild1.name = "modelchild1 instance1 version %s" % i
+                self.testchild1.save()
+        child_versions = Version.objects.filter(content_type=ContentType.objects.get_for_model(ReversionTestModel1Child)).order_by("pk")
+        self.assertTrue(child_versions.last().delta_base_id)
+        # The delta bases of the versions and their parents are in the same lists.
+        with self.assertNumQueries(2):
+            versions = child_versions.load_field_dicts()
+            self.assertEqual([version.field_dict["name"] for version in versions], [
+                "modelchild1 instance1 version %s" % i
+                for i in range(1, 5)
+            ])
+
 
 class ReversionTestModel1ChildProxy(ReversionTestModel1Child):
     class Meta:
@@ -537,6 +729,71 @@ class FollowModelsTest(ReversionTestBase):
         self.assertEqual(Revision.objects.count(), 2)
         self.assertEqual(Version.objects.count(), 9)
 
+    def testRelationsFollowedInBulk(self):
+        follow2 = TestFollowModel.objects.create(
+            name = "related instance2 version 1",
+            test_model_1 = self.test12,
+        )
+        follow2.test_model_2s.add(self.test22)
+        with CaptureQueriesContext(connection) as single_object_queries:
+            followed = default_revision_manager._follow_relationships([self.follow1])
+        self.assertEqual(followed, set([self.follow1, self.test11, self.test21, self.test22]))
+        with CaptureQueriesContext(connection) as many_object_queries:
+            followed = default_revision_manager._follow_relationships([self.follow1, follow2])
+        self.assertEqual(followed, set([self.follow1, follow2, self.test11, self.test12, self.test21, self.test22]))
+        self.assertEqual(len(single_object_queries), len(many_object_queries))
+        # The prefetched relations are not left on the followed objects.
+        self.assertFalse(hasattr(self.follow1, "_prefetched_objects_cache"))
+        self.assertEqual(self.follow1.test_model_2s.count(), 2)
+
+    def testFollowRelationsWithoutPrefetching(self):
+        TestFollowModel.first_test_model_2 = property(lambda obj: obj.test_model_2s.order_by("pk")[0])
+        unregister(TestFollowModel)
+        register(TestFollowModel, follow=("first_test_model_2",))
+        try:
+            followed = default_revision_manager._follow_relationships([self.follow1])
+        finally:
+            del TestFollowModel.first_test_model_2
+        self.assertEqual(followed, set([self.follow1, self.test21]))
+
+    def testFollowRelationsPrefetchErrorsPropagate(self):
+        descriptor = TestFollowModel.__dict__["test_model_1"]
+        def get_prefetch_queryset(*args, **kwargs):
+            raise ValueError("Prefetch failed.")
+        descriptor.get_prefetch_queryset = get_prefetch_queryset
+        try:
+            with self.assertRaises(ValueError):
+                default_revision_manager._follow_relationships([self.follow1])
+        finally:
+            del descriptor.get_prefetch_queryset
+
+    def testSaveRevisionsFollowsRelationsInBulk(self):
+        follow2 = TestFollowModel.objects.create(
+            name = "related instance2 version 1",
+            test_model_1 = self.test12,
+        )
+        follow2.test_model_2s.add(self.test22)
+        followed_objects = []
+        def follow_relationships(objects, graph=None):
+            followed_objects.append(set(objects))
+            return RevisionManager._follow_relationships(default_revision_manager, objects, graph)
+        default_revision_manager._follow_relationships = follow_relationships
+        try:
+            revisions = default_revision_manager.save_revisions([self.follow1, follow2])
+        finally:
+            del default_revision_manager._follow_relationships
+        # The relationships of all the objects are followed together.
+        self.assertEqual(followed_objects, [set([self.follow1, follow2])])
+        # Each revision holds the objects followed from its own object.
+        self.assertEqual(
+            set(version.object for version in revisions[0].version_set.all()),
+            set([self.follow1, self.test11, self.test21, self.test22]),
+        )
+        self.assertEqual(
+            set(version.object for version in revisions[1].version_set.all()),
+            set([follow2, self.test12, self.test22]),
+        )
+
     def testRevertWithDelete(self):
         with create_revision():
             test23 = ReversionTestModel2.objects.create(
@@ -601,9 +858,646 @@ class FollowModelsTest(ReversionTestBase):
         super(FollowModelsTest, self).tearDown()
 
 
+class SharedStorageTest(ReversionTestBase):
+
+    def setUp(self):
+        super(SharedStorageTest, self).setUp()
+        unregister(ReversionTestModel1)
+        register(ReversionTestModel1, shared_storage=True)
+        with create_revision():
+            self.test11.save()
+            self.test12.save()
+        with create_revision():
+            self.test11.save()
+            self.test12.name = "model1 instance2 version2"
+            self.test12.save()
+
+    def testIdenticalVersionsShareData(self):
+        self.assertEqual(Version.objects.count(), 4)
+        self.assertEqual(VersionBlob.objects.count(), 3)
+        self.assertEqual(Version.objects.filter(serialized_data="").count(), 4)
+
+    def testCanReadSharedVersions(self):
+        versions = get_for_object(self.test12)
+        self.assertEqual(versions[0].field_dict["name"], "model1 instance2 version2")
+        self.assertEqual(versions[1].field_dict["name"], "model1 instance2 version1")
+        self.assertEqual(len(list(get_for_object(self.test11).get_unique())), 1)
+        self.assertEqual(len(list(get_for_object(self.test12).get_unique())), 2)
+
+    def testCanRevertSharedVersion(self):
+        get_for_object(self.test12)[1].revert()
+        self.assertEqual(ReversionTestModel1.objects.get(pk=self.test12.pk).name, "model1 instance2 version1")
+
+    def testDeleteRevisionsRemovesUnusedSharedData(self):
+        Revision.objects.get(pk=get_for_object(self.test12)[0].revision_id).delete()
+        call_command("deleterevisions", "test_reversion.reversiontestmodel1", keep=1, confirmation=False, verbosity=0)
+        self.assertEqual(VersionBlob.objects.count(), 2)
+        call_command("deleterevisions", confirmation=False, verbosity=0)
+        self.assertEqual(VersionBlob.objects.count(), 0)
+
+
+class CompressionTest(ReversionTestBase):
+
+    def setUp(self):
+        super(CompressionTest, self).setUp()
+        unregister(ReversionTestModel1)
+        register(ReversionTestModel1, compression="zlib")
+        unregister(ReversionTestModel2)
+        register(ReversionTestModel2, compression="zlib", shared_storage=True)
+        with create_revision():
+            self.test11.save()
+            self.test21.save()
+
+    def testVersionDataIsCompressed(self):
+        version = get_for_object(self.test11)[0]
+        self.assertEqual(version.compression, "zlib")
+        self.assertNotIn("model1 instance1 version1", version.serialized_data)
+        self.assertEqual(version.content_hash, get_content_hash(version.get_serialized_data()))
+        self.assertEqual(VersionBlob.objects.get().compression, "zlib")
+
+    def testCanReadCompressedVersions(self):
+        self.assertEqual(get_for_object(self.test11)[0].field_dict["name"], "model1 instance1 version1")
+        self.assertEqual(get_for_object(self.test21)[0].field_dict["name"], "model2 instance1 version1")
+
+    def testCanReadUncompressedVersions(self):
+        with create_revision():
+            self.test12.save()
+        get_for_object(self.test12).update(
+            serialized_data = get_adapter(ReversionTestModel1).get_serialized_data(self.test12),
+            compression = "",
+        )
+        self.assertEqual(get_for_object(self.test12)[0].field_dict["name"], "model1 instance2 version1")
+
+    def testUnknownCodec(self):
+        unregister(ReversionTestModel1)
+        register(ReversionTestModel1, compression="foo")
+        with self.assertRaises(RegistrationError):
+            default_revision_manager.save_revision([self.test11])
+
+
+class DeltaEncodingTest(ReversionTestBase):
+
+    def setUp(self):
+        super(DeltaEncodingTest, self).setUp()
+        unregister(ReversionTestModel1)
+        register(ReversionTestModel1, keyframe_interval=3, compression="zlib")
+        for i in range(1, 6):
+            with create_revision():
+                self.test11.name = "model1 instance1 version%s" % i
+                self.test11.save()
+                self.test12.save()
+
+    def testVersionsStoredAsDeltas(self):
+        versions = get_for_object(self.test11).order_by("pk")
+        self.assertEqual([version.delta_depth for version in versions], [0, 1, 2, 0, 1])
+        self.assertEqual([version.delta_base_id is None for version in versions], [True, False, False, True, False])
+        self.assertEqual(versions[1].delta_base_id, versions[0].pk)
+
+    def testCanReadDeltaVersions(self):
+        versions = get_for_object(self.test11)
+        self.assertEqual(
+            [version.field_dict["name"] for version in versions],
+            ["model1 instance1 version%s" % i for i in range(5, 0, -1)],
+        )
+        for version in versions:
+            self.assertEqual(version.content_hash, get_content_hash(version.get_serialized_data()))
+        self.assertEqual(len(list(get_for_object(self.test12).get_unique())), 1)
+
+    def testLoadSerializedData(self):
+        versions = list(get_for_object(self.test11).order_by("pk"))
+        # The versions in the list are each other's delta bases.
+        with self.assertNumQueries(0):
+            _load_serialized_data(versions)
+        self.assertEqual(versions[2].field_dict["name"], "model1 instance1 version3")
+        # Missing bases are loaded one step back at a time.
+        versions = list(get_for_object(self.test11).order_by("pk"))
+        with self.assertNumQueries(2):
+            _load_serialized_data([versions[2], versions[4]])
+        self.assertEqual(versions[2].object_version.object.name, "model1 instance1 version3")
+        self.assertEqual(versions[4].object_version.object.name, "model1 instance1 version5")
+
+    def testDetachDeltaChainsInBatches(self):
+        versions = get_for_object(self.test11).order_by("pk")
+        keyframe_pks = [versions[0].pk, versions[3].pk]
+        detach_batch_size = reversion_models.DETACH_BATCH_SIZE
+        reversion_models.DETACH_BATCH_SIZE = 1
+        try:
+            with self.assertNumQueries(7):
+                self.assertEqual(Version.objects.filter(pk__in=keyframe_pks).detach_delta_chains(), 2)
+        finally:
+            reversion_models.DETACH_BATCH_SIZE = detach_batch_size
+        Version.objects.filter(pk__in=keyframe_pks).delete()
+        versions = get_for_object(self.test11)
+        self.assertEqual([version.delta_base_id is None for version in versions], [True, False, True])
+        self.assertEqual(
+            [version.field_dict["name"] for version in versions],
+            ["model1 instance1 version5", "model1 instance1 version3", "model1 instance1 version2"],
+        )
+
+    def testCanRevertDeltaVersion(self):
+        get_for_object(self.test11)[2].revert()
+        self.assertEqual(ReversionTestModel1.objects.get(pk=self.test11.pk).name, "model1 instance1 version3")
+
+    def testDeleteRevisionsKeepsDeltaChains(self):
+        call_command("deleterevisions", "test_reversion.reversiontestmodel1", keep=2, confirmation=False, verbosity=0)
+        versions = get_for_object(self.test11)
+        self.assertEqual(
+            [version.field_dict["name"] for version in versions],
+            ["model1 instance1 version5", "model1 instance1 version4"],
+        )
+        call_command("deleterevisions", "test_reversion.reversiontestmodel1", keep=1, confirmation=False, verbosity=0)
+        version = get_for_object(self.test11).get()
+        self.assertEqual(version.delta_base_id, None)
+        self.assertEqual(version.field_dict["name"], "model1 instance1 version5")
+
+
+class TypedPrimaryKeyTest(ReversionTestBase):
+
+    def setUp(self):
+        super(TypedPrimaryKeyTest, self).setUp()
+        register(ReversionTestModelUUID)
+        register(ReversionTestModelBigInt)
+        self.test_uuid = ReversionTestModelUUID.objects.create(name="uuid instance1 version1")
+        self.test_bigint = ReversionTestModelBigInt.objects.create(id=2 ** 40, name="bigint instance1 version1")
+        with create_revision():
+            self.test_uuid.save()
+            self.test_bigint.save()
+
+    def testTypedObjectIdsStored(self):
+        version = get_for_object(self.test_uuid)[0]
+        self.assertEqual(version.object_id_uuid, self.test_uuid.pk)
+        self.assertEqual(version.object_id_int, None)
+        self.assertEqual(version.object_id_hash, "")
+        version = get_for_object(self.test_bigint)[0]
+        self.assertEqual(version.object_id_int, 2 ** 40)
+        self.assertEqual(version.object_id_hash, "")
+
+    def testGetForObjectReference(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(get_for_object_reference(ReversionTestModelUUID, force_text(self.test_uuid.pk)).count(), 1)
+        self.assertTrue("object_id_uuid" in queries[0]["sql"])
+        self.assertEqual(get_for_object_reference(ReversionTestModelBigInt, 2 ** 40).count(), 1)
+
+    def testGetDeleted(self):
+        self.assertEqual(get_deleted(ReversionTestModelUUID).count(), 0)
+        self.assertEqual(get_deleted(ReversionTestModelBigInt).count(), 0)
+        self.test_uuid.delete()
+        self.test_bigint.delete()
+        self.assertEqual(get_deleted(ReversionTestModelUUID).count(), 1)
+        self.assertEqual(get_deleted(ReversionTestModelBigInt).count(), 1)
+
+    def testCreateInitialRevisions(self):
+        ReversionTestModelUUID.objects.create(name="uuid instance2 version1")
+        call_command("createinitialrevisions", "test_reversion.ReversionTestModelUUID", verbosity=0)
+        self.assertEqual(Version.objects.filter(object_id_uuid__isnull=False).count(), 2)
+
+    def tearDown(self):
+        unregister(ReversionTestModelUUID)
+        unregister(ReversionTestModelBigInt)
+        super(TypedPrimaryKeyTest, self).tearDown()
+
+
+class LatestVersionTest(ReversionTestBase):
+
+    def setUp(self):
+        super(LatestVersionTest, self).setUp()
+        unregister(ReversionTestModel1)
+        unregister(ReversionTestModel2)
+        unregister(ReversionTestModel3)
+        register(ReversionTestModel1, track_latest_version=True)
+        register(ReversionTestModel2, track_latest_version=True)
+        register(ReversionTestModel3, eager_signals=[pre_delete], track_latest_version=True)
+        for i in range(1, 3):
+            with create_revision():
+                self.test11.name = "model1 instance1 version%s" % i
+                self.test11.save()
+                self.test21.save()
+
+    def testLatestVersionsTracked(self):
+        self.assertEqual(LatestVersion.objects.count(), 2)
+        latest_version = LatestVersion.objects.get(version=get_for_object(self.test11)[0])
+        self.assertEqual(latest_version.object_id_int, self.test11.pk)
+        self.assertEqual(latest_version.revision_id, latest_version.version.revision_id)
+        self.assertFalse(latest_version.is_deleted)
+
+    def testGetLatestForObject(self):
+        with self.assertNumQueries(1):
+            version = get_latest_for_object(self.test11)
+        self.assertEqual(version, get_for_object(self.test11)[0])
+        self.assertEqual(version.field_dict["name"], "model1 instance1 version2")
+        self.assertEqual(get_latest_for_object(self.test21), get_for_object(self.test21)[0])
+        self.assertRaises(Version.DoesNotExist, lambda: get_latest_for_object(self.test12))
+
+    def testGetForDate(self):
+        version = get_for_object(self.test11)[0]
+        self.assertEqual(get_for_date(self.test11, timezone.now()), version)
+        self.assertEqual(get_for_date(self.test11, version.revision.date_created - datetime.timedelta(microseconds=1)), get_for_object(self.test11)[1])
+
+    def testGetDeleted(self):
+        self.test11.delete()
+        self.test21.delete()
+        self.assertEqual(list(get_deleted(ReversionTestModel1)), [get_for_object_reference(ReversionTestModel1, 1)[0]])
+        self.assertEqual(get_deleted(ReversionTestModel2).count(), 1)
+        # Recovering the object marks it as live.
+        get_deleted(ReversionTestModel1)[0].revert()
+        self.assertEqual(get_deleted(ReversionTestModel1).count(), 0)
+
+    def testEagerDeletedVersionTracked(self):
+        with create_revision():
+            self.test31.delete()
+        self.assertEqual(list(get_deleted(ReversionTestModel3)), [get_for_object_reference(ReversionTestModel3, 1)[0]])
+
+    def testCanSaveIgnoringDuplicates(self):
+        with create_revision():
+            set_ignore_duplicates(True)
+            self.test11.save()
+            self.test21.save()
+        self.assertEqual(get_for_object(self.test11).count(), 2)
+        with create_revision():
+            set_ignore_duplicates(True)
+            self.test11.save()
+        self.assertEqual(get_for_object(self.test11).count(), 3)
+
+    def testUpdateLatestVersions(self):
+        self.test11.delete()
+        LatestVersion.objects.all().delete()
+        self.assertEqual(default_revision_manager.update_latest_versions(ReversionTestModel1), 1)
+        self.assertEqual(default_revision_manager.update_latest_versions(ReversionTestModel2), 1)
+        self.assertEqual(LatestVersion.objects.count(), 2)
+        self.assertEqual(list(get_deleted(ReversionTestModel1)), [get_for_object_reference(ReversionTestModel1, 1)[0]])
+        self.assertEqual(get_latest_for_object(self.test21), get_for_object(self.test21)[0])
+
+    def testUpdateLatestVersionsInBatches(self):
+        with create_revision():
+            self.test12.save()
+        test12_pk = self.test12.pk
+        self.test12.delete()
+        LatestVersion.objects.all().delete()
+        latest_version_batch_size = reversion_revisions.LATEST_VERSION_BATCH_SIZE
+        reversion_revisions.LATEST_VERSION_BATCH_SIZE = 1
+        try:
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(default_revision_manager.update_latest_versions(ReversionTestModel1), 2)
+        finally:
+            reversion_revisions.LATEST_VERSION_BATCH_SIZE = latest_version_batch_size
+        self.assertEqual(list(get_deleted(ReversionTestModel1)), [get_for_object_reference(ReversionTestModel1, test12_pk)[0]])
+        # Only the objects of each batch are looked up in the model table.
+        model_queries = [query["sql"] for query in queries if "test_reversion_reversiontestmodel1" in query["sql"]]
+        self.assertEqual(len(model_queries), 2)
+        self.assertTrue(all(" IN (" in sql for sql in model_queries))
+
+    def testGetDeletedIgnoresDuplicatePointers(self):
+        # Revisions saved concurrently can both create a pointer for the same object.
+        latest_version = LatestVersion.objects.get(version=get_for_object(self.test11)[0])
+        old_version = get_for_object(self.test11)[1]
+        LatestVersion.objects.create(
+            manager_slug = latest_version.manager_slug,
+            content_type_id = latest_version.content_type_id,
+            object_id = latest_version.object_id,
+            object_id_int = latest_version.object_id_int,
+            version = old_version,
+            revision_id = old_version.revision_id,
+        )
+        self.test11.delete()
+        self.assertEqual(list(get_deleted(ReversionTestModel1)), [latest_version.version])
+
+    def testUpdateLatestVersionsCommand(self):
+        LatestVersion.objects.all().delete()
+        call_command("updatelatestversions", "test_reversion.ReversionTestModel1", verbosity=0)
+        self.assertEqual(LatestVersion.objects.count(), 1)
+        call_command("updatelatestversions", verbosity=0)
+        self.assertEqual(LatestVersion.objects.count(), 2)
+
+    def testDeleteRevisionsRemovesLatestVersions(self):
+        call_command("deleterevisions", "test_reversion", confirmation=False, verbosity=0)
+        self.assertEqual(LatestVersion.objects.count(), 0)
+
+
+class FastSerializationTest(ReversionTestBase):
+
+    def setUp(self):
+        super(FastSerializationTest, self).setUp()
+        register(TestFollowModel)
+        register(ReversionTestModel1Child)
+        register(ReversionTestModel1Proxy)
+        self.follow1 = TestFollowModel.objects.create(
+            name = "related instance1 version 1",
+            test_model_1 = self.test11,
+        )
+        self.follow1.test_model_2s.add(self.test21, self.test22)
+        self.child1 = ReversionTestModel1Child.objects.create(
+            name = "modelchild1 instance1 version 1",
+        )
+        self.proxy1 = ReversionTestModel1Proxy.objects.get(pk=self.test12.pk)
+        self.objs = (self.test11, self.test21, self.follow1, self.child1, self.proxy1)
+
+    def testSerializedDataMatchesDjangoSerializers(self):
+        for obj in self.objs:
+            adapter = get_adapter(obj.__class__)
+            self.assertEqual(
+                adapter.get_serialized_data(obj),
+                serializers.serialize("json", (obj,), fields=list(adapter.get_fields_to_serialize())),
+            )
+
+    def testObjectVersionMatchesDjangoSerializers(self):
+        for obj in self.objs:
+            version = Version(format="json", serialized_data=get_adapter(obj.__class__).get_serialized_data(obj))
+            object_version = version.object_version
+            django_object_version = list(serializers.deserialize("json", version.serialized_data))[0]
+            self.assertEqual(object_version.object.__class__, django_object_version.object.__class__)
+            for field in obj._meta.concrete_model._meta.local_fields:
+                self.assertEqual(
+                    field.value_from_object(object_version.object),
+                    field.value_from_object(django_object_version.object),
+                )
+            self.assertEqual(object_version.m2m_data, django_object_version.m2m_data)
+
+    def tearDown(self):
+        unregister(TestFollowModel)
+        unregister(ReversionTestModel1Child)
+        unregister(ReversionTestModel1Proxy)
+        super(FastSerializationTest, self).tearDown()
+
+
+class QueueRevisionWriter(RevisionWriter):
+
+    def __init__(self):
+        self.queue = []
+
+    def write(self, deferred_revision):
+        self.queue.append(pickle.dumps(deferred_revision))
+
+
+# Revisions are only deferred on Django 1.9 or later, which supports on_commit.
+can_defer_revisions = hasattr(transaction, "on_commit")
+
+
+class RecordingDeferredRevision(object):
+
+    """A deferred revision that records the thread that saved it."""
+
+    def __init__(self, saved_revisions, fail=False):
+        self.saved_revisions = saved_revisions
+        self.fail = fail
+
+    def save(self):
+        if self.fail:
+            raise ValueError("Foo")
+        self.saved_revisions.append((self, threading.current_thread().name))
+
+
+class DeferredRevisionTest(ReversionTestMixin, TransactionTestCase):
+
+    def setUp(self):
+        super(DeferredRevisionTest, self).setUp()
+        set_writer(ImmediateRevisionWriter())
+
+    @skipUnless(can_defer_revisions, "Django < 1.9 saves deferred revisions at once.")
+    def testDeferredRevisionSavedOnCommit(self):
+        with transaction.atomic():
+            with create_revision():
+                set_deferred(True)
+                self.assertTrue(is_deferred())
+                self.test11.save()
+            self.assertEqual(get_for_object(self.test11).count(), 0)
+        self.assertEqual(get_for_object(self.test11).count(), 1)
+
+    def testDeferredRevisionDiscardedOnRollback(self):
+        try:
+            with transaction.atomic():
+                with create_revision():
+                    set_deferred(True)
+                    self.test11.save()
+                raise Exception("Foo")
+        except Exception:
+            pass
+        self.assertEqual(get_for_object(self.test11).count(), 0)
+
+    def testDeferredRevisionCapturesDataAtEnd(self):
+        with transaction.atomic():
+            with create_revision():
+                set_deferred(True)
+                self.test11.name = "model1 instance1 version2"
+                self.test11.save()
+            ReversionTestModel1.objects.filter(pk=self.test11.pk).update(name="model1 instance1 version3")
+        self.assertEqual(get_for_object(self.test11)[0].field_dict["name"], "model1 instance1 version2")
+
+    @skipUnless(can_defer_revisions, "Django < 1.9 saves deferred revisions at once.")
+    def testDeferredRevisionCanBePickled(self):
+        writer = QueueRevisionWriter()
+        set_writer(writer)
+        with create_revision():
+            set_deferred(True)
+            set_comment("Foo")
+            self.test11.save()
+        self.assertEqual(len(writer.queue), 1)
+        revision = pickle.loads(writer.queue[0]).save()
+        self.assertEqual(revision.comment, "Foo")
+        self.assertEqual(get_for_object(self.test11).count(), 1)
+
+    def testThreadedRevisionWriter(self):
+        writer = ThreadedRevisionWriter(workers=2)
+        saved_revisions = []
+        writer.handle_error = lambda deferred_revision, exc_info: saved_revisions.append((deferred_revision, exc_info[0]))
+        deferred_revisions = [RecordingDeferredRevision(saved_revisions) for _ in range(3)]
+        failing_revision = RecordingDeferredRevision(saved_revisions, fail=True)
+        for deferred_revision in deferred_revisions + [failing_revision]:
+            writer.write(deferred_revision)
+        writer.flush()
+        self.assertEqual(len(saved_revisions), 4)
+        self.assertEqual(set(saved_revisions), set(
+            [(deferred_revision, "reversion-writer") for deferred_revision in deferred_revisions] +
+            [(failing_revision, ValueError)]
+        ))
+        # Closing the writer saves the queued revisions, then stops the workers.
+        threads = list(writer._threads)
+        writer.write(RecordingDeferredRevision(saved_revisions))
+        writer.close()
+        self.assertEqual(len(saved_revisions), 5)
+        self.assertFalse(any(thread.is_alive() for thread in threads))
+
+    @skipIf(not getattr(connection.features, "can_share_in_memory_db", True), "The test database cannot be shared between threads.")
+    def testThreadedRevisionWriterSavesRevisions(self):
+        writer = ThreadedRevisionWriter()
+        set_writer(writer)
+        for _ in range(3):
+            with create_revision():
+                set_deferred(True)
+                self.test11.save()
+            # Don't write to the shared in-memory database from both threads at once.
+            writer.flush()
+        writer.close()
+        self.assertEqual(get_for_object(self.test11).count(), 3)
+
+    def tearDown(self):
+        set_writer(None)
+        super(DeferredRevisionTest, self).tearDown()
+
+
 excluded_revision_manager = RevisionManager("excluded")
 
 
+class FlushPolicyTest(ReversionTestBase):
+
+    def testFlushPolicy(self):
+        with create_revision():
+            set_flush_policy(max_objects=2)
+            self.assertEqual(get_flush_policy(), (2, None))
+            set_comment("Foo")
+            for obj in (self.test11, self.test12, self.test21, self.test22):
+                obj.save()
+                self.assertTrue(sum(len(objects) for objects in revision_context_manager._current_frame.objects.values()) < 2)
+            self.test11.name = "model1 instance1 version2"
+            self.test11.save()
+            add_meta(RevisionMeta, age=5)
+        revision = Revision.objects.get()
+        self.assertEqual(revision.comment, "Foo")
+        self.assertEqual(revision.version_set.count(), 4)
+        self.assertEqual(revision.revisionmeta.age, 5)
+        self.assertEqual(revision.version_count, 4)
+        self.assertEqual(revision.content_types.count(), 2)
+        self.assertEqual(get_for_object(self.test11).get().field_dict["name"], "model1 instance1 version2")
+
+    def testFlushPolicyBytes(self):
+        with create_revision():
+            set_flush_policy(max_bytes=1)
+            self.test31.delete()
+            self.assertEqual(Version.objects.count(), 1)
+        self.assertEqual(Revision.objects.count(), 1)
+
+    def testFlushPolicyBytesOnSave(self):
+        with create_revision():
+            set_flush_policy(max_bytes=1)
+            self.test11.save()
+            self.assertEqual(Version.objects.count(), 1)
+            self.test12.save()
+            self.assertEqual(Version.objects.count(), 2)
+        self.assertEqual(Revision.objects.get().version_set.count(), 2)
+
+    @skipIf(getattr(connection.features, "can_return_ids_from_bulk_insert", False), "The database returns the primary keys of bulk inserted rows.")
+    def testFlushPolicyOnlyLooksUpNewVersions(self):
+        with create_revision():
+            set_flush_policy(max_objects=1)
+            self.test11.save()
+            with CaptureQueriesContext(connection) as queries:
+                self.test12.save()
+        # The primary keys of the versions already saved in the revision are not read again.
+        lookups = [query["sql"] for query in queries if '"reversion_version"."object_id" FROM' in query["sql"]]
+        self.assertEqual(len(lookups), 1)
+        self.assertTrue('"reversion_version"."id" >' in lookups[0])
+        self.assertEqual(Revision.objects.get().version_set.count(), 2)
+
+    def testFlushPolicyInvalidRevision(self):
+        try:
+            with create_revision():
+                set_flush_policy(max_objects=1)
+                self.test11.save()
+                self.assertEqual(Revision.objects.count(), 1)
+                raise Exception("Foo")
+        except Exception:
+            pass
+        self.assertEqual(Revision.objects.count(), 0)
+        self.assertEqual(Version.objects.count(), 0)
+
+    def testFlushPolicyInvalidRevisionKeepsDeltaChains(self):
+        unregister(ReversionTestModel1)
+        register(ReversionTestModel1, keyframe_interval=10)
+        try:
+            with create_revision():
+                set_flush_policy(max_objects=1)
+                self.test11.save()
+                # A revision saved while the block runs is delta encoded against the saved part.
+                self.test11.name = "model1 instance1 version2"
+                self.test11.save()
+                default_revision_manager.save_revision([self.test11])
+                raise Exception("Foo")
+        except Exception:
+            pass
+        version = get_for_object(self.test11).get()
+        self.assertEqual(version.delta_base_id, None)
+        self.assertEqual(version.field_dict["name"], "model1 instance1 version2")
+
+    def testFlushPolicyInvalidRevisionInBrokenTransaction(self):
+        with self.assertRaises(IntegrityError):
+            with transaction.atomic():
+                with create_revision():
+                    set_flush_policy(max_objects=1)
+                    self.test11.save()
+                    self.assertEqual(Revision.objects.count(), 1)
+                    # Break the transaction, as a failed query in an atomic block without a savepoint does.
+                    transaction.set_rollback(True)
+                    raise IntegrityError("Foo")
+        # The saved part of the revision is rolled back with the transaction.
+        self.assertEqual(Revision.objects.count(), 0)
+        self.assertEqual(Version.objects.count(), 0)
+
+    def testFlushPolicyNestedRevision(self):
+        with create_revision():
+            set_flush_policy(max_objects=1)
+            with create_revision():
+                self.test11.save()
+                self.assertEqual(Revision.objects.count(), 0)
+            self.assertEqual(Revision.objects.count(), 1)
+            self.test12.save()
+        self.assertEqual(Revision.objects.get().version_set.count(), 2)
+
+
+class BulkVersioningTest(ReversionTestBase):
+
+    def testAddToRevision(self):
+        with create_revision():
+            ReversionTestModel1.objects.update(name="model1 version2")
+            add_to_revision(ReversionTestModel1.objects.all(), chunk_size=1)
+            add_to_revision([self.test21])
+        revision = Revision.objects.get()
+        self.assertEqual(revision.version_set.count(), 3)
+        self.assertEqual(get_for_object(self.test11).get().field_dict["name"], "model1 version2")
+
+    def testAddToRevisionRequiresActiveRevision(self):
+        self.assertRaises(RevisionManagementError, lambda: add_to_revision([self.test11]))
+
+    def testSaveRevisionForQueryset(self):
+        revision = save_revision_for_queryset(ReversionTestModel1.objects.all(), comment="Bulk", meta=[(RevisionMeta, {"age": 5})], chunk_size=1)
+        self.assertEqual(revision.comment, "Bulk")
+        self.assertEqual(revision.revisionmeta.age, 5)
+        self.assertEqual(revision.version_set.count(), 2)
+        self.assertEqual(save_revision_for_queryset(ReversionTestModel1.objects.none()), None)
+
+    def testVersionedQuerySetUpdate(self):
+        queryset = VersionedQuerySet(ReversionTestModel1)
+        queryset.revision_chunk_size = 1
+        with create_revision():
+            self.assertEqual(queryset.filter(name__startswith="model1").update(name="model1 version2"), 2)
+        self.assertEqual(Revision.objects.get().version_set.count(), 2)
+        self.assertEqual(get_for_object(self.test12).get().field_dict["name"], "model1 version2")
+        # Outside a revision, nothing is versioned.
+        self.assertEqual(queryset.update(name="model1 version3"), 2)
+        self.assertEqual(Version.objects.count(), 2)
+
+    def testVersionedQuerySetBulkCreate(self):
+        register(ReversionTestModelBigInt)
+        try:
+            with create_revision():
+                VersionedQuerySet(ReversionTestModelBigInt).bulk_create([
+                    ReversionTestModelBigInt(id=i, name="bigint instance%s version1" % i)
+                    for i in range(1, 4)
+                ])
+            self.assertEqual(Revision.objects.get().version_set.count(), 3)
+            self.assertEqual(get_for_object_reference(ReversionTestModelBigInt, 2).get().object_repr, force_text(ReversionTestModelBigInt.objects.get(pk=2)))
+        finally:
+            unregister(ReversionTestModelBigInt)
+
+    @skipIf(getattr(connection.features, "can_return_ids_from_bulk_insert", False), "The database returns the primary keys of bulk inserted rows.")
+    def testVersionedQuerySetBulkCreateRequiresPrimaryKeys(self):
+        queryset = VersionedQuerySet(ReversionTestModel1)
+        with create_revision():
+            with self.assertRaises(RevisionManagementError):
+                queryset.bulk_create([ReversionTestModel1(name="model1 instance3 version1")])
+        self.assertEqual(ReversionTestModel1.objects.count(), 2)
+        # Outside a revision, nothing is versioned.
+        queryset.bulk_create([ReversionTestModel1(name="model1 instance3 version1")])
+        self.assertEqual(ReversionTestModel1.objects.count(), 3)
+
 class ExcludedFieldsTest(RevisionTestBase):
 
     def setUp(self):
@@ -657,6 +1551,94 @@ class CreateInitialRevisionsTest(ReversionTestBase):
         call_command("createinitialrevisions", comment="Foo bar")
         self.assertEqual(Revision.objects.all()[0].comment, "Foo bar")
 
+    def testCreateInitialRevisionsInBatches(self):
+        with create_revision():
+            self.test12.save()
+        for i in range(5):
+            ReversionTestModel1.objects.create(name="model1 instance%s version1" % (i + 3))
+        call_command("createinitialrevisions", "test_reversion.ReversionTestModel1", batch_size=2, verbosity=0)
+        self.assertEqual(Revision.objects.count(), 7)
+        self.assertEqual(get_for_object(self.test12).count(), 1)
+        for obj in ReversionTestModel1.objects.all():
+            self.assertEqual(get_for_object(obj).get().revision.version_set.count(), 1)
+
+    def testCreateInitialRevisionsQueryCount(self):
+        for i in range(10):
+            ReversionTestModel1.objects.create(name="model1 instance%s version1" % (i + 3))
+        with CaptureQueriesContext(connection) as queries:
+            call_command("createinitialrevisions", "test_reversion.ReversionTestModel1", verbosity=0)
+        # One revision insert per object, but the versions are saved in bulk.
+        self.assertTrue(len(queries) < 12 * 2)
+        self.assertEqual(Version.objects.count(), 12)
+
+    def testGetPkRanges(self):
+        from reversion.management.commands.createinitialrevisions import get_pk_ranges
+        for i in range(8):
+            ReversionTestModel1.objects.create(name="model1 instance%s version1" % (i + 3))
+        pk_ranges = get_pk_ranges(ReversionTestModel1.objects.all(), 3)
+        self.assertEqual(len(pk_ranges), 3)
+        self.assertEqual(pk_ranges[0][0], None)
+        self.assertEqual(pk_ranges[-1][1], None)
+        counts = []
+        for lower, upper in pk_ranges:
+            objs = ReversionTestModel1.objects.all()
+            if lower is not None:
+                objs = objs.filter(pk__gt=lower)
+            if upper is not None:
+                objs = objs.filter(pk__lte=upper)
+            counts.append(objs.count())
+        self.assertEqual(sum(counts), 10)
+        self.assertTrue(max(counts) - min(counts) <= 1)
+
+    def testCreateInitialRevisionsCheckpoint(self):
+        call_command("createinitialrevisions", "test_reversion.ReversionTestModel1", batch_size=1, verbosity=0)
+        checkpoint = InitialRevisionCheckpoint.objects.get()
+        self.assertEqual(checkpoint.content_type, ContentType.objects.get_for_model(ReversionTestModel1))
+        self.assertTrue(checkpoint.is_complete)
+        self.assertEqual(checkpoint.last_pk, force_text(self.test12.pk))
+        self.assertEqual(checkpoint.processed_count, 2)
+        self.assertEqual(checkpoint.created_count, 2)
+
+    def testCreateInitialRevisionsResume(self):
+        content_type = ContentType.objects.get_for_model(ReversionTestModel1)
+        # Simulate a run interrupted after the first object.
+        InitialRevisionCheckpoint.objects.create(
+            content_type = content_type,
+            last_pk = force_text(self.test11.pk),
+            processed_count = 1,
+        )
+        call_command("createinitialrevisions", "test_reversion.ReversionTestModel1", resume=True, verbosity=0)
+        self.assertEqual(get_for_object(self.test11).count(), 0)
+        self.assertEqual(get_for_object(self.test12).count(), 1)
+        checkpoint = InitialRevisionCheckpoint.objects.get()
+        self.assertTrue(checkpoint.is_complete)
+        self.assertEqual(checkpoint.processed_count, 2)
+        self.assertEqual(checkpoint.created_count, 1)
+        # Resuming a complete run does nothing.
+        call_command("createinitialrevisions", "test_reversion.ReversionTestModel1", resume=True, verbosity=0)
+        self.assertEqual(Revision.objects.count(), 1)
+        # Without resume, the run starts again.
+        call_command("createinitialrevisions", "test_reversion.ReversionTestModel1", verbosity=0)
+        self.assertEqual(get_for_object(self.test11).count(), 1)
+        self.assertEqual(InitialRevisionCheckpoint.objects.get().processed_count, 2)
+
+
+class CreateInitialRevisionsWorkersTest(ReversionTestMixin, TransactionTestCase):
+
+    def testCreateInitialRevisionsWorkers(self):
+        if connection.vendor == "sqlite" and connection.is_in_memory_db(connection.settings_dict["NAME"]):
+            self.skipTest("Worker processes cannot share an in-memory SQLite database. Set DB_TEST_NAME to use a file.")
+        for i in range(8):
+            ReversionTestModel1.objects.create(name="model1 instance%s version1" % (i + 3))
+        call_command("createinitialrevisions", "test_reversion.ReversionTestModel1", batch_size=2, workers=2, verbosity=0)
+        self.assertEqual(Version.objects.count(), 10)
+        for obj in ReversionTestModel1.objects.all():
+            self.assertEqual(get_for_object(obj).count(), 1)
+        checkpoints = InitialRevisionCheckpoint.objects.all()
+        self.assertEqual(len(checkpoints), 2)
+        self.assertTrue(all(checkpoint.is_complete for checkpoint in checkpoints))
+        self.assertEqual(sum(checkpoint.created_count for checkpoint in checkpoints), 10)
+
 
 class DeleteRevisionsTest(ReversionTestBase):
 
@@ -666,6 +1648,311 @@ class DeleteRevisionsTest(ReversionTestBase):
         call_command("deleterevisions", "test_reversion", confirmation=False, verbosity=0)
         self.assertEqual(Version.objects.count(), 0)
 
+    def createKeepRevisions(self):
+        now = timezone.now()
+        for i in range(4):
+            with create_revision():
+                self.test11.name = "model1 instance1 version%s" % (i + 2)
+                self.test11.save()
+        for i in range(2):
+            with create_revision():
+                self.test12.name = "model1 instance2 version%s" % (i + 2)
+                self.test12.save()
+        # Make the first revision of test11 its most recent, to check ordering by date.
+        for days, version in enumerate(get_for_object(self.test11)):
+            Revision.objects.filter(pk=version.revision_id).update(date_created=now - datetime.timedelta(days=days))
+        Revision.objects.filter(pk=get_for_object(self.test11).order_by("pk")[0].revision_id).update(
+            date_created = now + datetime.timedelta(days=1),
+        )
+
+    def getPrunedRevisionIds(self, keep):
+        from reversion.management.commands.deleterevisions import get_pruned_revision_ids
+        return set(Revision.objects.filter(
+            pk__in = get_pruned_revision_ids(Version.objects.all(), keep),
+        ).values_list("pk", flat=True))
+
+    def testGetPrunedRevisionIds(self):
+        from reversion.management.commands import deleterevisions
+        self.createKeepRevisions()
+        versions = get_for_object(self.test11).order_by("-revision__date_created")
+        expected_ids = set(version.revision_id for version in versions[2:])
+        self.assertEqual(len(expected_ids), 2)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.getPrunedRevisionIds(2), expected_ids)
+        # Check the portable fallback.
+        supports_window_functions = deleterevisions.supports_window_functions
+        deleterevisions.supports_window_functions = lambda connection: False
+        try:
+            self.assertEqual(self.getPrunedRevisionIds(2), expected_ids)
+        finally:
+            deleterevisions.supports_window_functions = supports_window_functions
+
+    def testGetPrunedRevisionIdsFallbackTextPrimaryKeys(self):
+        from reversion.management.commands import deleterevisions
+        for i in range(3):
+            with create_revision():
+                self.test21.save()
+                self.test22.save()
+        revision_ids = list(Revision.objects.order_by("pk").values_list("pk", flat=True))
+        supports_window_functions = deleterevisions.supports_window_functions
+        deleterevisions.supports_window_functions = lambda connection: False
+        try:
+            self.assertEqual(self.getPrunedRevisionIds(1), set(revision_ids[:2]))
+        finally:
+            deleterevisions.supports_window_functions = supports_window_functions
+
+    def testParseMySQLServerInfo(self):
+        from reversion.management.commands.deleterevisions import parse_mysql_server_info
+        self.assertEqual(parse_mysql_server_info("8.0.21"), (False, (8, 0, 21)))
+        self.assertEqual(parse_mysql_server_info("5.7.31-log"), (False, (5, 7, 31)))
+        self.assertEqual(parse_mysql_server_info("10.1.48-MariaDB"), (True, (10, 1, 48)))
+        self.assertEqual(parse_mysql_server_info("5.5.5-10.3.27-MariaDB-0+deb10u1"), (True, (10, 3, 27)))
+
+    def testDeleteRevisionsKeep(self):
+        self.createKeepRevisions()
+        call_command("deleterevisions", "test_reversion.reversiontestmodel1", keep=2, confirmation=False, verbosity=0)
+        self.assertEqual(
+            [version.field_dict["name"] for version in get_for_object(self.test11)],
+            ["model1 instance1 version5", "model1 instance1 version2"],
+        )
+        self.assertEqual(get_for_object(self.test12).count(), 2)
+
+    def testDeleteRevisionsInBatches(self):
+        call_command("createinitialrevisions")
+        self.createKeepRevisions()
+        with CaptureQueriesContext(connection) as queries:
+            call_command("deleterevisions", "test_reversion.reversiontestmodel1", keep=2, batch_size=1, confirmation=False, verbosity=0)
+        # The versions to keep are only ranked once, not for each batch.
+        self.assertEqual(len([query for query in queries if "candidate" in query["sql"]]), 1)
+        self.assertEqual(
+            [version.field_dict["name"] for version in get_for_object(self.test11)],
+            ["model1 instance1 version5", "model1 instance1 version1"],
+        )
+        self.assertEqual(get_for_object(self.test12).count(), 2)
+        call_command("deleterevisions", batch_size=2, confirmation=False, verbosity=0)
+        self.assertEqual(Revision.objects.count(), 0)
+        self.assertEqual(Version.objects.count(), 0)
+
+    def testDeleteRevisionsContinuousRequiresNoConfirmation(self):
+        with self.assertRaises(CommandError):
+            call_command("deleterevisions", continuous=True, verbosity=0)
+
+    def testDeleteRevisionsContinuousDeletesInBatches(self):
+        from reversion.management.commands import deleterevisions
+        original_delete_revisions_in_batches = deleterevisions.delete_revisions_in_batches
+        batch_sizes = []
+        def delete_revisions_in_batches(revision_query, batch_size, *args, **kwargs):
+            batch_sizes.append(batch_size)
+            # Stop the continuous run after the first batch.
+            raise StopIteration
+        deleterevisions.delete_revisions_in_batches = delete_revisions_in_batches
+        try:
+            with self.assertRaises(StopIteration):
+                call_command("deleterevisions", continuous=True, confirmation=False, verbosity=0)
+        finally:
+            deleterevisions.delete_revisions_in_batches = original_delete_revisions_in_batches
+        self.assertEqual(batch_sizes, [deleterevisions.CONTINUOUS_BATCH_SIZE])
+
+
+class ArchiveRevisionsTest(ReversionTestBase):
+
+    def setUp(self):
+        super(ArchiveRevisionsTest, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        for i in range(3):
+            with create_revision():
+                self.test11.name = "model1 instance1 version%s" % (i + 2)
+                self.test11.save()
+                self.test21.save()
+        # Make the first two revisions old.
+        old_date = timezone.now() - datetime.timedelta(days=400)
+        for version in get_for_object(self.test11)[1:]:
+            Revision.objects.filter(pk=version.revision_id).update(date_created=old_date)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        super(ArchiveRevisionsTest, self).tearDown()
+
+    def testArchiveRevisions(self):
+        from reversion.archive import Archive, get_archive_filename
+        call_command("archiverevisions", directory=self.directory, days=365, confirmation=False, verbosity=0)
+        self.assertEqual(Revision.objects.count(), 1)
+        self.assertEqual(get_for_object(self.test11).get().field_dict["name"], "model1 instance1 version4")
+        # The archive files can be read with standard tools.
+        archive_filename = get_archive_filename(timezone.now() - datetime.timedelta(days=400))
+        with gzip.open(os.path.join(self.directory, archive_filename)) as handle:
+            self.assertEqual(len(handle.read().splitlines()), 2)
+        # The versions can be looked up in the archive.
+        archive = Archive(self.directory)
+        try:
+            versions = archive.get_for_object(self.test11)
+            self.assertEqual(
+                [version.field_dict["name"] for version in versions],
+                ["model1 instance1 version3", "model1 instance1 version2"],
+            )
+            self.assertEqual(len(archive.get_for_object(self.test21)), 2)
+            self.assertEqual(archive.get_for_object(self.test12), [])
+            self.assertEqual(len(archive.get_revision(versions[0].revision_id)["versions"]), 2)
+            self.assertTrue(versions[0].date_created < timezone.now() - datetime.timedelta(days=365))
+        finally:
+            archive.close()
+
+    def testGetRevisionsData(self):
+        from reversion.archive import get_revisions_data
+        unregister(ReversionTestModel1)
+        register(ReversionTestModel1, keyframe_interval=10)
+        for i in range(5):
+            with create_revision():
+                self.test11.name = "model1 instance1 version%s" % (i + 5)
+                self.test11.save()
+        revisions = list(Revision.objects.order_by("pk").prefetch_related("version_set", "version_set__content_type", "version_set__blob"))
+        self.assertTrue(get_for_object(self.test11)[0].delta_base_id)
+        # The delta chains are resolved together, rather than one query per version.
+        # Only the revision meta is queried, once for all the revisions.
+        with self.assertNumQueries(1):
+            revisions_data = get_revisions_data(revisions)
+        self.assertEqual(
+            [version_data["serialized_data"] for revision_data in revisions_data for version_data in revision_data["versions"]],
+            [version.get_serialized_data() for revision in Revision.objects.order_by("pk") for version in revision.version_set.all()],
+        )
+
+    def testArchiveRevisionsMeta(self):
+        from reversion.archive import Archive
+        with create_revision():
+            self.test11.save()
+            add_meta(RevisionMeta, age=5)
+        revision_id = get_for_object(self.test11)[0].revision_id
+        Revision.objects.filter(pk=revision_id).update(date_created=timezone.now() - datetime.timedelta(days=400))
+        call_command("archiverevisions", directory=self.directory, days=365, confirmation=False, verbosity=0)
+        self.assertEqual(RevisionMeta.objects.count(), 0)
+        archive = Archive(self.directory)
+        try:
+            meta = archive.get_revision(revision_id)["meta"]
+            self.assertEqual(len(meta), 1)
+            self.assertEqual(meta[0]["model"], "test_reversion.revisionmeta")
+            self.assertEqual(meta[0]["fields"], {"revision": revision_id, "age": 5})
+            self.assertEqual(archive.get_revision(archive.get_for_object(self.test21)[-1].revision_id)["meta"], [])
+        finally:
+            archive.close()
+
+    def testArchiveRevisionsAppends(self):
+        from reversion.archive import Archive
+        call_command("archiverevisions", directory=self.directory, days=365, batch_size=1, confirmation=False, verbosity=0)
+        call_command("archiverevisions", directory=self.directory, date=(timezone.now() + datetime.timedelta(days=1)).date().isoformat(), confirmation=False, verbosity=0)
+        self.assertEqual(Revision.objects.count(), 0)
+        archive = Archive(self.directory)
+        try:
+            self.assertEqual(
+                [version.field_dict["name"] for version in archive.get_for_object(self.test11)],
+                ["model1 instance1 version4", "model1 instance1 version3", "model1 instance1 version2"],
+            )
+        finally:
+            archive.close()
+
+    def testArchiveRevisionsRequiresDate(self):
+        with self.assertRaises(CommandError):
+            call_command("archiverevisions", directory=self.directory, confirmation=False, verbosity=0)
+
+class PartitionTest(ReversionTestBase):
+
+    def testMonthRanges(self):
+        from reversion.partitions import get_month_ranges, get_partition_name
+        month_ranges = get_month_ranges(datetime.datetime(2015, 11, 15, tzinfo=timezone.utc), 3)
+        self.assertEqual([lower.date() for lower, _ in month_ranges], [
+            datetime.date(2015, 11, 1),
+            datetime.date(2015, 12, 1),
+            datetime.date(2016, 1, 1),
+        ])
+        self.assertEqual(month_ranges[-1][1].date(), datetime.date(2016, 2, 1))
+        self.assertEqual(get_partition_name("reversion_version", month_ranges[-1][0]), "reversion_version_2016_01")
+
+    @skipUnless(connection.vendor != "postgresql", "Partitioning is only a no-op on other databases.")
+    def testPartitioningIsNoOp(self):
+        from reversion.partitions import setup_partitioning, create_partitions, drop_partitions
+        self.assertEqual(setup_partitioning(), [])
+        self.assertEqual(create_partitions(), [])
+        default_revision_manager.save_revisions([self.test11])
+        self.assertEqual(drop_partitions(timezone.now()), [])
+        call_command("partitionrevisions", setup=True, keep_months=1, confirmation=False, verbosity=0)
+        self.assertEqual(Version.objects.count(), 1)
+
+    def testDeleteReferencingObjects(self):
+        from reversion.partitions import _delete_referencing_objects
+        with create_revision():
+            self.test11.save()
+            add_meta(RevisionMeta, age=5)
+        upper = Revision.objects.get().date_created + datetime.timedelta(seconds=1)
+        _delete_referencing_objects(Revision, upper, "default")
+        self.assertEqual(RevisionMeta.objects.count(), 0)
+        self.assertEqual(Revision.content_types.through.objects.count(), 0)
+        # Versions are partitioned too, so are left to be dropped with their partition.
+        self.assertEqual(Version.objects.count(), 1)
+
+    def testSaveRevisionsSetsVersionDate(self):
+        revision = default_revision_manager.save_revisions([self.test11])[0]
+        self.assertEqual(revision.version_set.get().date_created, revision.date_created)
+
+
+# Partitioning alters the revision and version tables, which can't be done with pending foreign key checks.
+class PostgresPartitionTest(ReversionTestMixin, TransactionTestCase):
+
+    @skipUnless(supports_partitioning(connection), "Partitioning is only supported on PostgreSQL 11 or later.")
+    def testPartitionRevisions(self):
+        from reversion.partitions import setup_partitioning, create_partitions, drop_partitions, add_months, get_month_start, get_partition_name, get_legacy_partition_name
+        with create_revision():
+            self.test11.save()
+            add_meta(RevisionMeta, age=5)
+        # Move the revision back a year, so it is kept in the partition of the existing rows.
+        old_date = add_months(timezone.now(), -12)
+        Revision.objects.update(date_created=old_date)
+        Version.objects.update(date_created=old_date)
+        start = get_month_start(timezone.now())
+        self.assertEqual(setup_partitioning(start=start, months_ahead=1), [
+            get_legacy_partition_name("reversion_revision", start),
+            get_legacy_partition_name("reversion_version", start),
+            get_partition_name("reversion_revision", start),
+            get_partition_name("reversion_revision", add_months(start, 1)),
+            get_partition_name("reversion_version", start),
+            get_partition_name("reversion_version", add_months(start, 1)),
+        ])
+        self.assertEqual(setup_partitioning(start=start), [])
+        self.assertEqual(create_partitions(start=start, months=3), [
+            get_partition_name("reversion_revision", add_months(start, 2)),
+            get_partition_name("reversion_version", add_months(start, 2)),
+        ])
+        with create_revision():
+            self.test11.save()
+        self.assertEqual(get_for_object(self.test11).count(), 2)
+        self.assertEqual(get_for_date(self.test11, start).revision.revisionmeta.age, 5)
+        # Dropping the partition of the existing rows also deletes their meta data.
+        self.assertEqual(drop_partitions(start), [
+            get_legacy_partition_name("reversion_version", start),
+            get_legacy_partition_name("reversion_revision", start),
+        ])
+        self.assertEqual(Revision.objects.count(), 1)
+        self.assertEqual(RevisionMeta.objects.count(), 0)
+        self.assertEqual(get_for_object(self.test11).count(), 1)
+
+    @skipUnless(supports_partitioning(connection), "Partitioning is only supported on PostgreSQL 11 or later.")
+    def testCreatePartitionMovesDefaultPartitionRows(self):
+        from reversion.partitions import setup_partitioning, create_partitions, add_months, get_month_start, get_partition_name
+        start = get_month_start(timezone.now())
+        setup_partitioning(start=start, months_ahead=0)
+        with create_revision():
+            self.test11.save()
+        # Move the revision to a month without a partition, so it is kept in the default partition.
+        future_month = add_months(start, 6)
+        Revision.objects.update(date_created=future_month)
+        Version.objects.update(date_created=future_month)
+        self.assertEqual(create_partitions(start=future_month, months=1), [
+            get_partition_name("reversion_revision", future_month),
+            get_partition_name("reversion_version", future_month),
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM %s" % connection.ops.quote_name(get_partition_name("reversion_version", future_month)))
+            self.assertEqual(cursor.fetchone()[0], 1)
+        self.assertEqual(get_for_object(self.test11).count(), 1)
+
 
 # Tests for reversion functionality that's tied to requests.
 
@@ -704,6 +1991,7 @@ class VersionAdminTest(TestCase):
             username = "foo",
             password = "bar",
         )
+        cache.clear()
 
     def tearDown(self):
         self.client.logout()
@@ -719,6 +2007,92 @@ class VersionAdminTest(TestCase):
         response = self.client.get("/admin/test_reversion/childtestadminmodel/")
         self.assertEqual(response.status_code, 200)
 
+    def testHistoryViewPagination(self):
+        obj = ChildTestAdminModel.objects.create(parent_name="parent instance1 version1", child_name="child instance1 version1")
+        for i in range(1, 4):
+            with create_revision():
+                set_comment("comment %s" % i)
+                obj.save()
+        versions = list(get_for_object(obj).order_by("pk"))
+        history_url = reverse("admin:test_reversion_childtestadminmodel_history", args=(obj.pk,))
+        model_admin = admin_site._registry[ChildTestAdminModel]
+        model_admin.history_per_page = 2
+        try:
+            response = self.client.get(history_url)
+            self.assertContains(response, "comment 1")
+            self.assertContains(response, "comment 2")
+            self.assertNotContains(response, "comment 3")
+            self.assertContains(response, '"%s%s/"' % (history_url, versions[0].pk))
+            self.assertContains(response, '"%s?after=%s"' % (history_url, versions[1].pk))
+            # The next page starts after the last version shown.
+            response = self.client.get(history_url, {"after": versions[1].pk})
+            self.assertNotContains(response, "comment 2")
+            self.assertContains(response, "comment 3")
+            self.assertNotContains(response, "?after=")
+            # Latest first pages backwards.
+            model_admin.history_latest_first = True
+            response = self.client.get(history_url, {"after": versions[2].pk})
+            self.assertContains(response, "comment 2")
+            self.assertContains(response, "comment 1")
+            self.assertNotContains(response, "comment 3")
+        finally:
+            model_admin.history_per_page = VersionAdmin.history_per_page
+            model_admin.history_latest_first = VersionAdmin.history_latest_first
+
+    def testRecoverListPagination(self):
+        for i in range(1, 5):
+            with create_revision():
+                obj = ChildTestAdminModel.objects.create(parent_name="parent instance%s" % i, child_name="child instance%s" % i)
+            obj.delete()
+        recoverlist_url = reverse("admin:test_reversion_childtestadminmodel_recoverlist")
+        model_admin = admin_site._registry[ChildTestAdminModel]
+        model_admin.recover_list_per_page = 2
+        model_admin.recover_list_max_results = 3
+        try:
+            # The most recently deleted objects are shown, oldest first.
+            response = self.client.get(recoverlist_url)
+            self.assertNotContains(response, "child instance1")
+            self.assertContains(response, "child instance2")
+            self.assertContains(response, "child instance3")
+            self.assertNotContains(response, "child instance4")
+            self.assertContains(response, "Page 1 of 2")
+            self.assertContains(response, "Showing the 3 most recently deleted objects.")
+            response = self.client.get(recoverlist_url, {"p": 2})
+            self.assertContains(response, "child instance4")
+            self.assertNotContains(response, "child instance3")
+            model_admin.history_latest_first = True
+            response = self.client.get(recoverlist_url)
+            self.assertContains(response, "child instance4")
+            self.assertContains(response, "child instance3")
+            self.assertNotContains(response, "child instance2")
+            model_admin.history_latest_first = False
+            # Search by object repr.
+            response = self.client.get(recoverlist_url, {"q": "instance4"})
+            self.assertContains(response, "child instance4")
+            self.assertNotContains(response, "child instance1")
+            self.assertContains(response, "1 deleted object")
+            # Search by date.
+            tomorrow = (timezone.now() + datetime.timedelta(days=1)).date().isoformat()
+            response = self.client.get(recoverlist_url, {"date_from": tomorrow})
+            self.assertContains(response, "There are no deleted objects to recover.")
+            response = self.client.get(recoverlist_url, {"date_to": tomorrow, "q": "instance2"})
+            self.assertContains(response, "child instance2")
+            # The results are cached until an object is recovered.
+            response = self.client.get(recoverlist_url, {"q": "instance5"})
+            self.assertContains(response, "There are no deleted objects to recover.")
+            with create_revision():
+                obj = ChildTestAdminModel.objects.create(parent_name="parent instance5", child_name="child instance5")
+            obj.delete()
+            response = self.client.get(recoverlist_url, {"q": "instance5"})
+            self.assertNotContains(response, "child instance5")
+            model_admin._clear_recover_list_cache()
+            response = self.client.get(recoverlist_url, {"q": "instance5"})
+            self.assertContains(response, "child instance5")
+        finally:
+            model_admin.recover_list_per_page = VersionAdmin.recover_list_per_page
+            model_admin.recover_list_max_results = VersionAdmin.recover_list_max_results
+            model_admin.history_latest_first = VersionAdmin.history_latest_first
+
     def testRevisionSavedOnPost(self):
         self.assertEqual(ChildTestAdminModel.objects.count(), 0)
         # Create an instance via the admin.
@@ -83,6 +83,8 @@ DATABASES = {
         "PASSWORD": os.environ.get("DB_PASSWORD", ""),
         "TEST": {
             "SERIALIZE": False,  # Speed up tests.
+            # SQLite test databases are in memory, unless a file is named.
+            "NAME": os.environ.get("DB_TEST_NAME"),
         },
     }
 }